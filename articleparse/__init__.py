@@ -1 +1,31 @@
-from articleparse.analyzer import Analyzer
+import importlib
+import sys
+
+
+# names importable from the package, and the modules they are imported
+# from when first used, so that only what is used is loaded
+_LAZY = {'Analyzer': 'articleparse.analyzer',
+         'Extractor': 'articleparse.extractor',
+         'extract_many': 'articleparse.batch',
+         'IncrementalAnalyzer': 'articleparse.incremental',
+         'ResultCache': 'articleparse.cache',
+         'WarmPool': 'articleparse.server',
+         'Client': 'articleparse.client',
+         'ColumnarWriter': 'articleparse.columnar'}
+
+
+def __getattr__(name):
+    # module __getattr__ (PEP 562) is only called on Python 3.7 and later
+    if name not in _LAZY:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if sys.version_info < (3, 7):
+    from articleparse.analyzer import Analyzer
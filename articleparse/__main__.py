@@ -0,0 +1,34 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import importlib
+import sys
+
+
+# modules of the articleparse command's subcommands, each with a main()
+COMMANDS = {'serve': 'articleparse.server',
+            'batch': 'articleparse.batch',
+            'corpus': 'articleparse.corpus',
+            'tune': 'articleparse.tuning',
+            'columnar': 'articleparse.columnar'}
+
+
+def main():
+    '''
+    articleparse COMMAND [ARGS], where COMMAND is serve, batch, corpus, tune or columnar
+    '''
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.stderr.write("usage: articleparse {%s} ...\n" % ",".join(sorted(COMMANDS)))
+        sys.exit(2)
+    command = sys.argv[1]
+    # only the subcommand's module is imported
+    module = importlib.import_module(COMMANDS[command])
+    sys.argv = ["articleparse " + command] + sys.argv[2:]
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
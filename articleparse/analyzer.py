@@ -5,8 +5,12 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 """
 
-from articleparse.htmlparse import HtmlParse
+from articleparse.htmlparse import HtmlParse, Tokenizer, TokenStream
+from articleparse.encoding import decode_chunks, read_chunks
+from articleparse.metrics import NULL_TRACE
+import operator
 import re
+import time
 from articleparse.stopwords import StopWords
 
 
@@ -24,6 +28,15 @@ SENTENCE_COUNT = 'sentence_count'
 AVG_SENTENCE_LEN = 'avg_sentence_len'
 STOP_WORD_DENSITY = 'stop_word_density'
 
+# the feature names double as the Section attribute names
+FEATURES = frozenset([ANCHOR_DENSITY, ANCHOR_COUNT, WORD_COUNT, UPPER_COUNT,
+                      AVG_WORD_LEN, SENTENCE_COUNT, AVG_SENTENCE_LEN, STOP_WORD_DENSITY])
+
+# tags kept for analysis, with spans converted to div since
+# they play the same role in our analysis
+RETAIN_LIST = ["div", "/div", "span", "/span", "a", "/a"]
+CONVERT_LIST = ["span", "div", "/span", "/div"]
+
 
 def lt(value, threshold):
     return value < threshold
@@ -49,21 +62,394 @@ def in_range(value, threshold, margin):
     else:
         return value < (threshold + threshold*margin) and value > (threshold - threshold*margin)
 
+def points(value, threshold, comparator, margin):
+    '''
+    Points a feature value earns against one classification rule:
+    0.5 within the margin of the threshold, otherwise 1.0 if the
+    comparison holds and 0.0 if it does not
+    '''
+    if in_range(value, threshold, margin):
+        return 0.5
+    if comparator(value, threshold):
+        return 1.0
+    return 0.0
+
+
+_ANCHOR_TAG_RE = re.compile(r"</?a[^>\n]*>")
+_ANCHOR_OPEN_RE = re.compile(r"<a", re.IGNORECASE)
+_ANCHOR_CLOSE_RE = re.compile(r"</a>", re.IGNORECASE)
+
+
+def strip_anchors(text):
+    '''
+    re.sub(r"</?a.*?>", " ", text) in linear time. That pattern rescans
+    to the end of the line from every "<a" with no '>' after it, but
+    nothing after the last '>' of a line can match, so it is left alone
+    '''
+    if "\n" in text:
+        return "\n".join(strip_anchors(line) for line in text.split("\n"))
+    end = text.rfind(">") + 1
+    if end == len(text):
+        return _ANCHOR_TAG_RE.sub(" ", text)
+    return _ANCHOR_TAG_RE.sub(" ", text[:end]) + text[end:]
+
+
+def anchor_texts(text):
+    '''
+    re.findall(r"<a.*?>(.*?)</a>", text, re.IGNORECASE) in linear time.
+    Once an anchor is not closed on its line, no later one on that line
+    can be either, so the search stops instead of retrying from every "<a"
+    '''
+    if "\n" in text:
+        return [anchor for line in text.split("\n") for anchor in anchor_texts(line)]
+    ret = []
+    pos = 0
+    while True:
+        start = _ANCHOR_OPEN_RE.search(text, pos)
+        if start is None:
+            break
+        gt = text.find(">", start.end())
+        if gt < 0:
+            break
+        end = _ANCHOR_CLOSE_RE.search(text, gt + 1)
+        if end is None:
+            break
+        ret.append(text[gt + 1:end.start()])
+        pos = end.end()
+    return ret
+
+
+class _Keep(dict):
+    '''
+    str.translate table that keeps the characters keep is true for and
+    deletes the others, filled in as each character is first seen
+    '''
+    def __init__(self, keep):
+        self.keep = keep
+
+    def __missing__(self, code):
+        value = code if self.keep(chr(code)) else None
+        self[code] = value
+        return value
+
+
+# deletes what re.sub(r"[^\w\s]", "", text) would
+_WORD_CHARS = _Keep(lambda ch: ch.isalnum() or ch == "_" or ch.isspace())
+# deletes all but uppercase characters
+_UPPER = _Keep(str.isupper)
+_first = operator.itemgetter(0)
+
+
+def split_words(text):
+    '''
+    returns the words of text once punctuation is removed, as
+    word_features counts them
+    '''
+    return text.translate(_WORD_CHARS).split()
+
+
+def word_features(text, stop_words):
+    '''
+    Counts the words of text, once punctuation is removed, all from one
+    split of the text. Each count is taken by builtins over the whole list
+    of words rather than by a Python loop over them.
+
+    Parameters
+    ----------
+    text: str
+    stop_words: set of str
+        case folded stop words, see StopWords.get
+
+    Returns
+    -------
+    (number of words, total length of the words,
+     number of words starting with an uppercase letter, number of stop words)
+    '''
+    words = split_words(text)
+    firsts = "".join(map(_first, words))
+    return (len(words), len("".join(words)), len(firsts.translate(_UPPER)),
+            sum(map(stop_words.__contains__, map(str.casefold, words))))
+
+
+# characters of a section sampled by sample_word_features, in blocks
+# of equal length spread evenly over the section
+SAMPLE_SIZE = 32768
+SAMPLE_BLOCKS = 32
+# standard errors in the error bounds of estimated features
+ERROR_BOUND = 3.0
+
+_SPACE_RE = re.compile(r"\s")
+
+
+def _ratio(ys, xs, sampled):
+    '''
+    ratio estimate sum(ys) / sum(xs) over sampled blocks, and its
+    standard error from the variation between the blocks, with
+    sampled the share of the text in the blocks
+    '''
+    k = len(xs)
+    total = sum(xs)
+    if total == 0 or k < 2:
+        return 0.0, 0.0
+    r = sum(ys) / total
+    spread = sum((y - r * x) ** 2 for y, x in zip(ys, xs)) / (k - 1)
+    mean = total / k
+    return r, ((1.0 - sampled) * spread / k) ** 0.5 / mean
+
+
+def sample_word_features(text, stop_words, size = SAMPLE_SIZE, blocks = SAMPLE_BLOCKS):
+    '''
+    Estimates the word features of a long text from a sample of about
+    size characters, in blocks spread evenly over it. The sample is the
+    same every time for the same text, and each block is cut at
+    whitespace so that no word is split. Texts shorter than twice size
+    are counted exactly.
+
+    Each feature's error bound is ERROR_BOUND standard errors of its
+    estimate, from how much the blocks differ, so the exact value is
+    within it for all but a fraction of a percent of texts whose blocks
+    vary independently. Text repeating with the period of the blocks can
+    be further off.
+
+    Parameters
+    ----------
+    text: str
+    stop_words: set of str
+        case folded stop words, see StopWords.get
+    size: int
+        characters to sample
+    blocks: int
+        number of blocks the sample is taken in
+
+    Returns
+    -------
+    (word count, average word length, uppercase word count, stop word density)
+    and a dict of the error bound of each of them by feature name
+    '''
+    n = len(text)
+    if n < 2 * size or blocks < 2:
+        num_words, total_len, upper_count, num_stop_words = word_features(text, stop_words)
+        return ((num_words, 0 if num_words == 0 else float(total_len) / float(num_words), upper_count,
+                 0 if num_words == 0 else float(num_stop_words / num_words)),
+                {WORD_COUNT: 0.0, AVG_WORD_LEN: 0.0, UPPER_COUNT: 0.0, STOP_WORD_DENSITY: 0.0})
+
+    width = size // blocks
+    chars, words, lengths, uppers, stops = [], [], [], [], []
+    for b in range(0, blocks):
+        start = (n - width) * b // (blocks - 1)
+        if start > 0 and not text[start - 1].isspace():
+            space = _SPACE_RE.search(text, start)
+            start = n if space is None else space.end()
+        space = _SPACE_RE.search(text, min(n, start + width))
+        end = n if space is None else space.start()
+        if end <= start:
+            continue
+        block = word_features(text[start:end], stop_words)
+        chars.append(end - start)
+        words.append(block[0])
+        lengths.append(block[1])
+        uppers.append(block[2])
+        stops.append(block[3])
+
+    sampled = min(1.0, sum(chars) / float(n))
+    word_rate, word_se = _ratio(words, chars, sampled)
+    upper_rate, upper_se = _ratio(uppers, chars, sampled)
+    avg_len, avg_len_se = _ratio(lengths, words, sampled)
+    density, density_se = _ratio(stops, words, sampled)
+    return ((int(round(word_rate * n)), avg_len, int(round(upper_rate * n)), density),
+            {WORD_COUNT: ERROR_BOUND * word_se * n,
+             AVG_WORD_LEN: ERROR_BOUND * avg_len_se,
+             UPPER_COUNT: ERROR_BOUND * upper_se * n,
+             STOP_WORD_DENSITY: ERROR_BOUND * density_se})
+
+
+def near_threshold(value, error, threshold, margin):
+    '''
+    True if a value known to within error could earn different points
+    from a classification rule: if a threshold, or the edge of its
+    margin, is no further than error from the value. Comparators other
+    than lt, gt and bt are taken to change at their threshold too
+    '''
+    for t in (threshold if hasattr(threshold, '__iter__') else [threshold]):
+        edges = [t] if margin == 0 else [t, t - t*margin, t + t*margin]
+        if any(abs(value - edge) <= error for edge in edges):
+            return True
+    return False
+
+
+def default_classification():
+    '''
+    for each text feature, specify a threshold, a comparison, and a range
+    example: 'word_count': [50, '>', 0.1] means that any word count less than 50 is considered
+    to be boiler plate, anything greater than 50 is content. The range is a percentage 
+    meaning that anything within 10% of the threshold (so in this case +- 5 is the range 
+    45 to 55 inclusive) gets a partial point. A range of 0 means to ignore the range 
+    and not assign partial points
+    '''
+    return {ANCHOR_DENSITY: [0.333, lt, 0.1],
+            WORD_COUNT: [40, gt, 0.1],
+            STOP_WORD_DENSITY: [[.30, .566], bt, 0.02]
+            }
+
+
+# features known once the anchors have been analyzed, which is
+# cheap compared to the word and sentence analysis
+CHEAP_FEATURES = frozenset([ANCHOR_DENSITY, ANCHOR_COUNT])
+
+# sections on either side of a section that the neighbor classifier
+# looks at, and the points its score counts for. It is off unless a
+# weight is given, so sections are scored on their own by default
+NEIGHBOR_WINDOW = 1
+NEIGHBOR_WEIGHT = 0.0
+
+
+def neighbor_points(probabilities, i, window = NEIGHBOR_WINDOW, weight = NEIGHBOR_WEIGHT):
+    '''
+    Points the neighbor classifier gives the section at index i: the mean
+    individual probability of the sections up to window away on either
+    side, out of weight points. Content comes in runs and boilerplate in
+    blocks, so a section is pulled towards its neighbors. The neighbors
+    are added in order, so articleparse.vectorized gets the same floats.
+
+    Parameters
+    ----------
+    probabilities: list of float
+        the individual classifier's probability for each section
+    i: int
+        index of the section
+    window: int
+        sections on either side that are looked at
+    weight: float
+        points possible, 0 to score sections on their own
+
+    Returns
+    -------
+    points and points possible, both 0.0 for a section without neighbors
+    '''
+    total = 0.0
+    count = 0
+    for j in range(max(0, i - window), i):
+        total += probabilities[j]
+        count += 1
+    for j in range(i + 1, min(len(probabilities), i + window + 1)):
+        total += probabilities[j]
+        count += 1
+    if count == 0:
+        return 0.0, 0.0
+    return weight * (total / count), weight
+
 
 class Section(object):
     '''
     A section of an article as demarcated by HTML tags (div, span, etc). 
     Contains only text, punctuation and HTML anchors
+
+    A section does not keep a copy of its text, only offsets into the
+    parsed document, so the text is recreated by txt() when needed
     '''
-    def __init__(self, sec, position):
+    __slots__ = ('buf', 'start', 'end', 'pos', 'length', 'analyzed', 'stop_words', 'approximate',
+                 'errors', 'anchor_count', 'anchor_density', 'word_count', 'avg_word_len',
+                 'upper_count', 'stop_word_density', 'sentence_count', 'avg_sentence_len')
+
+    def __init__(self, sec, position, start = 0, end = None, lazy = False, stop_words = None,
+                 approximate = None):
+        '''
+        Parameters
+        ----------
+        sec: str
+            the section, or the parsed document the section is part of
+        position: int
+            position of the section in the document
+        start, end: int
+            offsets of the section in sec, the whole of sec by default
+        lazy: bool
+            only analyze the anchors and length, leaving the word and
+            sentence analysis to analyze()
+        stop_words: set of str
+            case folded stop words, StopWords.get('en') by default
+        approximate: int
+            if set, the word features of sections with more characters than
+            this are estimated from a sample, see sample_word_features.
+            errors then holds the error bound of each estimate, until
+            exact() counts them over the whole text
+        '''
+        self.buf = sec
+        self.stop_words = StopWords.get() if stop_words is None else stop_words
+        self.approximate = approximate
+        self.errors = None
+        self.start = start
+        self.end = len(sec) if end is None else end
         self.pos = position
-        self.__anchor_analysis(sec)
-        self.length = len(self.text)
-        self.__word_analysis()
-        self.__sentence_analysis()
+        self.analyzed = False
+        text = self.__anchor_analysis(sec[self.start:self.end])
+        self.length = len(text)
+        if not lazy:
+            self.analyze(text)
+
+    def analyze(self, text = None):
+        '''
+        word and sentence analysis, if not already done
+        '''
+        if self.analyzed:
+            return
+        if text is None:
+            text = self.txt()
+        if self.approximate is not None and len(text) > self.approximate:
+            self.__estimate(text)
+        else:
+            self.__word_analysis(text)
+            self.__sentence_analysis(text)
+        self.analyzed = True
+
+    def exact(self):
+        '''
+        counts the word features over the whole text, if they were estimated
+        '''
+        if self.errors is not None:
+            self.__word_analysis(self.txt())
+            self.errors = None
+
+    def uncertain(self, classification):
+        '''
+        the features whose estimates are within their error bound
+        of a point where a rule of classification changes, and
+        so might be scored differently if counted exactly
+        '''
+        if self.errors is None:
+            return []
+        return [key for key, (threshold, comparator, margin) in classification.items()
+                if key in self.errors and near_threshold(getattr(self, key), self.errors[key],
+                                                         threshold, margin)]
+
+    def resolve(self, classification):
+        '''
+        falls back to exact() if any estimate is too close to a threshold of
+        classification to be scored on, see uncertain. Returns True if it did
+        '''
+        if self.uncertain(classification):
+            self.exact()
+            return True
+        return False
 
     def txt(self):
-        return self.text
+        return strip_anchors(self.buf[self.start:self.end])
+
+    def moved(self, buf, position, start, end):
+        '''
+        returns a copy of the section, keeping its analysis, for the
+        same text found at start:end of buf, at another position
+        '''
+        ret = Section.__new__(Section)
+        for name in Section.__slots__:
+            if hasattr(self, name):
+                setattr(ret, name, getattr(self, name))
+        ret.buf = buf
+        ret.pos = position
+        ret.start = start
+        ret.end = end
+        return ret
+
+    text = property(txt)
 
     def len(self):
         return self.length
@@ -72,24 +458,9 @@ class Section(object):
         return self.pos
 
     def access(self, member):
-        if member == UPPER_COUNT:
-            return self.upper_count
-        if member == ANCHOR_COUNT:
-            return self.anchor_count
-        if member == ANCHOR_DENSITY:
-            return self.anchor_density
-        if member == WORD_COUNT:
-            return self.word_count
-        if member == AVG_WORD_LEN:
-            return self.avg_word_len
-        if member == SENTENCE_COUNT:
-            return self.sentence_count
-        if member == AVG_SENTENCE_LEN:
-            return self.avg_sentence_len
-        if member == STOP_WORD_DENSITY:
-            return self.stop_word_density
-        else:
+        if member not in FEATURES:
             raise TypeError("Bad Member")
+        return getattr(self, member)
 
     def __anchor_analysis(self, sec):
         '''
@@ -99,12 +470,12 @@ class Section(object):
         * Density
         '''
         anchor_lengths = 0
-        anchor_texts = re.findall(r"<a.*?>(.*?)</a>", sec, re.IGNORECASE)
-        anchors = len(anchor_texts)
-        anchor_lengths = sum(len(element) for element in anchor_texts)
+        texts = anchor_texts(sec)
+        anchors = len(texts)
+        anchor_lengths = sum(len(element) for element in texts)
             
         # once we have counted them, we can strip them too
-        sec = re.sub(r"</?a.*?>", " ", sec)
+        sec = strip_anchors(sec)
         length = len(sec)
             
         # calculate anchor density
@@ -113,9 +484,9 @@ class Section(object):
 
         self.anchor_count = anchors
         self.anchor_density = density
-        self.text = sec
+        return sec
 
-    def __word_analysis(self):
+    def __word_analysis(self, text):
         '''
         Analysis of words in the section's text.
         Computes:
@@ -124,36 +495,37 @@ class Section(object):
         * Uppercase word count
         * Stop word density
         '''
+        num_words, total_len, upper_count, num_stop_words = word_features(text, self.stop_words)
 
-        words = self.text
-        words = re.sub(r"[^\w\s]", "", words)
-        words = words.split()
-
-        upper_count = 0
-        total_len = 0
-        num_words = len(words)
-
-        total_len = sum(len(word) for word in words)
-        upper_count = sum(1 if word[0].isupper() else 0 for word in words)
-        
         avg_len = 0 if num_words == 0 else float(total_len) / float(num_words)
 
         self.word_count = num_words
         self.avg_word_len = avg_len
         self.upper_count = upper_count
-        
-        num_stop_words = sum(1 if StopWords.is_stop_word(word) else 0 for word in words)
+
         self.stop_word_density = 0 if num_words == 0 else float(num_stop_words / num_words)
 
-    def __sentence_analysis(self):
+    def __estimate(self, text):
+        '''
+        Estimated word analysis, see sample_word_features. The
+        sentence features only need the number of sentence breaks,
+        so they are counted exactly, as __sentence_analysis would
+        '''
+        features, self.errors = sample_word_features(text, self.stop_words)
+        self.word_count, self.avg_word_len, self.upper_count, self.stop_word_density = features
+
+        breaks = text.count(". ") + text.count("? ") + text.count("! ")
+        self.sentence_count = breaks + 1
+        self.avg_sentence_len = float(len(text) - 2 * breaks) / float(breaks + 1)
+
+    def __sentence_analysis(self, text):
         '''
         Sentence analysis. 
         Computes:
         * Number of sentences
         * Average sentence length (in terms of characters, not words)
         '''
-        sentences = self.text
-        sentences = re.sub(r"[?!]", ".", sentences)
+        sentences = re.sub(r"[?!]", ".", text)
         # most all sentences' periods are followed by a space
         # not guaranteed, but vast majority are. if we dont do this
         # things like abbreviations and numerical information will 
@@ -171,52 +543,263 @@ class Section(object):
         self.avg_sentence_len = avg_len
 
 
+class SectionParser(object):
+    '''
+    Incremental section parser. Like html.parser.HTMLParser, the document
+    is passed to feed in pieces as it arrives, and each Section is returned
+    as soon as the tag that ends it has been seen. Sections are the same
+    as Analyzer.parse_sections would produce for the whole document.
+
+        parser = SectionParser(threshold = 100)
+        for chunk in chunks:
+            sections.extend(parser.feed(chunk))
+        sections.extend(parser.close())
+    '''
+    def __init__(self, threshold = 0, skip = None, tokenizer = None, language = 'en', approximate = None):
+        '''
+        Parameters
+        ----------
+        threshold: int
+            minimum length of a section, as in Analyzer.parse_sections
+        skip: function
+            as in Analyzer.parse_sections
+        tokenizer: articleparse.htmlparse.Tokenizer
+            tokenizer to use, one retaining RETAIN_LIST by default
+        language: str
+            language of the document's stop words, as in Analyzer
+        approximate: int
+            length above which word features are estimated, as in Section
+        '''
+        if tokenizer is None:
+            tokenizer = Tokenizer(retain_list = RETAIN_LIST, c_list = CONVERT_LIST)
+        self.stream = TokenStream(tokenizer)
+        self.threshold = threshold
+        self.skip = skip
+        self.stop_words = StopWords.get(language)
+        self.approximate = approximate
+        self.position = 0
+
+    def __sections(self, items):
+        ret = []
+        for item in items:
+            if len(item) > 1 and not (self.skip and self.skip(item)):
+                sec = Section(item, self.position, stop_words = self.stop_words,
+                              approximate = self.approximate)
+                if sec.len() > self.threshold:
+                    ret.append(sec)
+            self.position += 1
+        return ret
+
+    def feed(self, data):
+        '''
+        returns a list of the Sections completed by data
+        '''
+        return self.__sections(self.stream.feed(data))
+
+    def close(self):
+        '''
+        returns a list of the remaining Sections
+        '''
+        return self.__sections(self.stream.close())
+
+
+def iter_sections(f, threshold = 0, chunk_size = 65536, encoding = None, content_type = None):
+    '''
+    Generator over the Sections of a document read from a file
+    object (an open file, socket.makefile(), a response, ...)
+    in chunks, yielding each as soon as it is complete.
+
+    Parameters
+    ----------
+    f: file object
+        opened in text or binary mode. Binary data is decoded with encoding
+        or, if it is not given, the encoding found by articleparse.encoding.sniff
+    threshold: int
+        minimum length of a section
+    chunk_size: int
+        size of each read
+    content_type: str
+        the Content-Type header the document was served with, if known
+    '''
+    parser = SectionParser(threshold)
+    for chunk in decode_chunks(read_chunks(f, chunk_size), encoding, content_type):
+        for sec in parser.feed(chunk):
+            yield sec
+    for sec in parser.close():
+        yield sec
+
+
 class Analyzer(object):
-    def __init__(self, url = None, content = None, fp = None):
-        self.parser = HtmlParse(url=url, content=content, fp=fp)
-        self.parser.remove_non_html()
+    def __init__(self, url = None, content = None, fp = None, metrics = None, doc_id = None,
+                 max_length = None, max_seconds = None, classification = None, tokenizer = None,
+                 content_type = None, language = 'en', neighbor_window = NEIGHBOR_WINDOW,
+                 neighbor_weight = NEIGHBOR_WEIGHT, approximate = None):
+        '''
+        Parameters
+        ----------
+        url, content, fp:
+            where the document comes from, as in HtmlParse
+        metrics: articleparse.metrics.Metrics
+            if set, the time and sizes of each stage are recorded in it
+        doc_id: str
+            identifies the document in metrics, the url or file by default
+        max_length: int
+            only the first max_length characters of the document are parsed
+        max_seconds: float
+            time allowed for parsing, from the first call to parse_sections
+            or extract_article. It is checked between chunks of the document
+            and between sections, and once it has passed parsing stops.
+
+        classification: dict
+            the rules sections are scored by, see default_classification
+        tokenizer: articleparse.htmlparse.Tokenizer
+            tokenizer to use, one retaining RETAIN_LIST by default
+        content_type: str
+            the Content-Type header the document was served with, used
+            to decode bytes content, as in HtmlParse
+        language: str
+            language whose stop words are counted for the stop word density,
+            one of those registered with articleparse.stopwords.StopWords
+        neighbor_window, neighbor_weight:
+            sections on either side that the neighbor classifier looks at,
+            and the points it counts for, see neighbor_points. Off unless
+            neighbor_weight is given
+        approximate: int
+            if set, the word features of sections longer than this are
+            estimated from a sample, see sample_word_features. A section
+            is counted exactly after all when an estimate is within its
+            error bound of a threshold of the classification, so sections
+            are scored as they would be without sampling
+
+        When either budget cuts parsing short, truncated is set and the
+        sections found so far are kept. See articleparse.extractor.Extractor
+        for analyzers that share their classification and tokenizer
+        '''
+        self.max_length = max_length
+        self.max_seconds = max_seconds
+        self.deadline = None
+        self.truncated = False
+        if metrics is None:
+            self.trace = NULL_TRACE
+        else:
+            self.trace = metrics.document(doc_id if doc_id is not None else (url or fp))
+        self.parser = HtmlParse(url=url, content=content, fp=fp, trace=self.trace,
+                                content_type=content_type)
         self.sections = []
-        
+        # offsets of every section in the parsed document, kept by parse_sections
+        self.spans = None
+        self.classification = default_classification() if classification is None else classification
+        self.language = language
+        self.stop_words = StopWords.get(language)
+        self.neighbor_window = neighbor_window
+        self.neighbor_weight = neighbor_weight
+        self.approximate = approximate
+        if tokenizer is None:
+            tokenizer = Tokenizer(retain_list = RETAIN_LIST, c_list = CONVERT_LIST)
+        self.tokenizer = tokenizer
+
+    @classmethod
+    async def from_url_async(cls, url, pool = None):
         '''
-        for each text feature, specify a threshold, a comparison, and a range
-        example: 'word_count': [50, '>', 0.1] means that any word count less than 50 is considered
-        to be boiler plate, anything greater than 50 is content. The range is a percentage 
-        meaning that anything within 10% of the threshold (so in this case +- 5 is the range 
-        45 to 55 inclusive) gets a partial point. A range of 0 means to ignore the range 
-        and not assign partial points
+        Fetches a URL without blocking the event loop
+
+        Parameters
+        ----------
+        url: str
+        pool: articleparse.fetch.ConnectionPool
+            pool to fetch with, so that connections are reused across
+            calls. A new pool is used (and closed) if not given
+
+        Returns
+        -------
+        Analyzer for the fetched page
         '''
-        self.classification = {ANCHOR_DENSITY: [0.333, lt, 0.1],
-                               WORD_COUNT: [40, gt, 0.1],
-                               STOP_WORD_DENSITY: [[.30, .566], bt, 0.02]
-                               }
-        
+        from articleparse.fetch import ConnectionPool
+
+        if pool is None:
+            async with ConnectionPool() as pool:
+                response = await pool.fetch(url)
+        else:
+            response = await pool.fetch(url)
+        # decoded when first needed, from the response's
+        # Content-Type, byte order mark or meta charset
+        return cls(content = response.body, content_type = response.headers.get('content-type'))
+
+
+    # Starts the time budget, if there is one and it has not started
+    def __start(self):
+        if self.max_seconds is not None and self.deadline is None:
+            self.deadline = time.perf_counter() + self.max_seconds
 
+    # returns True, and marks the results truncated, once the time budget is spent
+    def __expired(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.truncated = True
+            return True
+        return False
+
+    # Cuts the in memory document to max_length
+    def __limit(self):
+        if self.max_length is not None and len(self.parser.get_html()) > self.max_length:
+            self.parser.html = self.parser.get_html()[:self.max_length]
+            self.truncated = True
 
     # Parse the HTML into sections
     # these are stored in the list, self.sections
     # 
     # threshold: integer value that specifies the minimum length of a section
+    # skip: optional function of a section's parsed text, returning True for
+    #       sections to drop before they are analyzed
+    #       (see articleparse.boilerplate.BoilerplateIndex.matcher)
     #
     # returns: nothing
-    def parse_sections(self, threshold):
-        self.parser.isolate_body()
-        # retain these tags for analysis
-        self.parser.strip(retain_list = ["div", "/div", "span", "/span", "a", "/a"])
-        # convert spans to div, since they play the same role in our analysis
-        self.parser.convert(["span", "div", "/span", "/div"])
-        self.parser.decode_entities()
+    def parse_sections(self, threshold, skip = None):
+        self.__start()
+        # files that have not been read yet are streamed through the parser
+        # rather than read into memory whole. So are documents with a time
+        # budget, which is checked between chunks
+        if (self.parser.fp is not None and not self.parser.loaded()) or self.deadline is not None:
+            self.__stream_sections(threshold, skip)
+            return
+
+        # retain div, span and anchor tags for analysis, converting
+        # spans to div, then find all sections enclosed by <div> tags
+        self.__limit()
+        spans = self.parser.spans(tokenizer = self.tokenizer)
         html = self.parser.get_parsed()
-        
-        # find all sections enclosed by <div> tags
-        html = re.split("</?div>", html)
+        self.spans = spans
 
-        position = 0
-        for item in html:
-            if len(item) > 1:
-                sec = Section(item, position)
-                if sec.len() > threshold:
-                    self.sections.append(sec)
-            position += 1
+        with self.trace.stage("sections", len(html)) as stage:
+            position = 0
+            for start, end in spans:
+                if end - start > 1 and not (skip and skip(html[start:end])):
+                    sec = Section(html, position, start, end, stop_words = self.stop_words,
+                                  approximate = self.approximate)
+                    if sec.len() > threshold:
+                        self.sections.append(sec)
+                position += 1
+            stage.sections = len(self.sections)
+
+    # Streaming version of parse_sections, which stops at the budgets
+    def __stream_sections(self, threshold, skip):
+        with self.trace.stage("stream") as stage:
+            stream = SectionParser(threshold, skip, self.tokenizer, self.language, self.approximate)
+            expired = False
+            length = 0
+            for chunk in self.parser.stream():
+                if self.max_length is not None and length + len(chunk) > self.max_length:
+                    chunk = chunk[:self.max_length - length]
+                    self.truncated = True
+                length += len(chunk)
+                self.sections.extend(stream.feed(chunk))
+                expired = self.__expired()
+                if expired or self.truncated:
+                    break
+            # out of time, the held back text is left unparsed
+            if not expired:
+                self.sections.extend(stream.close())
+            stage.bytes_in = length
+            stage.sections = len(self.sections)
 
 
     # determine how likely the section is to be a 'main' section,
@@ -233,29 +816,27 @@ class Analyzer(object):
     #
     # returns: points and points possible, both floats
     def __classifier(self, curr):
+        # estimates too close to a threshold are counted exactly first
+        curr.resolve(self.classification)
         score = 0.0
         points_possible = 0.0
         for key, value in self.classification.items():
             points_possible += 1.0
-            attribute = curr.access(key)
             threshold, comparator, margin = value
-           
-            if in_range(attribute, threshold, margin):
-                # we are witin the range of partial points
-                score += 0.5
-            elif comparator(attribute, threshold):
-                score += 1.0
+            score += points(curr.access(key), threshold, comparator, margin)
         return score, points_possible
     
     
     # Since section ordering is significant, this classifier uses ordering
-    # metrics to determine if the section is boilerplate or content
+    # metrics to determine if the section is boilerplate or content: the
+    # individual probabilities of the sections around it, see neighbor_points
     #
-    # curr, prev, next_sec: current, previous and next Sections
+    # probabilities: the individual probability of each section
+    # i: index of the section
     #
-    # returns: a float with the score of the section 
-    def __neighbor_classifier(self, curr, prev, next_sec):
-        return 0.0, 0.0
+    # returns: points and points possible, both floats
+    def __neighbor_classifier(self, probabilities, i):
+        return neighbor_points(probabilities, i, self.neighbor_window, self.neighbor_weight)
 
     '''           
     def __word_feature_classifier(self, prev, curr, next_sec):
@@ -279,22 +860,218 @@ class Analyzer(object):
                 return False
     '''
     
-    # For each section, call the individual classifier and the
-    # neighbor classifier. 
+    # Combines the points of the individual classifier, given for each
+    # section of a run, with those of the neighbor classifier
+    #
+    # individual: list of (points, points possible), one per section
+    # indexes: the sections of the run to score
+    #
+    # returns: list of floats between 0 and 1, one per index
+    def __combine(self, individual, indexes):
+        probabilities = [score / pp if pp else 0.0 for score, pp in individual]
+        ret = []
+        for i in indexes:
+            score1, pp1 = individual[i]
+            score2, pp2 = self.__neighbor_classifier(probabilities, i)
+            ret.append((score1 + score2) / (pp1 + pp2) if pp1 + pp2 else 0.0)
+        return ret
+
+    # Probability that a section is content, from the individual
+    # classifier and the neighbor classifier. It depends on the
+    # sections up to neighbor_window away on either side, and no others
+    #
+    # i: index of the section in self.sections
+    #
+    # returns: a float between 0 and 1
+    def score(self, i):
+        start = max(0, i - self.neighbor_window)
+        window = self.sections[start:i + self.neighbor_window + 1]
+        return self.__combine([self.__classifier(sec) for sec in window], [i - start])[0]
+
+    # Probabilities of every section, in one pass over the sections for
+    # the individual classifier and one for the neighbor classifier, so
+    # time is linear in the number of sections
+    #
+    # returns: list of floats between 0 and 1, one per section
+    def scores(self):
+        individual = [self.__classifier(sec) for sec in self.sections]
+        return self.__combine(individual, range(0, len(individual)))
+
+    # Score each section with the individual classifier and the
+    # neighbor classifier.
+    #
+    # probability: if set, sections less likely than this to be content are
+    # left out, and their text is never materialized
     #
     # returns: list of dictionaries. each dict contains the probability that the text is
     # content and the text
-    def analyze_sections(self):
+    def analyze_sections(self, probability = None):
         ret = []
 
-        for i in range(0, len(self.sections)):
-            score1, pp1 = self.__classifier(self.sections[i])
-            score2, pp2 = self.__neighbor_classifier(self.sections[i], 
-                                                     self.sections[i-1] if i > 0 else None, 
-                                                     self.sections[i+1] if i+1 < len(self.sections) else None)
-            score = (score1 + score2) / (pp1 + pp2)
-            ret.append({'probability':score, 'content':self.sections[i].txt()})
+        with self.trace.stage("classify") as stage:
+            for sec, score in zip(self.sections, self.scores()):
+                if probability is None or score >= probability:
+                    ret.append({'probability':score, 'content':sec.txt()})
+            stage.sections = len(ret)
+            stage.bytes_out = sum(len(sec['content']) for sec in ret)
+        self.trace.finish()
 
         return ret
-            
-            
+
+    # Extract the most likely article body, doing as little work as possible.
+    # Sections are first scored on the features known after anchor analysis
+    # (length, anchor density and count). Those that could not reach
+    # min_probability even with full points on every other feature are
+    # dropped before the word and sentence analysis.
+    #
+    # threshold: minimum section length, as in parse_sections
+    # max_sections: maximum number of sections merged into the article
+    # min_probability: minimum probability of a section in the article
+    #
+    # returns: dictionary with the article's content, its sections' positions
+    # and mean probability, the number of sections skipped early, the
+    # time (in seconds) spent in each stage and whether the budgets (see
+    # __init__) cut the extraction short, in which case the article is
+    # taken from the sections analyzed in time
+    def extract_article(self, threshold = 100, max_sections = None, min_probability = 0.8):
+        timings = {}
+        start = time.perf_counter()
+        self.__start()
+        self.__limit()
+
+        spans = self.parser.spans(tokenizer = self.tokenizer)
+        html = self.parser.get_parsed()
+        now = time.perf_counter()
+        timings['parse'] = now - start
+        start = now
+
+        # cheap features, and an upper bound on each section's score
+        cheap = []
+        expensive = []
+        for key, value in self.classification.items():
+            (cheap if key in CHEAP_FEATURES else expensive).append((key, value))
+        possible = float(len(self.classification))
+
+        candidates = []
+        position = 0
+        for begin, end in spans:
+            if self.deadline is not None and self.__expired():
+                break
+            if end - begin > 1:
+                sec = Section(html, position, begin, end, lazy = True, stop_words = self.stop_words,
+                              approximate = self.approximate)
+                if sec.len() > threshold:
+                    candidates.append((sec, sum(points(sec.access(key), *value) for key, value in cheap)))
+            position += 1
+        # a section is pruned if, with full points on the expensive
+        # features for it and for its neighbors, it still falls short
+        bound = [(score + len(expensive), possible) for _, score in candidates]
+        pruned = [probability < min_probability for probability in
+                  self.__combine(bound, range(0, len(bound)))]
+        now = time.perf_counter()
+        timings['cheap'] = now - start
+        start = now
+
+        # sections that may qualify are analyzed, and so are those around
+        # them, which the neighbor classifier needs the probability of
+        window = self.neighbor_window if self.neighbor_weight else 0
+        needed = [False] * len(candidates)
+        for i in range(0, len(candidates)):
+            if not pruned[i]:
+                for j in range(max(0, i - window), min(len(candidates), i + window + 1)):
+                    needed[j] = True
+        skipped = needed.count(False)
+        for i, (sec, _) in enumerate(candidates):
+            if needed[i]:
+                if self.deadline is not None and self.__expired():
+                    del candidates[i:]
+                    break
+                sec.analyze()
+                sec.resolve(self.classification)
+        now = time.perf_counter()
+        timings['features'] = now - start
+        start = now
+
+        individual = [(score + sum(points(sec.access(key), *value) for key, value in expensive)
+                       if needed[i] else 0.0, possible)
+                      for i, (sec, score) in enumerate(candidates)]
+        kept = [i for i in range(0, len(candidates)) if not pruned[i]]
+        probabilities = dict(zip(kept, self.__combine(individual, kept)))
+
+        # a run is a sequence of qualifying sections, broken by any
+        # section long enough to be considered that does not qualify
+        runs = [[]]
+        for i, (sec, _) in enumerate(candidates):
+            probability = probabilities.get(i)
+            if probability is not None and probability >= min_probability:
+                runs[-1].append((sec, probability))
+            elif runs[-1]:
+                runs.append([])
+        now = time.perf_counter()
+        timings['score'] = now - start
+        start = now
+
+        # the article is the longest window of up to max_sections in any run
+        best = []
+        best_len = 0
+        for run in runs:
+            width = len(run) if max_sections is None else min(max_sections, len(run))
+            total = 0
+            for i in range(0, len(run)):
+                total += run[i][0].len()
+                if i >= width:
+                    total -= run[i - width][0].len()
+                if i >= width - 1 and total > best_len:
+                    best = run[i - width + 1:i + 1]
+                    best_len = total
+
+        ret = {'content': "\n\n".join(sec.txt().strip() for sec, _ in best),
+               'sections': [sec.position() for sec, _ in best],
+               'probability': sum(p for _, p in best) / len(best) if best else 0.0,
+               'skipped': skipped,
+               'truncated': self.truncated}
+        timings['merge'] = time.perf_counter() - start
+        ret['timings'] = timings
+
+        # parse is recorded by the parser itself, as tokenize
+        for stage in ('cheap', 'features', 'score', 'merge'):
+            self.trace.record(stage, timings[stage])
+        self.trace.finish()
+        return ret
+
+    # The nesting of the document's divs, as an
+    # articleparse.tree.SectionTree, built from the offsets parse_sections
+    # kept and reading the features of its sections. Only available when
+    # the sections were not streamed: documents read from a file that
+    # was not loaded, or with a time budget, keep no offsets
+    def tree(self):
+        if self.spans is None:
+            raise ValueError("no section offsets to build the tree from: parse_sections was not run, or "
+                             "the document was streamed (from a file not loaded into memory, or with "
+                             "max_seconds). Load it first, e.g. Extractor.parsed(doc, in_memory = True), "
+                             "without a time budget")
+        from articleparse.tree import SectionTree
+        return SectionTree(self.parser.get_parsed(), self.spans, self.sections)
+
+    # Extract the div that best holds the article: the one whose subtree
+    # has the most words in sections scoring at least probability, less
+    # the words in all its other sections. Subtree totals are computed in
+    # one pass over the tree, however deep the nesting. Raises ValueError
+    # for streamed documents, as tree does
+    #
+    # probability: minimum probability of a content section
+    #
+    # returns: dictionary with the div's content, its node in the tree,
+    # the positions of the content sections in it and its score, the
+    # words of content minus those of the rest
+    def extract_container(self, probability = 0.8):
+        tree = self.tree()
+        content = set(sec.position() for sec, score in zip(self.sections, self.scores())
+                      if score >= probability)
+        words = tree.section_features(self.stop_words)['words']
+        weights = [count if i in content else -count for i, count in enumerate(words)]
+        n, total = tree.best(weights)
+        return {'content': tree.text(n),
+                'node': n,
+                'sections': [i for i in range(tree.first[n], tree.last[n] + 1) if i in content],
+                'score': total}
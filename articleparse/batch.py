@@ -0,0 +1,276 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+
+from articleparse.extractor import Extractor
+
+
+# extractor, and the function of it and a job, used by this
+# worker process, see init_worker
+_extractor = None
+_func = None
+
+
+def extract(doc, threshold = 100, probability = None, cache = None):
+    '''
+    Extracts the sections of a single document
+
+    Parameters
+    ----------
+    doc: str, bytes or dict
+        HTML content, or a dict with one of 'content', 'file' or 'url',
+        as accepted by articleparse.extractor.Extractor.analyze
+    threshold: int
+        minimum section length, as in Analyzer.parse_sections
+    probability: float
+        if set, only sections at least this likely to be content are returned
+    cache: articleparse.cache.ResultCache
+        if set, results are looked up in and added to the cache
+
+    Returns
+    -------
+    list of dicts, as returned by Analyzer.analyze_sections
+    '''
+    return Extractor(threshold = threshold, probability = probability, cache = cache).analyze(doc)
+
+
+def document_id(doc, index):
+    '''
+    the id results of a document are reported under: its 'id', 'url'
+    or 'file' if it is a dict with one, otherwise its index in the batch
+    '''
+    if isinstance(doc, dict):
+        for key in ('id', 'url', 'file'):
+            if doc.get(key) is not None:
+                return doc[key]
+    return index
+
+
+def extract_job(extractor, job):
+    '''
+    Extracts a document, for extract_many and the daemon's workers.
+    Errors are returned rather than raised so that one bad document
+    does not end the batch
+
+    Parameters
+    ----------
+    extractor: articleparse.extractor.Extractor
+    job: (index, doc)
+
+    Returns
+    -------
+    dict as yielded by extract_many
+    '''
+    index, doc = job
+    ret = {'index': index, 'id': document_id(doc, index), 'sections': None, 'error': None}
+    try:
+        ret['sections'] = extractor.analyze(doc)
+    except Exception as e:
+        ret['error'] = "%s: %s" % (type(e).__name__, e)
+    return ret
+
+
+def init_worker(extractor, func):
+    '''
+    Sets the extractor and function run_job uses in this process. The
+    initializer of the process pools of map_jobs, and of any other pool
+    that runs jobs the same way
+
+    Parameters
+    ----------
+    extractor: articleparse.extractor.Extractor
+    func: function
+        of an extractor and a job, defined at the top level of a module
+    '''
+    global _extractor, _func
+    _extractor = extractor
+    _func = func
+
+
+def run_job(job):
+    '''
+    process pool entry point, runs the function given to
+    init_worker on its extractor and job
+    '''
+    return _func(_extractor, job)
+
+
+def map_jobs(func, jobs, extractor, workers = None, chunksize = 1, ordered = True, max_pending = None):
+    '''
+    Runs func(extractor, job) for every job, in a pool of processes that
+    are each sent the extractor once. The pipeline shared by
+    extract_many, the corpus and columnar stages and the tuning store
+
+    Parameters
+    ----------
+    func: function
+        of an extractor and a job. Must be defined at the top level
+        of a module, so that worker processes can find it
+    jobs: iterable
+        consumed lazily, see max_pending
+    extractor: articleparse.extractor.Extractor
+    workers: int
+        number of worker processes, defaults to the number of CPUs.
+        0 runs the jobs in this process
+    chunksize: int
+        number of jobs sent to a worker at a time
+    ordered: bool
+        yield results in the order of the jobs, otherwise as they complete
+    max_pending: int
+        maximum number of jobs read but not yet yielded, which bounds
+        the memory used for arbitrarily many jobs. 4 chunks per worker
+        by default
+
+    Returns
+    -------
+    generator of the results of func
+    '''
+    if workers == 0:
+        for job in jobs:
+            yield func(extractor, job)
+        return
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if max_pending is None:
+        max_pending = 4 * workers * chunksize
+    # the pool reads jobs as fast as it can from a thread of its own, so
+    # it is held back until results are taken. At least a chunk is let
+    # through, since the pool waits for whole chunks
+    window = threading.Semaphore(max(max_pending, chunksize))
+    stopped = []
+    jobs = iter(jobs)
+
+    def throttled():
+        for job in jobs:
+            window.acquire()
+            if stopped:
+                return
+            yield job
+
+    with multiprocessing.Pool(processes = workers, initializer = init_worker,
+                              initargs = (extractor, func)) as pool:
+        if ordered:
+            results = pool.imap(run_job, throttled(), chunksize)
+        else:
+            results = pool.imap_unordered(run_job, throttled(), chunksize)
+        try:
+            for result in results:
+                window.release()
+                yield result
+        finally:
+            # lets the pool's thread out of throttled, so the pool can be shut down
+            stopped.append(True)
+            window.release()
+
+
+def extract_many(docs, workers = None, chunksize = 1, threshold = 100, probability = None, ordered = True,
+                 cache = None, extractor = None, max_pending = None):
+    '''
+    Extracts sections from many documents using a pool of processes
+
+    Parameters
+    ----------
+    docs: iterable
+        documents, as accepted by extract. Consumed lazily, see max_pending
+    workers: int
+        number of worker processes, defaults to the number of CPUs.
+        0 processes the documents in this process
+    chunksize: int
+        number of documents sent to a worker at a time
+    threshold: int
+        minimum section length
+    probability: float
+        if set, only sections at least this likely to be content are returned
+    ordered: bool
+        yield results in input order, otherwise as they complete
+    cache: articleparse.cache.ResultCache
+        results cache. Each worker process gets its own copy, so
+        only the persistent tier is shared between them
+    extractor: articleparse.extractor.Extractor
+        configured pipeline to use instead of threshold, probability
+        and cache. Sent once to each worker process
+    max_pending: int
+        maximum number of documents read from docs but not yet yielded,
+        which bounds the memory used for arbitrarily many documents.
+        4 chunks per worker by default
+
+    Returns
+    -------
+    generator of dicts with the keys:
+        index: position of the document in docs
+        id: the document's id, url or file if it has one, else its index
+        sections: list of sections, None on error
+        error: description of the error, None on success
+    '''
+    if extractor is None:
+        extractor = Extractor(threshold = threshold, probability = probability, cache = cache)
+    return map_jobs(extract_job, enumerate(docs), extractor, workers = workers, chunksize = chunksize,
+                    ordered = ordered, max_pending = max_pending)
+
+
+def read_dir(path):
+    '''
+    documents for every file in a directory, in name order
+    '''
+    for name in sorted(os.listdir(path)):
+        fp = os.path.join(path, name)
+        if os.path.isfile(fp):
+            yield {'id': name, 'file': fp}
+
+
+def read_jsonl(path):
+    '''
+    documents from a JSONL file, one JSON object per line with
+    an optional 'id' and one of 'content', 'file' or 'url'. Records
+    of a larger file also have an 'offset' and 'length' in bytes
+    '''
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def main():
+    '''
+    extracts sections from every document in a directory or JSONL file,
+    writing one JSON object per document to stdout
+    '''
+    parser = argparse.ArgumentParser()
+    g = parser.add_mutually_exclusive_group(required=True)
+    g.add_argument("--dir", help="directory of HTML files to parse")
+    g.add_argument("--jsonl", help="JSONL file of documents to parse")
+    parser.add_argument("--threshold", type=int, help="section length threshold", default=100)
+    parser.add_argument("--probability", type=float,
+                        help="section probability threshold", default=0.8)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)", default=None)
+    parser.add_argument("--chunksize", type=int, help="documents per worker task", default=1)
+    parser.add_argument("--unordered", action="store_true", help="write results as they complete")
+    parser.add_argument("--cache", help="sqlite file to cache results in")
+
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache:
+        from articleparse.cache import ResultCache
+        cache = ResultCache(path = args.cache)
+
+    docs = read_dir(args.dir) if args.dir else read_jsonl(args.jsonl)
+    for result in extract_many(docs, workers = args.workers, chunksize = args.chunksize,
+                               threshold = args.threshold, probability = args.probability,
+                               ordered = not args.unordered, cache = cache):
+        sys.stdout.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import hashlib
+import json
+import urllib.parse
+
+from articleparse.analyzer import Analyzer
+
+
+def fingerprint(section):
+    '''
+    Fingerprint of a section's parsed text (anchors included), which is
+    the same wherever the section appears on a page
+    '''
+    return hashlib.blake2b(section.encode("UTF-8", errors='surrogatepass'), digest_size=8).hexdigest()
+
+
+def domain_of(url):
+    '''
+    the host name of a URL, without any leading www.
+    '''
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class BoilerplateIndex(object):
+    '''
+    Learns, per domain, the sections that keep being classified as
+    boilerplate (navigation, footers, related links, ...). Sections
+    matching a known fingerprint can then be dropped by
+    Analyzer.parse_sections before any feature analysis.
+    '''
+    def __init__(self, min_count = 3, max_probability = 0.5):
+        '''
+        Parameters
+        ----------
+        min_count: int
+            number of pages a section must be classified as boilerplate
+            on before it is considered known boilerplate
+        max_probability: float
+            sections at or below this probability count as boilerplate
+        '''
+        self.min_count = min_count
+        self.max_probability = max_probability
+        self.domains = {}
+
+    def learn(self, domain, html, threshold = 100):
+        '''
+        Analyzes a page from domain and counts its boilerplate sections.
+        A section repeated within the page is counted once.
+
+        Returns
+        -------
+        the page's analyze_sections results
+        '''
+        a = Analyzer(content = html)
+        a.parse_sections(threshold = threshold)
+        ret = a.analyze_sections()
+
+        counts = self.domains.setdefault(domain, {})
+        seen = set()
+        for sec, result in zip(a.sections, ret):
+            if result['probability'] <= self.max_probability:
+                fp = fingerprint(sec.buf[sec.start:sec.end])
+                if fp not in seen:
+                    seen.add(fp)
+                    counts[fp] = counts.get(fp, 0) + 1
+        return ret
+
+    def warm(self, pages, threshold = 100):
+        '''
+        learns from a sample of pages
+
+        Parameters
+        ----------
+        pages: iterable of (url or domain, html)
+        '''
+        for url, html in pages:
+            self.learn(domain_of(url) if "/" in url else url, html, threshold = threshold)
+
+    def is_boilerplate(self, domain, section):
+        '''
+        returns True if the parsed section text is known boilerplate for domain
+        '''
+        return self.domains.get(domain, {}).get(fingerprint(section), 0) >= self.min_count
+
+    def matcher(self, domain):
+        '''
+        returns a function of a parsed section's text that is True for known
+        boilerplate of domain, or None if nothing is known about the domain
+        '''
+        counts = self.domains.get(domain)
+        if not counts:
+            return None
+        known = frozenset(fp for fp, count in counts.items() if count >= self.min_count)
+        if not known:
+            return None
+        return lambda section: fingerprint(section) in known
+
+    def prune(self):
+        '''
+        forgets fingerprints seen fewer than min_count times
+        '''
+        for domain in list(self.domains):
+            counts = dict((fp, n) for fp, n in self.domains[domain].items() if n >= self.min_count)
+            if counts:
+                self.domains[domain] = counts
+            else:
+                del self.domains[domain]
+
+    def save(self, path):
+        '''
+        writes the index as JSON
+        '''
+        with open(path, "w") as f:
+            json.dump({'version': 1,
+                       'min_count': self.min_count,
+                       'max_probability': self.max_probability,
+                       'domains': self.domains}, f)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        reads an index written by save
+        '''
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get('version') != 1:
+            raise ValueError("unsupported boilerplate index version %r" % data.get('version'))
+        ret = cls(min_count = data['min_count'], max_probability = data['max_probability'])
+        ret.domains = data['domains']
+        return ret
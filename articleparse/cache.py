@@ -0,0 +1,204 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+
+from articleparse.analyzer import Analyzer, NEIGHBOR_WINDOW, NEIGHBOR_WEIGHT
+
+
+def _code(code):
+    # what a code object does, without the addresses its repr has
+    return (code.co_code, tuple(_code(c) if hasattr(c, 'co_code') else c for c in code.co_consts),
+            code.co_names)
+
+
+def _name(comparator):
+    '''
+    names a comparator for cache keys. Lambdas and functions defined in
+    other functions share their names, so they are also told apart by
+    their code, the values they close over and their defaults
+    '''
+    ret = "%s.%s" % (getattr(comparator, '__module__', ''),
+                     getattr(comparator, '__qualname__', repr(comparator)))
+    code = getattr(comparator, '__code__', None)
+    if code is not None and ("<lambda>" in ret or "<locals>" in ret):
+        cells = []
+        for cell in comparator.__closure__ or ():
+            try:
+                cells.append(cell.cell_contents)
+            except ValueError:
+                cells.append(None)
+        body = repr((_code(code), cells, comparator.__defaults__))
+        ret += "#" + hashlib.sha256(body.encode("UTF-8", errors='surrogatepass')).hexdigest()
+    return ret
+
+
+def cache_key(html, threshold, classification, probability = None, language = 'en',
+              neighbors = (NEIGHBOR_WINDOW, NEIGHBOR_WEIGHT), approximate = None, fingerprint = None):
+    '''
+    Key for the results of a document: a hash of the HTML, the section
+    threshold, the probability cutoff, the classification, the language
+    of the stop words, the neighbor classifier's (window, weight) and,
+    if set, the length above which word features are estimated and the
+    fingerprint of the rest of the settings, see Extractor.fingerprint
+    '''
+    config = sorted((key, repr(value[0]), _name(value[1]), repr(value[2]))
+                    for key, value in classification.items())
+    h = hashlib.sha256()
+    h.update(html.encode("UTF-8", errors='surrogatepass'))
+    settings = (threshold, probability, config, language, tuple(neighbors))
+    # keys of exact extraction are unchanged
+    if approximate is not None:
+        settings += (approximate,)
+    if fingerprint is not None:
+        settings += (fingerprint,)
+    h.update(repr(settings).encode("UTF-8"))
+    return h.hexdigest()
+
+
+class ResultCache(object):
+    '''
+    Cache of analyze_sections results, keyed on the content of the document
+    and the extraction settings. Recently used results are kept in memory,
+    up to maxsize of them. With a path, results are also stored in an sqlite
+    database, which persists across restarts and can be shared by several
+    processes, each with its own ResultCache.
+
+    Results are held as JSON and every get returns a new copy, so
+    a caller changing a result never changes what others get.
+    '''
+    def __init__(self, maxsize = 1024, path = None):
+        '''
+        Parameters
+        ----------
+        maxsize: int
+            maximum number of results kept in memory
+        path: str
+            sqlite database for the persistent tier, None for memory only
+        '''
+        self.maxsize = maxsize
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout = 30, check_same_thread = False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)")
+            self.db.commit()
+
+    def __getstate__(self):
+        # connections and locks can not be pickled. A copy sent to
+        # another process starts with an empty memory tier and opens
+        # its own connection to the database
+        return {'maxsize': self.maxsize, 'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        '''
+        returns a copy of the cached value for key, or None
+        '''
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                data = self.entries[key]
+            elif self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.disk_hits += 1
+                data = row[0]
+                self.__remember(key, data)
+            else:
+                self.misses += 1
+                return None
+        # decoded outside the lock, a new copy for every caller
+        return json.loads(data)
+
+    def put(self, key, value):
+        '''
+        stores value, which must be JSON serializable. It is copied, so
+        changes made to value afterwards are not seen by get
+        '''
+        data = json.dumps(value)
+        with self.lock:
+            self.__remember(key, data)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                                (key, data))
+                self.db.commit()
+
+    def __remember(self, key, data):
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def extract(self, html, threshold = 100, probability = None):
+        '''
+        analyze_sections results for a document, from the cache if present
+
+        Parameters
+        ----------
+        html: str
+            the document
+        threshold: int
+            minimum section length
+        probability: float
+            if set, sections less likely than this to be content are left out
+        '''
+        a = Analyzer(content = html)
+        key = cache_key(html, threshold, a.classification, probability)
+        ret = self.get(key)
+        if ret is None:
+            a.parse_sections(threshold = threshold)
+            ret = a.analyze_sections(probability = probability)
+            self.put(key, ret)
+        return ret
+
+    def stats(self):
+        '''
+        returns a dict of counters: hits (memory), disk_hits, misses,
+        evictions (from memory) and size (results in memory)
+        '''
+        with self.lock:
+            return {'hits': self.hits,
+                    'disk_hits': self.disk_hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'size': len(self.entries)}
+
+    def clear(self):
+        '''
+        empties both tiers and resets the counters
+        '''
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,63 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import json
+import socket
+
+
+class Client(object):
+    '''
+    Connection to an extraction daemon serving a Unix socket
+    (articleparse serve --socket PATH). It imports nothing else,
+    so short lived programs start quickly:
+
+        with Client("/tmp/articleparse.sock") as client:
+            result = client.extract(html)
+    '''
+    def __init__(self, path, timeout = None):
+        '''
+        Parameters
+        ----------
+        path: str
+            the daemon's socket
+        timeout: float
+            seconds to wait for each result, no limit by default
+        '''
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.rfile = self.sock.makefile("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def extract(self, doc):
+        '''
+        Parameters
+        ----------
+        doc: str or dict
+            HTML content, or a request as accepted by
+            articleparse.server.WarmPool.submit
+
+        Returns
+        -------
+        dict with the document's id, its sections and the error if
+        it could not be extracted, as yielded by extract_many
+        '''
+        if isinstance(doc, str):
+            doc = {'content': doc}
+        self.sock.sendall((json.dumps(doc) + "\n").encode("utf-8"))
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line.decode("utf-8"))
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
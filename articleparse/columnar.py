@@ -0,0 +1,337 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+from articleparse.batch import document_id, map_jobs, read_dir, read_jsonl
+from articleparse.extractor import Extractor
+from articleparse.vectorized import FEATURES, feature_values
+
+
+# columns before and after the features, see schema
+_HEAD = ('document', 'position', 'start', 'end', 'length')
+_TAIL = ('probability', 'content')
+
+# rows and bytes of content held before a record batch is written
+BATCH_ROWS = 65536
+BATCH_BYTES = 64 * 1024 * 1024
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for columnar output")
+
+
+def schema(text = True):
+    '''
+    Schema of the record batches ColumnarWriter writes, a row per section:
+
+    document: the document's id, as a string
+    position: the section's position in the document, as Section.position gives it
+    start, end: offsets of the section in the parsed document, which
+        parser.get_parsed() gives on the Analyzer that
+        Extractor.parsed(doc, in_memory = True) returns for the document
+        with the same Extractor. Null for documents that were streamed,
+        which keep no offsets
+    length: length of the section's text, as Section.len gives it
+    a float64 column for each feature, in vectorized.FEATURES order
+    probability: probability that the section is content
+    content: the section's text, only if text is set
+    '''
+    _require_pyarrow()
+    fields = [pa.field('document', pa.string()),
+              pa.field('position', pa.int32()),
+              pa.field('start', pa.int64()),
+              pa.field('end', pa.int64()),
+              pa.field('length', pa.int32())]
+    fields.extend(pa.field(feature, pa.float64()) for feature in FEATURES)
+    fields.append(pa.field('probability', pa.float64()))
+    if text:
+        fields.append(pa.field('content', pa.large_string()))
+    return pa.schema(fields)
+
+
+def columns(doc_id, analyzer, probability = None, text = True):
+    '''
+    The rows of a document's sections, as lists of plain values by
+    column, without a dict per section. Cheap to send between processes
+
+    Parameters
+    ----------
+    doc_id:
+        the document's id
+    analyzer: articleparse.analyzer.Analyzer
+        with parse_sections already called. Its sections are scored
+        by Analyzer.scores, which also counts estimated features
+        exactly where they are too close to a threshold
+    probability: float
+        if set, sections less likely than this to be content are left out
+    text: bool
+        include each section's text. Without it the rows only point
+        into the parsed document, so a streamed document, whose
+        sections have no offsets in it, raises ValueError
+
+    Returns
+    -------
+    dict of lists, one per column of schema(text)
+    '''
+    # streamed documents keep no offsets, see Analyzer.spans
+    offsets = analyzer.spans is not None
+    if not text and not offsets:
+        raise ValueError("the document was streamed, so its sections have no offsets to write without their text")
+    doc_id = str(doc_id)
+    ret = dict((name, []) for name in _HEAD + tuple(FEATURES) + _TAIL)
+    if not text:
+        del ret['content']
+    for sec, score in zip(analyzer.sections, analyzer.scores()):
+        if probability is not None and score < probability:
+            continue
+        ret['document'].append(doc_id)
+        ret['position'].append(sec.position())
+        ret['start'].append(sec.start if offsets else None)
+        ret['end'].append(sec.end if offsets else None)
+        ret['length'].append(sec.len())
+        for feature, value in zip(FEATURES, feature_values(sec)):
+            ret[feature].append(value)
+        ret['probability'].append(score)
+        if text:
+            ret['content'].append(sec.txt())
+    return ret
+
+
+class ColumnarWriter(object):
+    '''
+    Writes extraction results to an Arrow IPC file or a Parquet file, a
+    row per section, see schema. Rows are held as lists by column and
+    written as a record batch (a row group in Parquet) once batch_rows
+    rows or batch_bytes of content are held, so memory stays bounded
+    however many documents are written. Arrow files can be memory mapped
+    by the stages reading them, see read.
+
+        with ColumnarWriter("sections.arrow") as writer:
+            for doc_id, html in documents:
+                writer.write(doc_id, extractor.parsed(html))
+    '''
+    def __init__(self, path, format = None, text = True, probability = None, batch_rows = BATCH_ROWS,
+                 batch_bytes = BATCH_BYTES, compression = None):
+        '''
+        Parameters
+        ----------
+        path: str
+            file to write
+        format: str
+            'arrow' or 'parquet', by default 'parquet' if path ends in
+            .parquet and 'arrow' otherwise
+        text: bool
+            include each section's text, otherwise only its offsets
+        probability: float
+            if set, sections less likely than this to be content are left out
+        batch_rows: int
+            maximum rows in a record batch
+        batch_bytes: int
+            maximum characters of content in a record batch
+        compression: str
+            as accepted by pyarrow, none for Arrow files and
+            pyarrow's default for Parquet by default
+        '''
+        _require_pyarrow()
+        if format is None:
+            format = 'parquet' if path.endswith('.parquet') else 'arrow'
+        if format not in ('arrow', 'parquet'):
+            raise ValueError("unknown format %r, expected 'arrow' or 'parquet'" % (format,))
+        self.path = path
+        self.format = format
+        self.text = text
+        self.probability = probability
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.schema = schema(text)
+        self.rows = 0
+        self.batches = 0
+        self.__pending = None
+        self.__pending_rows = 0
+        self.__pending_bytes = 0
+        if format == 'parquet':
+            kwargs = {} if compression is None else {'compression': compression}
+            self.__writer = pyarrow.parquet.ParquetWriter(path, self.schema, **kwargs)
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression = compression)
+            self.__writer = pyarrow.ipc.new_file(path, self.schema, options = options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, doc_id, analyzer):
+        '''
+        Adds the rows of a document's sections
+
+        Parameters
+        ----------
+        doc_id:
+            the document's id
+        analyzer: articleparse.analyzer.Analyzer
+            with parse_sections already called, see columns
+        '''
+        self.write_columns(columns(doc_id, analyzer, self.probability, self.text))
+
+    def write_columns(self, cols):
+        '''
+        Adds rows given as lists by column, as columns returns them
+        '''
+        count = len(cols['document'])
+        if not count:
+            return
+        if self.__pending is None:
+            self.__pending = dict((name, []) for name in self.schema.names)
+        for name in self.schema.names:
+            self.__pending[name].extend(cols[name])
+        self.__pending_rows += count
+        if self.text:
+            self.__pending_bytes += sum(map(len, cols['content']))
+        if self.__pending_rows >= self.batch_rows or self.__pending_bytes >= self.batch_bytes:
+            self.flush()
+
+    def flush(self):
+        '''
+        writes the rows held as record batches of at most batch_rows rows
+        '''
+        if not self.__pending_rows:
+            return
+        pending = self.__pending
+        self.__pending = None
+        for start in range(0, self.__pending_rows, self.batch_rows):
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(pending[name][start:start + self.batch_rows], type = field.type)
+                 for name, field in zip(self.schema.names, self.schema)], schema = self.schema)
+            self.__writer.write_batch(batch)
+            self.batches += 1
+        self.rows += self.__pending_rows
+        self.__pending_rows = 0
+        self.__pending_bytes = 0
+
+    def close(self):
+        if self.__writer is not None:
+            self.flush()
+            self.__writer.close()
+            self.__writer = None
+
+
+def read(path):
+    '''
+    returns the rows written by a ColumnarWriter as a pyarrow.Table.
+    Arrow files are memory mapped rather than read
+    '''
+    _require_pyarrow()
+    if path.endswith('.parquet'):
+        return pyarrow.parquet.read_table(path, memory_map = True)
+    return pyarrow.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def _rows(extractor, job):
+    '''
+    the columns of a document, or its error so that one
+    bad document does not end the batch, see write_many
+    '''
+    index, doc, text = job
+    doc_id = document_id(doc, index)
+    try:
+        a = extractor.parsed(doc, in_memory = True)
+        return doc_id, columns(doc_id, a, extractor.probability, text), None
+    except Exception as e:
+        return doc_id, None, "%s: %s" % (type(e).__name__, e)
+
+
+def write_many(docs, path, extractor = None, workers = 0, chunksize = 16, **kwargs):
+    '''
+    Extracts the sections of many documents into a columnar file,
+    see ColumnarWriter. Workers send back the columns of each
+    document, never a dict per section. Files are read whole rather
+    than streamed, so that every section has its offsets
+
+    Parameters
+    ----------
+    docs: iterable
+        documents, as accepted by articleparse.extractor.Extractor.analyze
+    path: str
+        file to write
+    extractor: articleparse.extractor.Extractor
+        configured pipeline, whose probability decides which sections
+        are written. Extractor() by default. Without text, it may not
+        have a time budget, which streams documents (see columns)
+    workers: int
+        processes to parse the documents with, 0 parses them in this
+        process, see articleparse.batch.map_jobs
+    chunksize: int
+        documents sent to a worker at a time
+    kwargs:
+        format, text, batch_rows, batch_bytes and compression, as in ColumnarWriter
+
+    Returns
+    -------
+    dict with the number of documents, rows and record batches written,
+    and the errors, a list of (id, error) for documents that failed
+    '''
+    if extractor is None:
+        extractor = Extractor()
+    text = kwargs.get('text', True)
+    if not text and extractor.max_seconds is not None:
+        raise ValueError("documents with a time budget are streamed and their sections have no offsets, "
+                         "so they can only be written with their text")
+    jobs = ((index, doc, text) for index, doc in enumerate(docs))
+    ret = {'documents': 0, 'rows': 0, 'batches': 0, 'errors': []}
+    with ColumnarWriter(path, **kwargs) as writer:
+        for doc_id, cols, error in map_jobs(_rows, jobs, extractor, workers = workers, chunksize = chunksize):
+            ret['documents'] += 1
+            if error is not None:
+                ret['errors'].append((doc_id, error))
+            else:
+                writer.write_columns(cols)
+    ret['rows'] = writer.rows
+    ret['batches'] = writer.batches
+    return ret
+
+
+def main():
+    '''
+    extracts sections from every document in a directory or JSONL
+    file into an Arrow or Parquet file
+    '''
+    parser = argparse.ArgumentParser()
+    g = parser.add_mutually_exclusive_group(required=True)
+    g.add_argument("--dir", help="directory of HTML files to parse")
+    g.add_argument("--jsonl", help="JSONL file of documents to parse")
+    parser.add_argument("--output", required=True, help="file to write, Parquet if it ends in .parquet")
+    parser.add_argument("--format", choices=["arrow", "parquet"], help="output format (default: by extension)")
+    parser.add_argument("--threshold", type=int, help="section length threshold", default=100)
+    parser.add_argument("--probability", type=float, help="section probability threshold", default=None)
+    parser.add_argument("--no-text", action="store_true", help="write section offsets only, not their text")
+    parser.add_argument("--workers", type=int, help="worker processes", default=0)
+    parser.add_argument("--batch-rows", type=int, help="rows per record batch", default=BATCH_ROWS)
+    args = parser.parse_args()
+
+    docs = read_dir(args.dir) if args.dir else read_jsonl(args.jsonl)
+    result = write_many(docs, args.output, Extractor(threshold = args.threshold, probability = args.probability),
+                        workers = args.workers, format = args.format, text = not args.no_text,
+                        batch_rows = args.batch_rows)
+    for doc_id, error in result['errors']:
+        sys.stderr.write("%s: %s\n" % (doc_id, error))
+    sys.stdout.write("%d rows of %d documents in %d batches, %d errors\n" %
+                     (result['rows'], result['documents'], result['batches'], len(result['errors'])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import zlib
+
+from articleparse.batch import extract_many
+from articleparse.extractor import Extractor
+
+
+class CorpusError(Exception):
+    pass
+
+
+def _gzip_members(f, offset = 0, chunk_size = 65536):
+    '''
+    Generator over the members of a file of concatenated gzip members,
+    as (offset of the member in the file, offset of its end, decompressed member)
+    '''
+    f.seek(offset)
+    buf = b""
+    pos = offset
+    while True:
+        start = pos
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        out = []
+        while not decompressor.eof:
+            if not buf:
+                buf = f.read(chunk_size)
+                if not buf:
+                    if pos == start:
+                        return
+                    raise CorpusError("truncated gzip member at offset %d" % start)
+            try:
+                out.append(decompressor.decompress(buf))
+            except zlib.error as e:
+                raise CorpusError("bad gzip member at offset %d: %s" % (start, e))
+            pos += len(buf) - len(decompressor.unused_data)
+            buf = decompressor.unused_data
+        yield start, pos, b"".join(out)
+
+
+def _warc_record(f):
+    '''
+    reads the WARC record at the current position of f, returning its
+    offset, its headers (with lower case names) and its content block,
+    or None at the end of f
+    '''
+    # records are followed by two line breaks
+    line = f.readline()
+    while line in (b"\r\n", b"\n"):
+        line = f.readline()
+    if not line:
+        return None
+    offset = f.tell() - len(line)
+    if not line.startswith(b"WARC/"):
+        raise CorpusError("no WARC record at offset %d" % offset)
+
+    headers = {}
+    while True:
+        line = f.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("utf-8", errors='replace').partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise CorpusError("bad Content-Length in the WARC record at offset %d" % offset)
+    block = f.read(length)
+    if len(block) < length:
+        raise CorpusError("truncated WARC record at offset %d" % offset)
+    return offset, headers, block
+
+
+def _dechunk(body):
+    # the body of a response with Transfer-Encoding: chunked
+    ret = []
+    pos = 0
+    while True:
+        end = body.find(b"\r\n", pos)
+        if end < 0:
+            break
+        try:
+            size = int(body[pos:end].split(b";")[0], 16)
+        except ValueError:
+            break
+        if size == 0:
+            break
+        ret.append(body[end + 2:end + 2 + size])
+        pos = end + 4 + size
+    return b"".join(ret)
+
+
+def _http_response(block):
+    '''
+    returns the status, headers (with lower case names) and
+    body of an HTTP response recorded in a WARC record
+    '''
+    head, sep, body = block.partition(b"\r\n\r\n")
+    if not sep:
+        head, sep, body = block.partition(b"\n\n")
+    lines = head.decode("latin-1").splitlines()
+    try:
+        status = int(lines[0].split()[1])
+    except (IndexError, ValueError):
+        status = None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+    encoding = headers.get('content-encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        wbits = 16 + zlib.MAX_WBITS if encoding != 'deflate' else (
+            zlib.MAX_WBITS if body[:1] == b"\x78" else -zlib.MAX_WBITS)
+        try:
+            body = zlib.decompress(body, wbits)
+        except zlib.error:
+            # left as it is, the analysis finds no sections in it
+            pass
+    return status, headers, body
+
+
+def _html(content_type):
+    return not content_type or "html" in content_type.lower()
+
+
+def read_warc(path, offset = 0):
+    '''
+    Generator over the HTML pages of a WARC file, plain or with each
+    record compressed as a gzip member (.warc.gz). Only one record is
+    held in memory at a time. Response records are read for their HTTP
+    body, resource records as they are. Other records, pages that are not
+    HTML and responses that are not successful are skipped.
+
+    Parameters
+    ----------
+    path: str
+    offset: int
+        position in the file to start from, that of a record as given in
+        the 'offset' of an earlier record
+
+    Returns
+    -------
+    generator of dicts with the keys id (WARC-Record-ID), url, content
+    (bytes), content_type, input (path), offset and size, the bytes of
+    the file read since the last page, skipped records included
+    '''
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+        if compressed:
+            records = ((start, end, io.BytesIO(member)) for start, end, member in _gzip_members(f, offset))
+        else:
+            f.seek(offset)
+            records = [(None, None, f)]
+
+        read = offset
+        for start, end, stream in records:
+            while True:
+                record = _warc_record(stream)
+                if record is None:
+                    break
+                position, headers, block = record
+                if start is not None:
+                    # a compressed record is found again from its member's offset
+                    position = start
+
+                kind = headers.get('warc-type')
+                if kind == 'response':
+                    status, http_headers, content = _http_response(block)
+                    if status is None or not 200 <= status < 300:
+                        continue
+                    content_type = http_headers.get('content-type')
+                elif kind == 'resource':
+                    content = block
+                    content_type = headers.get('content-type')
+                else:
+                    continue
+                if not _html(content_type):
+                    continue
+                # a compressed record is read once its whole member is
+                done = stream.tell() if end is None else end
+                yield {'id': headers.get('warc-record-id'), 'url': headers.get('warc-target-uri'),
+                       'content': content, 'content_type': content_type,
+                       'input': path, 'offset': position, 'size': done - read}
+                read = done
+
+
+def read_jsonl(path, offset = 0):
+    '''
+    Generator over the documents of a JSONL file, one JSON object per line
+    with an optional 'id' and 'url' and the page as 'content'
+
+    Parameters
+    ----------
+    path: str
+    offset: int
+        position in the file to start from, that of a line as given
+        in the 'offset' of an earlier document
+
+    Returns
+    -------
+    generator of dicts with the keys id, url, content, content_type,
+    input (path), offset and size, the bytes of the file read since
+    the last document, blank lines included
+    '''
+    with open(path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        read = offset
+        for line in f:
+            start = position
+            position += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                doc = json.loads(line.decode("utf-8"))
+            except ValueError as e:
+                raise CorpusError("bad JSON at offset %d of %s: %s" % (start, path, e))
+            yield {'id': doc.get('id'), 'url': doc.get('url'), 'content': doc.get('content'),
+                   'content_type': doc.get('content_type'), 'input': path, 'offset': start,
+                   'size': position - read}
+            read = position
+
+
+def read_corpus(path, offset = 0):
+    '''
+    documents from a WARC or JSONL file, told apart by the extension
+    (.jsonl or .json for JSONL)
+    '''
+    if path.endswith((".jsonl", ".json")):
+        return read_jsonl(path, offset)
+    return read_warc(path, offset)
+
+
+class Progress(object):
+    '''
+    Reports the documents and bytes of input processed, and the
+    rate they are processed at, at most every interval seconds
+    '''
+    def __init__(self, stream = sys.stderr, interval = 1.0):
+        self.stream = stream
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.documents = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def update(self, size, error = False):
+        '''
+        counts a document, of size bytes of input
+        '''
+        self.documents += 1
+        self.bytes += size
+        self.errors += 1 if error else 0
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.report()
+
+    def report(self, final = False):
+        '''
+        writes the totals over the last report, ending the line if final
+        '''
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        self.stream.write("\r%d documents, %d errors, %.1f docs/s, %.2f MB/s%s" %
+                          (self.documents, self.errors, self.documents / elapsed,
+                           self.bytes / elapsed / 1e6, "\n" if final else ""))
+        self.stream.flush()
+
+
+def extract_corpus(docs, output, extractor = None, workers = None, chunksize = 1, progress = None):
+    '''
+    Extracts the sections of a stream of documents, as read by read_corpus,
+    writing one JSON object per document to output in input order. Memory
+    use is bounded however many documents there are.
+
+    Parameters
+    ----------
+    docs: iterable of dicts
+        as read by read_warc, read_jsonl or read_corpus
+    output: file object
+        opened for writing text
+    extractor: articleparse.extractor.Extractor
+        the pipeline to use, one with its defaults if not given
+    workers, chunksize: int
+        as in articleparse.batch.extract_many
+    progress: Progress
+        updated as each document is written
+
+    Returns
+    -------
+    number of documents written. Each line has the keys id, url, input and
+    offset of the document, and sections and error as in extract_many
+    '''
+    if extractor is None:
+        extractor = Extractor()
+    # what is written with each result, kept only while it is pending
+    pending = {}
+
+    def jobs():
+        for index, doc in enumerate(docs):
+            # the bytes of input the reader gives, which the content is not
+            # once decoded, otherwise the length of the content
+            size = doc.get('size')
+            if size is None:
+                size = len(doc.get('content') or "")
+            pending[index] = (doc.get('id'), doc.get('url'), doc.get('input'), doc.get('offset'), size)
+            yield {'id': doc.get('id'), 'content': doc.get('content'), 'content_type': doc.get('content_type')}
+
+    count = 0
+    for result in extract_many(jobs(), workers = workers, chunksize = chunksize, extractor = extractor):
+        doc_id, url, path, offset, size = pending.pop(result['index'])
+        output.write(json.dumps({'id': doc_id, 'url': url, 'input': path, 'offset': offset,
+                                 'sections': result['sections'], 'error': result['error']}) + "\n")
+        count += 1
+        if progress is not None:
+            progress.update(size, result['error'] is not None)
+    return count
+
+
+def last_written(path):
+    '''
+    returns the last complete line of an output file written by
+    extract_corpus, as a dict, or None. A partly written last line,
+    as left by an interrupted run, is removed from the file
+    '''
+    with open(path, "rb+") as f:
+        pos = f.seek(0, os.SEEK_END)
+        # read back from the end until tail holds the whole of the last
+        # complete line: its newline and the one before it, or the start
+        tail = b""
+        size = 4096
+        while pos > 0:
+            last = tail.rfind(b"\n")
+            if last >= 0 and tail.rfind(b"\n", 0, last) >= 0:
+                break
+            size = min(size * 2, pos)
+            pos -= size
+            f.seek(pos)
+            tail = f.read(size) + tail
+        last = tail.rfind(b"\n")
+        ret = None
+        if last >= 0:
+            # parsed before anything is cut, so a bad line leaves the file alone
+            ret = json.loads(tail[tail.rfind(b"\n", 0, last) + 1:last].decode("utf-8"))
+        if last + 1 < len(tail):
+            f.truncate(pos + last + 1)
+        return ret
+
+
+def main():
+    '''
+    extracts the sections of every page in WARC and JSONL files,
+    writing one JSON object per page
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="WARC (.warc, .warc.gz) or JSONL (.jsonl) files")
+    parser.add_argument("--output", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--threshold", type=int, help="section length threshold", default=100)
+    parser.add_argument("--probability", type=float, help="section probability threshold", default=0.8)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)", default=None)
+    parser.add_argument("--chunksize", type=int, help="documents per worker task", default=1)
+    parser.add_argument("--max-seconds", type=float, help="time allowed per document", default=None)
+    parser.add_argument("--offset", type=int, default=0,
+                        help="position in the first input to start from, that of a record")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue after the last document written to --output")
+    parser.add_argument("--progress", action="store_true", help="report throughput on stderr")
+    args = parser.parse_args()
+
+    inputs = list(args.inputs)
+    offset = args.offset
+    skip = None
+    if args.resume:
+        if not args.output:
+            parser.error("--resume requires --output")
+        last = last_written(args.output) if os.path.exists(args.output) else None
+        if last is not None:
+            if last['input'] not in inputs:
+                parser.error("%s was written from %s, which is not an input" % (args.output, last['input']))
+            inputs = inputs[inputs.index(last['input']):]
+            offset = last['offset']
+            skip = (last['input'], last['offset'])
+
+    def docs():
+        for i, path in enumerate(inputs):
+            for doc in read_corpus(path, offset if i == 0 else 0):
+                # the last document written is read again, to find where it ends
+                if skip is not None and (doc['input'], doc['offset']) == skip:
+                    continue
+                yield doc
+
+    extractor = Extractor(threshold = args.threshold, probability = args.probability,
+                          max_seconds = args.max_seconds)
+    progress = Progress() if args.progress else None
+    output = open(args.output, "a" if args.resume else "w") if args.output else sys.stdout
+    try:
+        extract_corpus(docs(), output, extractor = extractor, workers = args.workers,
+                       chunksize = args.chunksize, progress = progress)
+    finally:
+        if progress is not None:
+            progress.report(final = True)
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
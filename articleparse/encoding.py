@@ -0,0 +1,259 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import codecs
+import re
+
+
+'''
+Byte order marks, UTF-32 first since its little
+endian mark starts with the UTF-16 one
+'''
+BOMS = [(codecs.BOM_UTF32_LE, "utf-32-le"), (codecs.BOM_UTF32_BE, "utf-32-be"),
+        (codecs.BOM_UTF8, "utf-8"),
+        (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")]
+
+'''
+Encodings that browsers, and so pages, use in place of the one
+they name: pages labelled latin-1 or ASCII are written in cp1252
+'''
+ALIASES = {'ascii': 'cp1252', 'iso8859-1': 'cp1252', 'iso8859-9': 'cp1254', 'tis-620': 'cp874'}
+
+# number of bytes searched for a <meta> charset, as in HTML5
+PRESCAN = 1024
+
+DEFAULT = "utf-8"
+
+_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+_META_RE = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+
+# the elements articleparse.htmlparse.Tokenizer matches across other
+# tags, with the offset after the tag's '<' where a closer may start
+_CLOSERS = [(b"!--", b"-->", 4), (b"style", b"</style>", 6), (b"script", b"</script>", 7)]
+
+_SEARCHES = {}
+
+
+def lookup(label):
+    '''
+    returns the name of the codec for an encoding label
+    (str or bytes), or None if there is no such codec
+    '''
+    if not label:
+        return None
+    if not isinstance(label, str):
+        label = bytes(label).decode("ascii", errors='ignore')
+    try:
+        name = codecs.lookup(label.strip()).name
+    except LookupError:
+        return None
+    return ALIASES.get(name, name)
+
+
+def charset(content_type):
+    '''
+    returns the charset parameter of a Content-Type header, or None
+    '''
+    match = _CHARSET_RE.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def ascii_compatible(encoding):
+    '''
+    returns True if ASCII text, and so every tag, is encoded as
+    itself in encoding, so that tags can be found in the raw bytes
+    '''
+    return not encoding.startswith(("utf-16", "utf-32", "utf-7", "iso2022", "hz"))
+
+
+def bom(data):
+    '''
+    returns the encoding given by the byte order mark data starts
+    with and the length of the mark, or (None, 0) if there is none
+    '''
+    for mark, name in BOMS:
+        if data[:len(mark)] == mark:
+            return name, len(mark)
+    return None, 0
+
+
+def sniff(data, content_type = None, default = DEFAULT):
+    '''
+    Determines the encoding of an HTML document, from the first of:
+    its byte order mark, the charset of its Content-Type header and a
+    <meta> charset in its first PRESCAN bytes
+
+    Parameters
+    ----------
+    data: bytes, bytearray, memoryview or mmap
+        the document, or at least its first PRESCAN bytes
+    content_type: str
+        the Content-Type header the document was served with
+    default: str
+        the encoding used if none is found
+
+    Returns
+    -------
+    (codec name, length of the byte order mark)
+    '''
+    name, length = bom(data)
+    if name is not None:
+        return name, length
+
+    name = lookup(charset(content_type))
+    if name is not None:
+        return name, 0
+
+    match = _META_RE.search(data, 0, PRESCAN)
+    if match:
+        name = lookup(match.group(1))
+        if name is not None:
+            # a page that can be read far enough to find its meta
+            # tag is not in a two or four byte encoding
+            return ("utf-8" if name.startswith(("utf-16", "utf-32")) else name), 0
+    return lookup(default) or DEFAULT, 0
+
+
+def _find(data, sub, start):
+    # memoryviews have no find method
+    if isinstance(data, memoryview):
+        if sub not in _SEARCHES:
+            _SEARCHES[sub] = re.compile(re.escape(sub))
+        match = _SEARCHES[sub].search(data, start)
+        return match.start() if match else -1
+    return data.find(sub, start)
+
+
+def body_offset(data):
+    '''
+    returns the offset of the tag that articleparse.htmlparse.Tokenizer
+    takes for the start of the body, or 0 if there is none or it is
+    preceded by an end of body tag. The tags before it are found as the
+    Tokenizer finds them, but without decoding data or scanning comments,
+    scripts and styles a character at a time.
+    data must be in an ASCII compatible encoding
+    '''
+    candidate = _find(data, b"<body", 0)
+    # once a closer is missing it is missing from every later position
+    missing = set()
+    pos = 0
+    while candidate >= 0:
+        lt = _find(data, b"<", pos)
+        if lt == candidate:
+            return lt if _find(data, b">", lt) >= 0 else 0
+        end = -1
+        for opener, closer, offset in _CLOSERS:
+            if data[lt + 1:lt + 1 + len(opener)] == opener:
+                if closer not in missing:
+                    end = _find(data, closer, lt + offset)
+                    if end < 0:
+                        missing.add(closer)
+                    else:
+                        end += len(closer)
+                break
+        if end < 0:
+            # any other tag, and any comment, style or script that is not closed
+            end = _find(data, b">", lt)
+            if end < 0:
+                # so nothing after lt is a tag
+                return 0
+            if data[lt + 1:lt + 6] == b"/body":
+                return 0
+            end += 1
+        pos = end
+        if pos > candidate:
+            # the first "<body" is inside a comment, script or tag
+            candidate = _find(data, b"<body", pos)
+    return 0
+
+
+def decode(data, encoding = None, content_type = None, default = DEFAULT, body_only = False):
+    '''
+    Decodes an HTML document
+
+    Parameters
+    ----------
+    data: bytes, bytearray, memoryview or mmap
+    encoding: str
+        the document's encoding, sniffed (see sniff) if not given.
+        A byte order mark takes precedence over it
+    content_type: str
+        the Content-Type header the document was served with
+    default: str
+        the encoding used if none is found
+    body_only: bool
+        if True, everything before the body tag is left undecoded, as it
+        would be discarded by articleparse.htmlparse.Tokenizer
+
+    Returns
+    -------
+    str
+    '''
+    if encoding is None:
+        encoding, start = sniff(data, content_type, default)
+    else:
+        name, start = bom(data)
+        encoding = name or lookup(encoding) or DEFAULT
+    if body_only and ascii_compatible(encoding):
+        start = max(start, body_offset(data))
+    # views are released explicitly, so that a mapped file can be closed
+    with memoryview(data) as view:
+        with view[start:] as body:
+            return codecs.decode(body, encoding, errors='ignore')
+
+
+def decode_chunks(chunks, encoding = None, content_type = None, default = DEFAULT):
+    '''
+    Generator decoding a document read in chunks. The encoding is
+    determined, as in decode, from the first PRESCAN bytes. str chunks,
+    as read from a file opened in text mode, are passed through as they are
+    '''
+    head = b""
+    decoder = None
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            yield chunk
+            continue
+        if decoder is None:
+            head += chunk
+            if len(head) < PRESCAN:
+                continue
+            decoder, chunk = _decoder(head, encoding, content_type, default)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    if decoder is None:
+        if not head:
+            return
+        decoder, head = _decoder(head, encoding, content_type, default)
+        text = decoder.decode(head, final=True)
+    else:
+        text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _decoder(head, encoding, content_type, default):
+    # returns an incremental decoder for a document starting
+    # with head, and head without its byte order mark
+    if encoding is None:
+        encoding, length = sniff(head, content_type, default)
+    else:
+        name, length = bom(head)
+        encoding = name or lookup(encoding) or DEFAULT
+    return codecs.getincrementaldecoder(encoding)(errors='ignore'), head[length:]
+
+
+def read_chunks(f, chunk_size = 65536):
+    '''
+    Generator over the chunks read from a file object until its end
+    '''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
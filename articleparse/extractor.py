@@ -0,0 +1,224 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import copy
+import hashlib
+
+from articleparse.analyzer import (Analyzer, RETAIN_LIST, CONVERT_LIST, NEIGHBOR_WINDOW, NEIGHBOR_WEIGHT,
+                                   default_classification)
+from articleparse.cache import cache_key
+from articleparse.htmlparse import Tokenizer, ENTITIES, NUMERIC_ENTITIES
+from articleparse.mapped import read_record
+from articleparse.stopwords import StopWords
+
+
+class Extractor(object):
+    '''
+    An extraction pipeline configured once and used for any number of
+    documents. The tokenizer's patterns and the classification are built
+    when the Extractor is created, and shared by every document, so
+    nothing is set up per document.
+
+    An Extractor is never modified once created and can be shared between
+    threads. It pickles as its configuration alone, so it is cheap to
+    send to worker processes, which compile their own copy.
+
+        extractor = Extractor(threshold = 100, probability = 0.8)
+        for html in documents:
+            sections = extractor.analyze(html)
+    '''
+    def __init__(self, threshold = 100, probability = None, classification = None,
+                 retain_list = RETAIN_LIST, c_list = CONVERT_LIST, entities = ENTITIES,
+                 numeric_entities = NUMERIC_ENTITIES, max_length = None, max_seconds = None,
+                 cache = None, language = 'en', neighbor_window = NEIGHBOR_WINDOW,
+                 neighbor_weight = NEIGHBOR_WEIGHT, approximate = None):
+        '''
+        Parameters
+        ----------
+        threshold: int
+            minimum section length, as in Analyzer.parse_sections
+        probability: float
+            if set, sections less likely than this to be content are left out
+        classification: dict
+            as in Analyzer, articleparse.analyzer.default_classification() by default.
+            Copied, so later changes to the dict passed in have no effect
+        retain_list, c_list: list of str
+            tags kept for analysis, and the conversions between them,
+            as in articleparse.htmlparse.Tokenizer
+        entities, numeric_entities: dict
+            entity tables, as in articleparse.htmlparse.Tokenizer. Only
+            tables other than the defaults are copied, and pickled
+        max_length, max_seconds:
+            per document budgets, as in Analyzer
+        cache: articleparse.cache.ResultCache
+            if set, analyze results are looked up in and added to the cache
+        language: str
+            language of the documents' stop words, as in Analyzer
+        neighbor_window, neighbor_weight:
+            the neighbor classifier's settings, as in Analyzer
+        approximate: int
+            length above which sections' word features are estimated, as in Analyzer
+        '''
+        self.threshold = threshold
+        self.probability = probability
+        self.classification = copy.deepcopy(default_classification() if classification is None
+                                            else classification)
+        self.retain_list = list(retain_list)
+        self.c_list = list(c_list)
+        # None for the default tables, which the tokenizer has ready
+        # to use, so they are never copied, pickled or prepared again
+        self.entities = None if entities is ENTITIES else dict(entities)
+        self.numeric_entities = None if numeric_entities is NUMERIC_ENTITIES else dict(numeric_entities)
+        self.max_length = max_length
+        self.max_seconds = max_seconds
+        self.cache = cache
+        self.language = language
+        self.neighbor_window = neighbor_window
+        self.neighbor_weight = neighbor_weight
+        self.approximate = approximate
+        self._fingerprint = None
+        # fails here, rather than for each document, if there is no such language
+        StopWords.get(language)
+
+        self.tokenizer = self.__tokenizer()
+
+    def __tokenizer(self):
+        tokenizer = Tokenizer(self.retain_list, self.c_list,
+                              ENTITIES if self.entities is None else self.entities,
+                              NUMERIC_ENTITIES if self.numeric_entities is None else self.numeric_entities)
+        tokenizer.precompile()
+        return tokenizer
+
+    def __getstate__(self):
+        # the compiled tokenizer is rebuilt rather than pickled
+        state = self.__dict__.copy()
+        del state['tokenizer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.tokenizer = self.__tokenizer()
+
+    def fingerprint(self):
+        '''
+        a hash of the settings that change results other than those
+        articleparse.cache.cache_key takes itself: the tags retained and
+        converted, the entity tables and the budgets. analyze adds it to
+        cache keys, so extractors configured differently never share
+        results through a cache
+        '''
+        if self._fingerprint is None:
+            # the default tables are None
+            settings = (self.retain_list, self.c_list,
+                        None if self.entities is None else sorted(self.entities.items()),
+                        None if self.numeric_entities is None else sorted(self.numeric_entities.items()),
+                        self.max_length, self.max_seconds)
+            self._fingerprint = hashlib.sha256(repr(settings).encode("UTF-8", errors='surrogatepass')).hexdigest()
+        return self._fingerprint
+
+    def analyzer(self, url = None, content = None, fp = None, metrics = None, doc_id = None,
+                 content_type = None):
+        '''
+        returns an Analyzer for a document, sharing this
+        Extractor's tokenizer, classification and budgets
+        '''
+        return Analyzer(url = url, content = content, fp = fp, metrics = metrics, doc_id = doc_id,
+                        max_length = self.max_length, max_seconds = self.max_seconds,
+                        classification = self.classification, tokenizer = self.tokenizer,
+                        content_type = content_type, language = self.language,
+                        neighbor_window = self.neighbor_window, neighbor_weight = self.neighbor_weight,
+                        approximate = self.approximate)
+
+    def __analyzer(self, doc, metrics):
+        if isinstance(doc, dict):
+            if doc.get('offset') is not None:
+                # a record of a larger file, decoded from the file's mapping
+                content = read_record(doc['file'], doc['offset'], doc.get('length'),
+                                      content_type = doc.get('content_type'))
+                return self.analyzer(content = content, metrics = metrics, doc_id = doc.get('id'))
+            return self.analyzer(url = doc.get('url'), content = doc.get('content'), fp = doc.get('file'),
+                                 metrics = metrics, doc_id = doc.get('id'),
+                                 content_type = doc.get('content_type'))
+        return self.analyzer(content = doc, metrics = metrics)
+
+    def sections(self, doc, skip = None):
+        '''
+        returns the document's Sections, as Analyzer.parse_sections finds them
+
+        Parameters
+        ----------
+        doc: str, bytes or dict
+            HTML content, or a dict with one of 'content', 'file' or 'url'
+            and optionally the 'content_type' bytes content was served with.
+            A dict with 'offset' (and 'length') is a record of the file,
+            see articleparse.mapped.documents
+        skip: function
+            as in Analyzer.parse_sections
+        '''
+        a = self.__analyzer(doc, None)
+        a.parse_sections(self.threshold, skip = skip)
+        return a.sections
+
+    def parsed(self, doc, metrics = None, in_memory = False):
+        '''
+        returns the document's Analyzer with parse_sections run, whose
+        sections and scores can be read without a dict per section
+
+        Parameters
+        ----------
+        doc: str, bytes or dict
+            as accepted by analyze
+        metrics: articleparse.metrics.Metrics
+        in_memory: bool
+            read a file whole rather than streaming it, so the analyzer
+            keeps the offsets of its sections (Analyzer.spans). Documents
+            with a time budget are streamed all the same
+        '''
+        a = self.__analyzer(doc, metrics)
+        if in_memory:
+            # decodes the document, which is then parsed in memory
+            a.parser.html
+        a.parse_sections(self.threshold)
+        return a
+
+    def analyze(self, doc, metrics = None):
+        '''
+        Parameters
+        ----------
+        doc: str, bytes or dict
+            HTML content, or a dict with one of 'content', 'file' or 'url'
+            and optionally the 'content_type' bytes content was served with.
+            A dict with 'offset' (and 'length') is a record of the file,
+            see articleparse.mapped.documents
+        metrics: articleparse.metrics.Metrics
+
+        Returns
+        -------
+        list of dicts, as returned by Analyzer.analyze_sections
+        '''
+        a = self.__analyzer(doc, metrics)
+        if self.cache is not None:
+            key = cache_key(a.parser.get_html(), self.threshold, self.classification, self.probability,
+                            self.language, (self.neighbor_window, self.neighbor_weight), self.approximate,
+                            self.fingerprint())
+            ret = self.cache.get(key)
+            if ret is None:
+                a.parse_sections(self.threshold)
+                ret = a.analyze_sections(probability = self.probability)
+                # results cut short by a budget are not cached
+                if not a.truncated:
+                    self.cache.put(key, ret)
+            return ret
+        a.parse_sections(self.threshold)
+        return a.analyze_sections(probability = self.probability)
+
+    def extract_article(self, doc, max_sections = None, min_probability = 0.8, metrics = None):
+        '''
+        returns the document's article, as Analyzer.extract_article does
+        '''
+        return self.__analyzer(doc, metrics).extract_article(threshold = self.threshold,
+                                                             max_sections = max_sections,
+                                                             min_probability = min_probability)
@@ -0,0 +1,334 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import asyncio
+import ssl
+import urllib.parse
+import zlib
+
+from articleparse.encoding import decode, sniff
+
+
+REDIRECTS = (301, 302, 303, 307, 308)
+# statuses whose responses never have a body
+BODILESS = (204, 304)
+
+
+class FetchError(Exception):
+    pass
+
+
+class StatusError(FetchError):
+    '''
+    the final response, once redirects are followed, was not a success (2xx)
+    '''
+    def __init__(self, response):
+        FetchError.__init__(self, "HTTP %d fetching %s" % (response.status, response.url))
+        self.status = response.status
+        self.response = response
+
+
+class EmptyResponse(Exception):
+    pass
+
+
+class Response(object):
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def charset(self):
+        '''
+        returns the encoding of the body, see articleparse.encoding.sniff
+        '''
+        return sniff(self.body, self.headers.get('content-type'))[0]
+
+    def text(self):
+        return decode(self.body, content_type = self.headers.get('content-type'))
+
+
+class ConnectionPool(object):
+    '''
+    Asynchronous HTTP/1.1 client that keeps connections
+    alive and reuses them for requests to the same host
+    '''
+    def __init__(self, limit_per_host = 4, timeout = 30.0, max_bytes = 10 * 1024 * 1024,
+                 max_redirects = 5, user_agent = "articleparse"):
+        '''
+        Parameters
+        ----------
+        limit_per_host: int
+            maximum number of concurrent connections to one host
+        timeout: float
+            seconds allowed for a request, including redirects
+        max_bytes: int
+            maximum size of a response body, before and after decompression
+        max_redirects: int
+            redirects followed before giving up
+        user_agent: str
+            User-Agent header sent with each request
+        '''
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_redirects = max_redirects
+        self.user_agent = user_agent
+        self.idle = {}
+        self.limits = {}
+        self.ssl_context = ssl.create_default_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''
+        closes all idle connections
+        '''
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+    async def fetch(self, url, method = "GET"):
+        '''
+        Requests a URL, following redirects
+
+        Parameters
+        ----------
+        url: str
+        method: str
+            GET, or HEAD for the headers alone
+
+        Returns
+        -------
+        Response, with the body decompressed. A response that is not
+        a success (2xx) once redirects are followed raises StatusError
+        '''
+        try:
+            return await asyncio.wait_for(self.__fetch(url, method), self.timeout)
+        except asyncio.TimeoutError:
+            raise FetchError("timed out fetching %s" % url)
+
+    async def __fetch(self, url, method):
+        for _ in range(self.max_redirects + 1):
+            response = await self.__request(url, method)
+            location = response.headers.get('location')
+            if response.status not in REDIRECTS or not location:
+                if not 200 <= response.status < 300:
+                    raise StatusError(response)
+                return response
+            url = urllib.parse.urljoin(url, location)
+        raise FetchError("too many redirects fetching %s" % url)
+
+    async def __request(self, url, method):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise FetchError("unsupported URL %s" % url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        host = parts.hostname if parts.port is None else "%s:%d" % (parts.hostname, parts.port)
+        request = ("%s %s HTTP/1.1\r\n"
+                   "Host: %s\r\n"
+                   "User-Agent: %s\r\n"
+                   "Accept: text/html,*/*\r\n"
+                   "Accept-Encoding: gzip, deflate\r\n"
+                   "Connection: keep-alive\r\n\r\n" % (method, path, host, self.user_agent)).encode("latin-1")
+
+        if key not in self.limits:
+            self.limits[key] = asyncio.Semaphore(self.limit_per_host)
+
+        async with self.limits[key]:
+            idle = self.idle.setdefault(key, [])
+            while idle:
+                reader, writer = idle.pop()
+                try:
+                    return await self.__exchange(key, reader, writer, request, url, method)
+                except (ConnectionError, asyncio.IncompleteReadError, EmptyResponse):
+                    # the server closed the idle connection, try the next one
+                    writer.close()
+
+            reader, writer = await asyncio.open_connection(parts.hostname, port,
+                                                           ssl=self.ssl_context if parts.scheme == 'https' else None)
+            try:
+                return await self.__exchange(key, reader, writer, request, url, method)
+            except EmptyResponse:
+                raise FetchError("empty response from %s" % url)
+
+    async def __exchange(self, key, reader, writer, request, url, method):
+        reuse = False
+        try:
+            writer.write(request)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise EmptyResponse()
+            try:
+                version, status = status_line.decode("latin-1").split(None, 2)[:2]
+                status = int(status)
+            except ValueError:
+                raise FetchError("bad status line from %s" % url)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if method == "HEAD" or status in BODILESS or 100 <= status < 200:
+                # no body, whatever length the headers give
+                body, complete = b"", True
+            else:
+                body, complete = await self.__read_body(reader, headers, url)
+            body = self.__decode(body, headers.get('content-encoding', '').lower(), url)
+
+            reuse = complete and headers.get('connection', '').lower() != 'close' and version != "HTTP/1.0"
+            return Response(url, status, headers, body)
+        finally:
+            if reuse:
+                self.idle[key].append((reader, writer))
+            else:
+                writer.close()
+
+    async def __read_body(self, reader, headers, url):
+        '''
+        returns the raw body and whether the connection can be reused
+        '''
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            size = 0
+            while True:
+                line = await reader.readline()
+                try:
+                    length = int(line.split(b";")[0], 16)
+                except ValueError:
+                    raise FetchError("bad chunk from %s" % url)
+                if length == 0:
+                    # trailers end with an empty line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks), True
+                size += length
+                if size > self.max_bytes:
+                    raise FetchError("response from %s exceeds %d bytes" % (url, self.max_bytes))
+                chunks.append(await reader.readexactly(length))
+                await reader.readline()
+
+        if 'content-length' in headers:
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise FetchError("bad content length from %s" % url)
+            if length > self.max_bytes:
+                raise FetchError("response from %s exceeds %d bytes" % (url, self.max_bytes))
+            return await reader.readexactly(length), True
+
+        # no length given, the body ends when the connection closes
+        chunks = []
+        size = 0
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return b"".join(chunks), False
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise FetchError("response from %s exceeds %d bytes" % (url, self.max_bytes))
+            chunks.append(chunk)
+
+    def __decode(self, body, encoding, url):
+        if encoding in ('gzip', 'x-gzip'):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            # servers disagree on whether deflate has a zlib header
+            wbits = zlib.MAX_WBITS if body[:1] == b"\x78" else -zlib.MAX_WBITS
+            decompressor = zlib.decompressobj(wbits)
+        else:
+            return body
+
+        try:
+            ret = decompressor.decompress(body, self.max_bytes)
+        except zlib.error as e:
+            raise FetchError("bad %s body from %s: %s" % (encoding, url, e))
+        if decompressor.unconsumed_tail:
+            raise FetchError("response from %s exceeds %d bytes" % (url, self.max_bytes))
+        return ret
+
+
+async def fetch_and_extract(urls, concurrency = 10, threshold = 100, probability = None,
+                            pool = None, executor = None):
+    '''
+    Fetches and extracts many URLs concurrently. Parsing runs in an
+    executor so that it overlaps with fetching
+
+    Parameters
+    ----------
+    urls: iterable of str
+    concurrency: int
+        maximum number of requests in flight
+    threshold: int
+        minimum section length
+    probability: float
+        if set, only sections at least this likely to be content are returned
+    pool: ConnectionPool
+        pool to fetch with, a new one is created (and closed) if not given
+    executor: concurrent.futures.Executor
+        runs the extraction, the event loop's default executor if not given.
+        A ProcessPoolExecutor avoids contention for the GIL
+
+    Returns
+    -------
+    async generator of dicts, as they complete, with the keys
+    index, id, sections and error as in batch.extract_many
+    '''
+    from articleparse.extractor import Extractor
+
+    # one extractor is shared by every document and executor thread
+    extractor = Extractor(threshold = threshold, probability = probability)
+    loop = asyncio.get_running_loop()
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool()
+
+    async def one(index, url):
+        ret = {'index': index, 'id': url, 'sections': None, 'error': None}
+        try:
+            response = await pool.fetch(url)
+            # the body is decoded in the executor too
+            doc = {'content': response.body, 'content_type': response.headers.get('content-type')}
+            ret['sections'] = await loop.run_in_executor(executor, extractor.analyze, doc)
+        except Exception as e:
+            ret['error'] = "%s: %s" % (type(e).__name__, e)
+        return ret
+
+    # only concurrency documents are in flight at a time,
+    # so urls can be an arbitrarily long iterator
+    pending = set()
+    try:
+        for index, url in enumerate(urls):
+            pending.add(asyncio.ensure_future(one(index, url)))
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if own_pool:
+            pool.close()
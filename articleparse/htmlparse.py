@@ -5,46 +5,779 @@ Please see the LICENSE file for the terms and conditions
 associated with this software.
 """
 
+from html.entities import html5
 import re
-import urllib.request as urllib
+
+from articleparse.encoding import decode, decode_chunks, read_chunks
+from articleparse.mapped import read_record
+from articleparse.metrics import NULL_TRACE
+
+
+TEXT = 'text'
+TAG = 'tag'
+
+'''
+Entities understood by the decoder: every HTML5 named character reference
+(those that require a semicolon), with the replacements the decoder has
+always made, which reduce some typographic characters to ASCII, taking
+precedence. Numeric references are keyed by code point so leading zeros
+are accepted; other code points decode to their character.
+'''
+ENTITIES = dict((name[:-1], value) for name, value in html5.items() if name.endswith(";"))
+ENTITIES.update({'quot': "\"",
+                 'apos': "'",
+                 'amp': "&",
+                 'lt': "<",
+                 'gt': ">",
+                 'nbsp': " ",
+                 'copy': "Copyright",
+                 'mdash': "-",
+                 'ndash': "-",
+                 'rsquo': "'",
+                 'ldquo': "\"",
+                 'rdquo': "\"",
+                 'tab': " ",
+                 'Eacute': "e",
+                 'eacute': "e"
+                 })
+
+NUMERIC_ENTITIES = {13: "",
+                    34: "\"",
+                    39: "'",
+                    38: "&",
+                    60: "<",
+                    62: ">",
+                    160: " ",
+                    169: "Copyright",
+                    8212: "-",
+                    8211: "-",
+                    8217: "'",
+                    8220: "\"",
+                    8221: "\"",
+                    9: " ",
+                    201: "e",
+                    233: "e"
+                    }
+
+_ENTITY_RE = re.compile(r"&(#?\w+);")
+_NUMERIC_RE = re.compile(r"#(?:([0-9]+)|[xX]([0-9a-fA-F]+))$")
+
+
+def code_point(name):
+    '''
+    returns the code point of a numeric reference's name (#8217 or
+    #x2019), or None if name is not a numeric reference
+    '''
+    match = _NUMERIC_RE.match(name)
+    if match is None:
+        return None
+    if match.group(1) is not None:
+        return int(match.group(1))
+    return int(match.group(2), 16)
+
+
+def character(code):
+    '''
+    returns the text of a numeric reference to code, as HTML5 decodes it:
+    invalid code points become U+FFFD and 0x80 to 0x9F are taken as
+    windows-1252. The noncharacters used as internal markers are dropped
+    '''
+    if code == 0 or 0xD800 <= code <= 0xDFFF or code > 0x10FFFF:
+        return "\ufffd"
+    if 0x80 <= code <= 0x9F:
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            return chr(code)
+    if 0xFDD0 <= code <= 0xFDEF:
+        return ""
+    return chr(code)
+
+
+class _Decoder(dict):
+    '''
+    Replacement text by reference name, filled in as names are first
+    seen. Unknown references map to themselves
+    '''
+    def __init__(self, entities, numeric_entities):
+        self.entities = entities
+        self.numeric_entities = numeric_entities
+
+    def __missing__(self, name):
+        if name[0] == "#":
+            code = code_point(name)
+            value = None if code is None else self.numeric_entities.get(code, None)
+            if value is None:
+                value = "&%s;" % name if code is None else character(code)
+        else:
+            value = self.entities.get(name)
+            if value is None:
+                value = "&%s;" % name
+        self[name] = value
+        return value
+
+
+def unescape(text, entities = ENTITIES, numeric_entities = NUMERIC_ENTITIES):
+    '''
+    Decodes the named, decimal and hex character references in text in
+    one pass. Each reference is a dict lookup, so the cost does not depend
+    on the size of the tables. Unknown references are left as they are.
+
+    Parameters
+    ----------
+    entities: dict
+        entity name to replacement text
+    numeric_entities: dict
+        code point to replacement text, for code points not decoded
+        to their own character
+    '''
+    if "&" not in text:
+        return text
+    # split alternates text and reference names, which are replaced
+    # through a per call memo, so each distinct name is decoded once
+    parts = _ENTITY_RE.split(text)
+    parts[1::2] = map(_Decoder(entities, numeric_entities).__getitem__, parts[1::2])
+    return "".join(parts)
+
+
+# noncharacters are reserved for internal use and never appear in
+# interchanged text, so the tokenizer uses them as markers
+_BODY_START = "\ufdd0"
+_BODY_END = "\ufdd1"
+_LT = "\ufdd2"
+_WHITESPACE = ("\t\n\x0b\x0c\r \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+               "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+_PROTECT = dict((ord(c), chr(0xfdd3 + i)) for i, c in enumerate(_WHITESPACE))
+_PROTECT[ord("<")] = _LT
+# decoded text that is empty, such as a reference to a marker, holds its
+# place until whitespace is condensed, just as the undecoded reference
+# does in the multi-pass pipeline, so the whitespace around it is kept
+_EMPTY = "\ufdef"
+_RESTORE = dict((v, chr(k)) for k, v in _PROTECT.items() if v != _LT)
+_RESTORE[_EMPTY] = ""
+_RESTORE_RE = re.compile("[\ufdd3-\ufdef]")
+_NONCHAR_RE = re.compile("[\ufdd0-\ufdef]")
+
+
+def _protect(table):
+    return dict((k, v.translate(_PROTECT) or _EMPTY) for k, v in table.items())
+
+
+# the default tables are protected once, not by every Tokenizer
+_PROTECTED_ENTITIES = _protect(ENTITIES)
+_PROTECTED_NUMERIC_ENTITIES = _protect(NUMERIC_ENTITIES)
+
+# constructs whose regex alternatives scan ahead for their end, with
+# the bit for each in Tokenizer's patterns
+_COMMENT = 1
+_STYLE = 2
+_SCRIPT = 4
+_CLOSABLE = _COMMENT | _STYLE | _SCRIPT
+_OPENERS = (("<!--", "-->"), ("<style", "</style>"), ("<script", "</script>"))
+_CANDIDATE_RE = re.compile("[<&]")
+
+
+def _bounds(html):
+    '''
+    Positions from which the token regex can no longer match a tag,
+    comment, style or script, as the '>' or closer it needs does not
+    appear again. An opener at or after its bound makes the regex scan
+    to the end of the document before failing, as does a '<' after the
+    last '>', which is quadratic when repeated.
+
+    Returns
+    -------
+    None if every '<' and opener is before its bound, otherwise
+    (last '>', comment bound, style bound, script bound)
+    '''
+    last_gt = html.rfind(">")
+    safe = html.rfind("<") <= last_gt
+    ret = [last_gt]
+    for opener, closer in _OPENERS:
+        # an opener is closed by a closer starting after the opener ends
+        bound = html.rfind(closer) - len(opener) + 1
+        ret.append(bound)
+        if safe:
+            last = html.rfind(opener)
+            safe = last < 0 or last < bound
+    return None if safe else tuple(ret)
+
+
+class Tokenizer(object):
+    '''
+    Single pass HTML scanner. Performs the work of HtmlParse's
+    remove_non_html, isolate_body, strip, convert and decode_entities
+    with one regex scan of the document, instead of rewriting it for
+    every tag, entity and step.
+
+    Differences from the multi-pass pipeline are limited to malformed
+    input: entities are decoded exactly once (&amp;lt; becomes &lt;, not <),
+    decoded text never forms a tag, a document without a body tag
+    is kept whole rather than truncated, and a '<' in text that starts
+    no tag is stripped up to the next '>' of the document, where the
+    pipeline strips it up to the next '>' left once scripts, comments,
+    retained tags and the end of the body are gone, if there is one.
+    '''
+    def __init__(self, retain_list = [], c_list = [], entities = ENTITIES,
+                 numeric_entities = NUMERIC_ENTITIES):
+        '''
+        Parameters
+        ----------
+        retain_list: list of str
+            tags that are kept, as in HtmlParse.strip
+        c_list: list of str
+            a conversion mapping, as in HtmlParse.convert
+        entities: dict
+            entity name to replacement text
+        numeric_entities: dict
+            code point to replacement text
+        '''
+        self.retain_list = list(retain_list)
+        self.c_list = list(c_list)
+
+        # a tag is retained if it starts with a tag in the retain list,
+        # earlier entries taking precedence. Conversions are applied in
+        # order to the retained name, just as successive convert passes would
+        self.retain = {}
+        for tag in self.retain_list:
+            name = tag
+            for i in range(0, len(self.c_list), 2):
+                if name.startswith(self.c_list[i]):
+                    name = self.c_list[i + 1]
+            self.retain[tag] = name
+        self.names = set(self.retain.values())
+
+        # decoded text is protected from whitespace condensing and
+        # from forming tags until the document has been split
+        self.entities = _PROTECTED_ENTITIES if entities is ENTITIES else _protect(entities)
+        self.numeric_entities = (_PROTECTED_NUMERIC_ENTITIES if numeric_entities is NUMERIC_ENTITIES
+                                 else _protect(numeric_entities))
+
+        self.retained = "|".join(re.escape(tag) for tag in self.retain_list) or "(?!)"
+        self.patterns = {}
+        self.splitters = {}
+        self.token_re = self.__pattern(_CLOSABLE)
+        self.tag_re = re.compile("<(%s)>" % "|".join(re.escape(n) for n in sorted(self.names)) or "(?!)")
+        self.tags = dict((k, "<" + v + ">") for k, v in self.retain.items())
+
+    def precompile(self, split_list = ["div", "/div"]):
+        '''
+        Compiles every pattern the tokenizer may need up front, rather than
+        on first use, so that a tokenizer shared between threads is never
+        modified while in use
+        '''
+        for closable in range(0, _CLOSABLE + 1):
+            self.__pattern(closable)
+        self.splitter(split_list)
+
+    def splitter(self, split_list):
+        '''
+        returns the compiled regex matching the tags in split_list
+        '''
+        key = tuple(split_list)
+        if key not in self.splitters:
+            self.splitters[key] = re.compile("|".join("<%s>" % re.escape(tag) for tag in split_list))
+        return self.splitters[key]
+
+    def _substitute(self, html, body):
+        '''
+        First stage of the scan: replaces tags, entities, scripts, styles
+        and comments and removes line breaks. The first body tag and end of
+        body become the markers in body, which are cleared once used.
+        '''
+        if _NONCHAR_RE.search(html):
+            html = _NONCHAR_RE.sub("", html)
+
+        tags = self.tags
+        entities = self.entities
+        numeric_entities = self.numeric_entities
+
+        def replace(match):
+            index = match.lastindex
+            if index is None or index == 2:
+                return " "
+            if index == 3:
+                return tags[match.group(3)]
+            if index == 6:
+                name = match.group(6)
+                if name[0] == "#":
+                    code = code_point(name)
+                    if code is None:
+                        return match.group(0)
+                    value = numeric_entities.get(code)
+                    if value is None:
+                        return character(code).translate(_PROTECT) or _EMPTY
+                    return value
+                value = entities.get(name)
+                return match.group(0) if value is None else value
+            if index == 1:
+                return ""
+            # only the first body tag and the first end of body count
+            marker = body[index - 4]
+            body[index - 4] = " "
+            return marker
+
+        bounds = _bounds(html)
+        if bounds is None:
+            parsed = self.token_re.sub(replace, html)
+        else:
+            parsed = self.__guarded_sub(replace, html, bounds)
+        if "\n" in parsed:
+            parsed = parsed.replace("\n", "")
+        if "\r" in parsed:
+            parsed = parsed.replace("\r", "")
+        return parsed
+
+    def __pattern(self, closable):
+        '''
+        the token regex, with the comment, style and script alternatives
+        left out unless their bit is set in closable
+        '''
+        if closable not in self.patterns:
+            # every alternative starts with a literal '<' or '&' outside of
+            # any group, which lets the regex engine skip through plain text.
+            # Groups: 1 comment or style, 2 script, 3 retained tag, 4 body,
+            # 5 end of body, 6 entity. Any other tag matches no group
+            first = [alt for bit, alt in ((_COMMENT, "!--.*?--"), (_STYLE, "style.*?</style"))
+                     if closable & bit]
+            script = "script.*?</script" if closable & _SCRIPT else "(?!)"
+            self.patterns[closable] = re.compile(r"<(?:(%s)|(%s)|(%s)[^>]*|(body)[^>]*|(/body)[^>]*|[^>]*)>|"
+                                                 r"&(#?\w+);" % ("|".join(first) or "(?!)", script,
+                                                                  self.retained), re.S)
+        return self.patterns[closable]
+
+    def __guarded_sub(self, replace, html, bounds):
+        '''
+        token_re.sub(replace, html) for documents where it could take
+        quadratic time. Each '<' and '&' is matched on its own, with a
+        pattern that leaves out the alternatives that can not match from
+        there, so that no attempt scans to the end of the document and fails
+        '''
+        last_gt, comment, style, script = bounds
+        ret = []
+        done = 0
+        pos = 0
+        while True:
+            match = _CANDIDATE_RE.search(html, pos)
+            if match is None:
+                break
+            pos = match.start()
+            if html[pos] == "<":
+                if pos >= last_gt:
+                    # no tag can end after here, only entities are left
+                    pos += 1
+                    continue
+                closable = ((_COMMENT if pos < comment else 0) | (_STYLE if pos < style else 0) |
+                            (_SCRIPT if pos < script else 0))
+                match = self.__pattern(closable).match(html, pos)
+            else:
+                match = self.token_re.match(html, pos)
+            if match is None:
+                pos += 1
+                continue
+            ret.append(html[done:pos])
+            ret.append(replace(match))
+            done = pos = match.end()
+        ret.append(html[done:])
+        return "".join(ret)
+
+    @staticmethod
+    def _condense(parsed):
+        '''
+        Second stage of the scan: condenses whitespace and restores
+        whitespace from decoded entities, and removes the placeholders of
+        those that decoded to nothing. Decoded '<' stays protected
+        '''
+        condensed = " ".join(parsed.split())
+        if parsed and parsed[0].isspace():
+            condensed = " " + condensed
+        if parsed and parsed[-1].isspace() and condensed != " ":
+            condensed += " "
+
+        return _RESTORE_RE.sub(lambda match: _RESTORE[match.group()], condensed)
+
+    def __scan(self, html):
+        '''
+        returns the parsed document with decoded '<' still protected
+        '''
+        parsed = self._substitute(html, [_BODY_START, _BODY_END])
+
+        # isolate the body, if there is one
+        start = parsed.find(_BODY_START)
+        end = parsed.find(_BODY_END, start + 1)
+        if start >= 0:
+            parsed = parsed[start + 1:] if end < 0 else parsed[start + 1:end]
+        elif end >= 0:
+            parsed = parsed.replace(_BODY_END, " ")
+
+        return self._condense(parsed)
+
+    def parse(self, html):
+        '''
+        returns the parsed document as a string, as the
+        multi-pass pipeline would have left it
+        '''
+        return self.__scan(html).replace(_LT, "<")
+
+    def sections(self, html, split_list = ["div", "/div"]):
+        '''
+        Splits the parsed document on the tags in split_list.
+        Equivalent to re.split on the parsed document, with
+        one (possibly empty) string per section.
+        '''
+        buf, spans = self.spans(html, split_list)
+        return [buf[start:end] for start, end in spans]
+
+    def spans(self, html, split_list = ["div", "/div"]):
+        '''
+        Like sections, but without copying each section out of
+        the parsed document.
+
+        Returns
+        -------
+        (parsed document, list of (start, end) offsets of each section)
+        '''
+        scanned = self.__scan(html)
+        spans = []
+        start = 0
+        for match in self.splitter(split_list).finditer(scanned):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(scanned)))
+        # restoring '<' replaces one character with another, so offsets hold
+        return scanned.replace(_LT, "<"), spans
+
+    def tokens(self, html):
+        '''
+        Generator over the document's (TEXT, str) and (TAG, name) tokens.
+        Text is whitespace condensed and entity decoded, tags are the
+        retained (and converted) tag names. Everything else is dropped.
+        '''
+        items = self.tag_re.split(self.__scan(html))
+        for i in range(0, len(items)):
+            if i % 2:
+                yield TAG, items[i]
+            elif items[i]:
+                yield TEXT, items[i].replace(_LT, "<")
+
+
+_PARTIAL_ENTITY_RE = re.compile(r"&#?\w*$")
+
+
+def _safe_cut(html):
+    '''
+    returns the length of the longest prefix of html that scans the
+    same no matter what text follows it: it ends before any unfinished
+    tag, entity, comment, script or style
+    '''
+    # any '<' after the last '>' may yet start a tag
+    cut = html.find("<", html.rfind(">") + 1)
+    if cut < 0:
+        cut = len(html)
+
+    amp = html.rfind("&")
+    if 0 <= amp < cut and _PARTIAL_ENTITY_RE.match(html, amp):
+        cut = amp
+
+    # a comment, script or style opened after the last one closed is
+    # unfinished. Cutting before it may leave another one, or a tag
+    # that the opener was part of, unfinished, so repeat
+    changed = True
+    while changed:
+        changed = False
+        for opener, closer in _OPENERS:
+            start = html.find(opener, max(html.rfind(closer, 0, cut) - len(opener) + 1, 0), cut)
+            if start >= 0:
+                cut = start
+                changed = True
+        if changed:
+            start = html.find("<", html.rfind(">", 0, cut) + 1, cut)
+            if start >= 0:
+                cut = start
+    return cut
+
+
+_CLOSER_RES = dict((opener, (re.compile(re.escape(closer)), len(closer) - 1))
+                   for opener, closer in _OPENERS)
+_GT_RE = re.compile(">")
+_NON_WORD_RE = re.compile(r"\W")
+_ENTITY_TAIL_RE = re.compile(r"&#?\w*")
+
+
+def _waiting_for(tail):
+    '''
+    What the unscanned tail left by _safe_cut is waiting for. Until a
+    match of the returned regex appears in text appended to the tail,
+    _safe_cut would return 0 again, so there is no need to call it.
+
+    Returns
+    -------
+    (regex, number of characters of the tail a match can start in),
+    or None if the tail must be cut again after every addition
+    '''
+    if not tail:
+        return None
+    for opener, waiting in _CLOSER_RES.items():
+        if tail.startswith(opener) and waiting[0].search(tail) is None:
+            return waiting
+    if tail[0] == "<" and ">" not in tail:
+        return _GT_RE, 0
+    if _ENTITY_TAIL_RE.fullmatch(tail):
+        return _NON_WORD_RE, 0
+    return None
+
+
+class TokenStream(object):
+    '''
+    Incremental version of Tokenizer.sections, in the style of
+    html.parser.HTMLParser: the document is passed to feed as it
+    arrives and each section is returned as soon as the tag that ends
+    it has been seen.
+
+    Text before the body tag is held until the body starts, or until
+    close if the document turns out to have no body tag.
+    '''
+    def __init__(self, tokenizer, split_list = ["div", "/div"]):
+        self.tokenizer = tokenizer
+        self.split_re = tokenizer.splitter(split_list)
+        self.body = [_BODY_START, _BODY_END]
+        # raw HTML not yet safe to scan: the tail left by the last cut,
+        # and the data fed since, held until what the tail is waiting for
+        # (an end of script, a '>', ...) arrives
+        self.tail = ""
+        self.held = []
+        self.waiting = None
+        self.edge = ""
+        # scanned text before the body tag
+        self.head = []
+        # scanned text of the section in progress
+        self.pending = []
+        self.in_body = False
+        self.done = False
+
+    def feed(self, data):
+        '''
+        Parameters
+        ----------
+        data: str
+            the next part of the document
+
+        Returns
+        -------
+        list of str, the sections completed by data
+        '''
+        if self.done:
+            return []
+        if self.waiting is not None:
+            # only the new data is searched, so a tail that stays unsafe
+            # for many calls does not make streaming quadratic
+            regex, overlap = self.waiting
+            edge = self.edge + data
+            if regex.search(edge) is None:
+                self.held.append(data)
+                self.edge = edge[-overlap:] if overlap else ""
+                return []
+            self.held.append(data)
+            data = "".join(self.held)
+            self.held = []
+        html = self.tail + data
+        cut = _safe_cut(html)
+        self.tail = html[cut:]
+        self.waiting = _waiting_for(self.tail)
+        if self.waiting is not None:
+            overlap = self.waiting[1]
+            self.edge = self.tail[-overlap:] if overlap else ""
+        return self.__process(self.tokenizer._substitute(html[:cut], self.body))
+
+    def close(self):
+        '''
+        Returns
+        -------
+        list of str, the remaining sections
+        '''
+        ret = []
+        if not self.done:
+            tail = self.tail + "".join(self.held)
+            ret = self.__process(self.tokenizer._substitute(tail, self.body))
+            self.tail = ""
+            self.held = []
+            self.waiting = None
+        if not self.in_body and not self.done:
+            # no body tag, so the whole document is the body
+            self.in_body = True
+            ret = self.__process("".join(self.head).replace(_BODY_END, " "))
+            self.head = []
+        if self.in_body:
+            ret.append(self.__finish("".join(self.pending)))
+            self.pending = []
+        self.done = True
+        return ret
+
+    def __finish(self, section):
+        return self.tokenizer._condense(section).replace(_LT, "<")
+
+    def __process(self, parsed):
+        if not self.in_body:
+            start = parsed.find(_BODY_START)
+            if start < 0:
+                self.head.append(parsed)
+                return []
+            self.head = []
+            self.in_body = True
+            parsed = parsed[start + 1:]
+
+        end = parsed.find(_BODY_END)
+        if end >= 0:
+            parsed = parsed[:end]
+
+        # a section can span many calls, so only the new text is split
+        items = self.split_re.split(parsed)
+        self.pending.append(items[0])
+        if len(items) > 1:
+            items[0] = "".join(self.pending)
+            self.pending = [items.pop()]
+        else:
+            items = []
+        ret = [self.__finish(item) for item in items]
+
+        if end >= 0:
+            ret.append(self.__finish("".join(self.pending)))
+            self.pending = []
+            self.done = True
+            self.in_body = False
+        return ret
+
+
+def _sub_closed(pattern, repl, text, closer):
+    '''
+    re.sub(pattern, repl, text) for a pattern such as <div.*?> or
+    (?s)<(script).*?</\1> that matches up to the first closer after
+    its start. Nothing after the last closer can match, so that part of
+    the text is not scanned, where every unclosed tag would otherwise
+    make the regex rescan to the end of the text. Patterns without the
+    (?s) flag can not match across lines, so each line is cut separately
+    '''
+    if not pattern.startswith("(?s)") and "\n" in text:
+        return "\n".join(_sub_closed(pattern, repl, line, closer) for line in text.split("\n"))
+    end = text.rfind(closer)
+    if end < 0:
+        return text
+    end += len(closer)
+    return re.sub(pattern, repl, text[:end]) + text[end:]
 
 
 class HtmlParse(object):
-    def __init__(self, url = None, content = None, fp = None):
+    def __init__(self, url = None, content = None, fp = None, trace = NULL_TRACE,
+                 content_type = None):
+        '''
+        Parameters
+        ----------
+        url, fp: str
+        content: str, bytes, bytearray, memoryview or mmap
+            where the document comes from, one of them is required.
+            Files, URLs and content that is not a str are decoded as
+            described in articleparse.encoding.decode, when first needed
+        trace: articleparse.metrics.DocumentTrace
+            records the time and sizes of each stage, see Metrics.document
+        content_type: str
+            the Content-Type header the document was served with, if known.
+            It is read from the response for URLs
+        '''
+        self.trace = trace
+        self.fp = None
+        self.raw = None
+        self.content_type = content_type
+        self._html = None
+        self._parsed = None
         if content:
-            self.html = content
+            if isinstance(content, str):
+                self.html = content
+            else:
+                self.raw = content
         elif fp:
-            with open(fp, "r") as f:
-                self.html = f.read()
+            # files are read when first needed, so they can be streamed instead
+            self.fp = fp
         elif url:
-            self.html = urllib.urlopen(url).read().decode("UTF-8", errors='ignore')
+            # imported here, it brings in the http, ssl and email modules,
+            # which documents given as content or files never need
+            import urllib.request
+            with urllib.request.urlopen(url) as response:
+                self.raw = response.read()
+                if content_type is None:
+                    self.content_type = response.headers.get('Content-Type')
         else:
             raise TypeError("must supply a URL, File, or HTML content")
-            
-        self.parsed = self.html
+
+    @property
+    def html(self):
+        if self._html is None:
+            # only the body is decoded, the text before it is never used
+            if self.raw is not None:
+                self._html = decode(self.raw, content_type = self.content_type, body_only = True)
+                self.raw = None
+            else:
+                # files are mapped rather than read, so the head is never copied
+                self._html = read_record(self.fp, content_type = self.content_type)
+        return self._html
+
+    @html.setter
+    def html(self, value):
+        self._html = value
+
+    @property
+    def parsed(self):
+        return self.html if self._parsed is None else self._parsed
+
+    @parsed.setter
+    def parsed(self, value):
+        self._parsed = value
+
+    def loaded(self):
+        '''
+        returns True if the document is in memory, decoded or not
+        '''
+        return self._html is not None or self.raw is not None
+
+    def stream(self, chunk_size = 65536):
+        '''
+        Generator over the document in chunks of up to chunk_size
+        characters, read from the file if it has not been loaded
+        '''
+        if self.loaded():
+            html = self.html
+            for i in range(0, len(html), chunk_size):
+                yield html[i:i + chunk_size]
+            return
+        with open(self.fp, "rb") as f:
+            for chunk in decode_chunks(read_chunks(f, chunk_size), content_type = self.content_type):
+                yield chunk
 
     def remove_non_html(self):
         '''
         removes linebreaks, javascript, css, comments, etc
         '''
-        self.parsed = re.sub(r"\n+", "", self.parsed)
-        self.parsed = re.sub(r"\r+", "", self.parsed)
-        self.parsed = re.sub(r"&#13;", "", self.parsed)
-        self.parsed = re.sub(r"<!--.*?-->", "", self.parsed)
-        self.parsed = re.sub(r"<(style).*?</\1>(?s)", "", self.parsed)
-        self.parsed = re.sub(r"<(script).*?</\1>(?s)", " ", self.parsed)
+        with self.trace.stage("remove_non_html", len(self.parsed)) as stage:
+            self.parsed = re.sub(r"\n+", "", self.parsed)
+            self.parsed = re.sub(r"\r+", "", self.parsed)
+            self.parsed = re.sub(r"&#13;", "", self.parsed)
+            self.parsed = _sub_closed(r"<!--.*?-->", "", self.parsed, "-->")
+            self.parsed = _sub_closed(r"(?s)<(style).*?</\1>", "", self.parsed, "</style>")
+            self.parsed = _sub_closed(r"(?s)<(script).*?</\1>", " ", self.parsed, "</script>")
+            stage.bytes_out = len(self.parsed)
 
     def isolate_body(self):
         '''
         removes everything not enclosed in the body tags.
         this also removes the body tags
         '''
-        body_start = self.parsed.find("<body")
-        body_start = self.parsed.find(">", body_start)
-        
-        body_end = self.parsed.find("</body")
-        
-        self.parsed = self.parsed[body_start+1:body_end]
+        with self.trace.stage("isolate_body", len(self.parsed)) as stage:
+            body_start = self.parsed.find("<body")
+            body_start = self.parsed.find(">", body_start)
+
+            body_end = self.parsed.find("</body")
+
+            self.parsed = self.parsed[body_start+1:body_end]
+            stage.bytes_out = len(self.parsed)
 
     def strip(self, retain_list = []):
         '''
@@ -55,73 +788,34 @@ class HtmlParse(object):
         retain_list: list of str
             The HTML tags specified in the retain list will not be stripped
         '''
+        with self.trace.stage("strip", len(self.parsed)) as stage:
+            # convert retain list to placeholders
+            lookup_table = []
+            for tag in retain_list:
+                replace = "&tag-" + tag + ";"
+                lookup_table.append(replace)
+                self.parsed = _sub_closed(r"<%s.*?>" %tag, replace, self.parsed, ">")
 
-        # convert retain list to placeholders
-        lookup_table = []
-        for tag in retain_list:
-            replace = "&tag-" + tag + ";"
-            lookup_table.append(replace)
-            self.parsed = re.sub(r"<%s.*?>" %tag, replace, self.parsed)
+            # remove all tags
+            self.parsed = _sub_closed(r"<.*?>", " ", self.parsed, ">")
 
-        # remove all tags
-        self.parsed = re.sub(r"<.*?>", " ", self.parsed)
+            # convert retained tags back to originals
+            for i in range(0, len(retain_list)):
+                tag = "<" + retain_list[i] + ">"
+                self.parsed = re.sub(r"%s" %lookup_table[i], tag, self.parsed)
 
-        # convert retained tags back to originals
-        for i in range(0, len(retain_list)):
-            tag = "<" + retain_list[i] + ">"
-            self.parsed = re.sub(r"%s" %lookup_table[i], tag, self.parsed)
-        
-        # condense all whitespace
-        self.parsed = re.sub(r"\s+", " ", self.parsed)
+            # condense all whitespace
+            self.parsed = re.sub(r"\s+", " ", self.parsed)
+            stage.bytes_out = len(self.parsed)
 
     def decode_entities(self):
         '''
-        remove HTML entities
-        (incomplete)
+        decodes HTML entities, named and numeric, in a single pass
+        (see unescape)
         '''
-        self.parsed = re.sub(r"&#0*34;", "\"", self.parsed)
-        self.parsed = re.sub(r"&quot;", "\"", self.parsed)
-        
-        self.parsed = re.sub(r"&#0*39;", "'", self.parsed)
-        self.parsed = re.sub(r"&apos;", "'", self.parsed)
-        
-        self.parsed = re.sub(r"&#0*38;", "&", self.parsed)
-        self.parsed = re.sub(r"&amp;", "&", self.parsed)
-        
-        self.parsed = re.sub(r"&#0*60;", "<", self.parsed)
-        self.parsed = re.sub(r"&lt;", "<", self.parsed)
-        
-        self.parsed = re.sub(r"&#0*62;", ">", self.parsed)
-        self.parsed = re.sub(r"&gt;", ">", self.parsed)
-        
-        self.parsed = re.sub(r"&#160;", " ", self.parsed)
-        self.parsed = re.sub(r"&nbsp;", " ", self.parsed)
-        
-        self.parsed = re.sub(r"&#169;", "Copyright", self.parsed)
-        self.parsed = re.sub(r"&copy;", "Copyright", self.parsed)
-
-        self.parsed = re.sub(r"&#8212;", "-", self.parsed)
-        self.parsed = re.sub(r"&mdash;", "-", self.parsed)
-
-        self.parsed = re.sub(r"&#8211;", "-", self.parsed)
-        self.parsed = re.sub(r"&ndash;", "-", self.parsed)
-
-        self.parsed = re.sub(r"&#8217;", "'", self.parsed)
-        self.parsed = re.sub(r"&rsquo;", "'", self.parsed)
-
-        self.parsed = re.sub(r"&#8220;", "\"", self.parsed)
-        self.parsed = re.sub(r"&ldquo;", "\"", self.parsed)
-
-        self.parsed = re.sub(r"&#8221;", "\"", self.parsed)
-        self.parsed = re.sub(r"&rdquo;", "\"", self.parsed)
-        
-        self.parsed = re.sub(r"&#0*9;", " ", self.parsed)
-        self.parsed = re.sub(r"&tab;", " ", self.parsed)
-        
-        self.parsed = re.sub(r"&#201;", "e", self.parsed)
-        self.parsed = re.sub(r"&Eacute;", "e", self.parsed)
-        self.parsed = re.sub(r"&#233;", "e", self.parsed)
-        self.parsed = re.sub(r"&eacute;", "e", self.parsed)
+        with self.trace.stage("decode_entities", len(self.parsed)) as stage:
+            self.parsed = unescape(self.parsed)
+            stage.bytes_out = len(self.parsed)
 
     def convert(self, c_list):
         '''
@@ -133,8 +827,58 @@ class HtmlParse(object):
             a conversion mapping
             example: ['a', 'b', '/a', '/b'] will convert <a> to <b> and </a> to </b>
         '''
-        for i in range(0, len(c_list), 2):
-            self.parsed = re.sub(r"<%s.*?>" %c_list[i], "<"+c_list[i + 1]+">", self.parsed)
+        with self.trace.stage("convert", len(self.parsed)) as stage:
+            for i in range(0, len(c_list), 2):
+                self.parsed = _sub_closed(r"<%s.*?>" %c_list[i], "<"+c_list[i + 1]+">", self.parsed, ">")
+            stage.bytes_out = len(self.parsed)
+
+    def sections(self, retain_list = [], c_list = [], split_list = ["div", "/div"]):
+        '''
+        Single pass equivalent of remove_non_html, isolate_body, strip,
+        convert and decode_entities followed by a split on the tags in
+        split_list. Works from the original HTML.
+
+        Parameters
+        ----------
+        retain_list: list of str
+            as in strip
+        c_list: list of str
+            as in convert
+        split_list: list of str
+            tags (after conversion) that delimit sections
+
+        Returns
+        -------
+        list of str, one per section
+        '''
+        with self.trace.stage("tokenize", len(self.html)) as stage:
+            ret = Tokenizer(retain_list, c_list).sections(self.html, split_list)
+            stage.bytes_out = sum(len(sec) for sec in ret)
+            stage.sections = len(ret)
+        return ret
+
+    def spans(self, retain_list = [], c_list = [], split_list = ["div", "/div"], tokenizer = None):
+        '''
+        Like sections, but the parsed document is kept as a single string
+        and each section is returned as its (start, end) offsets into it.
+        The parsed document is also available from get_parsed.
+
+        Parameters
+        ----------
+        tokenizer: Tokenizer
+            tokenizer to use instead of one built from retain_list and c_list
+
+        Returns
+        -------
+        list of (start, end)
+        '''
+        if tokenizer is None:
+            tokenizer = Tokenizer(retain_list, c_list)
+        with self.trace.stage("tokenize", len(self.html)) as stage:
+            self.parsed, spans = tokenizer.spans(self.html, split_list)
+            stage.bytes_out = len(self.parsed)
+            stage.sections = len(spans)
+        return spans
 
     def get_parsed(self):
         return self.parsed
@@ -0,0 +1,280 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import bisect
+import collections
+
+from articleparse.analyzer import Section
+from articleparse.boilerplate import fingerprint
+from articleparse.extractor import Extractor
+
+
+# fraction of the sections of two versions that may be left unmatched
+# before none of those that changed are matched up, see opcodes
+FULL_RUN = 0.5
+
+
+class Version(object):
+    '''
+    What is kept of the last version of a page: its sections with their
+    analysis and scores, and the fingerprints of every section's text,
+    including those too short to keep
+    '''
+    __slots__ = ('fingerprints', 'sections', 'scores', 'known')
+
+    def __init__(self, fingerprints, sections, scores, known):
+        self.fingerprints = fingerprints
+        self.sections = sections
+        self.scores = scores
+        self.known = known
+
+
+def _gap(old, new, i1, i2, j1, j2, ret):
+    # the opcodes of old[i1:i2] against new[j1:j2], matching only
+    # their common start and end
+    start = 0
+    while start < min(i2 - i1, j2 - j1) and old[i1 + start] == new[j1 + start]:
+        start += 1
+    end = 0
+    while end < min(i2 - i1, j2 - j1) - start and old[i2 - 1 - end] == new[j2 - 1 - end]:
+        end += 1
+    if start:
+        ret.append(('equal', i1, i1 + start, j1, j1 + start))
+    i1 += start
+    j1 += start
+    if i1 < i2 - end and j1 < j2 - end:
+        ret.append(('replace', i1, i2 - end, j1, j2 - end))
+    elif i1 < i2 - end:
+        ret.append(('delete', i1, i2 - end, j1, j1))
+    elif j1 < j2 - end:
+        ret.append(('insert', i1, i1, j1, j2 - end))
+    if end:
+        ret.append(('equal', i2 - end, i2, j2 - end, j2))
+
+
+def _anchors(old, new, i1, i2, j1, j2):
+    # (i, j) of the items found once in old[i1:i2] and once in new[j1:j2],
+    # the longest run of them in the same order in both (patience sorting)
+    counts = collections.Counter(old[i1:i2])
+    where = dict((item, i) for i, item in enumerate(old[i1:i2], i1) if counts[item] == 1)
+    counts = collections.Counter(new[j1:j2])
+    pairs = [(where[item], j) for j, item in enumerate(new[j1:j2], j1)
+             if counts[item] == 1 and item in where]
+    # tops[k] is the smallest last i of the runs of length k + 1
+    tops = []
+    links = []
+    back = []
+    for i, j in pairs:
+        k = bisect.bisect_left(tops, i)
+        back.append(links[k - 1] if k else -1)
+        if k == len(tops):
+            tops.append(i)
+            links.append(len(back) - 1)
+        else:
+            tops[k] = i
+            links[k] = len(back) - 1
+    ret = []
+    k = links[-1] if links else -1
+    while k >= 0:
+        ret.append(pairs[k])
+        k = back[k]
+    ret.reverse()
+    return ret
+
+
+def opcodes(old, new, limit = FULL_RUN):
+    '''
+    The differences between two sequences of hashable items, as
+    difflib.SequenceMatcher.get_opcodes gives them, in linear time
+    however often items repeat. The common start and end are trimmed,
+    then what is left is matched on the items found once in each
+    (as patience diff does), and between those only on their common
+    start and end again. If more than limit of the longer sequence is
+    still unmatched, nothing between the common start and end is
+    matched, and it is all replaced
+
+    Returns
+    -------
+    list of (tag, i1, i2, j1, j2), where tag is 'equal', 'replace',
+    'delete' or 'insert'
+    '''
+    ret = []
+    start = 0
+    while start < min(len(old), len(new)) and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < min(len(old), len(new)) - start and old[len(old) - 1 - end] == new[len(new) - 1 - end]:
+        end += 1
+    if start:
+        ret.append(('equal', 0, start, 0, start))
+    i2 = len(old) - end
+    j2 = len(new) - end
+    middle = []
+    i, j = start, start
+    for ai, aj in _anchors(old, new, start, i2, start, j2):
+        _gap(old, new, i, ai, j, aj, middle)
+        middle.append(('equal', ai, ai + 1, aj, aj + 1))
+        i, j = ai + 1, aj + 1
+    _gap(old, new, i, i2, j, j2, middle)
+    unmatched = sum(max(op[2] - op[1], op[4] - op[3]) for op in middle if op[0] != 'equal')
+    if unmatched > limit * max(len(old), len(new)):
+        middle = []
+        _gap(old, new, start, i2, start, j2, middle)
+    ret.extend(middle)
+    if end:
+        ret.append(('equal', i2, len(old), j2, len(new)))
+    return ret
+
+
+class IncrementalAnalyzer(object):
+    '''
+    Re-extracts new versions of pages it has seen before, such as live
+    blogs, reusing what has not changed. The page is tokenized again, but
+    only sections whose text is new are analyzed, and only sections whose
+    score could have changed (the new ones and their neighbors) are scored.
+    The results are those a full run of the extractor would give.
+
+        incremental = IncrementalAnalyzer(Extractor(threshold = 100))
+        update = incremental.update(url, html)
+        update['sections'], update['added'], update['changed']
+
+    The last version of up to maxsize pages is kept, least recently
+    updated first out. Budgets set on the extractor are not applied.
+
+    Sections are matched to those of the last version by opcodes, in
+    time linear in the number of sections. When most of the page has
+    changed they are not matched, and are all scored again, as in a
+    full run.
+    '''
+    def __init__(self, extractor = None, maxsize = 1024):
+        '''
+        Parameters
+        ----------
+        extractor: articleparse.extractor.Extractor
+            the pipeline configuration (threshold, probability, classification,
+            language), the Extractor defaults if not given
+        maxsize: int
+            number of pages whose last version is kept
+        '''
+        self.extractor = Extractor() if extractor is None else extractor
+        self.maxsize = maxsize
+        self.versions = collections.OrderedDict()
+
+    def forget(self, key):
+        '''
+        drops the last version of a page, if it is known
+        '''
+        self.versions.pop(key, None)
+
+    def update(self, key, content):
+        '''
+        Extracts a version of a page
+
+        Parameters
+        ----------
+        key: str
+            identifies the page, usually its URL
+        content: str or bytes
+            the HTML of this version
+
+        Returns
+        -------
+        dict with the keys:
+            sections: list of dicts, as returned by Analyzer.analyze_sections
+            added: indexes of the sections (before the probability cutoff)
+                that are new in this version
+            removed: indexes of the sections of the previous version
+                that are gone
+            changed: (previous index, index) of sections whose text changed
+            analyzed: number of sections whose text had to be analyzed
+            scored: number of sections that had to be scored
+        '''
+        previous = self.versions.pop(key, None)
+        a = self.extractor.analyzer(content = content)
+        spans = a.parser.spans(tokenizer = a.tokenizer)
+        html = a.parser.get_parsed()
+
+        # sections whose text was seen in the previous version are moved
+        # rather than analyzed again. Texts too short to keep are known too
+        known = {} if previous is None else previous.known
+        seen = {}
+        fingerprints = []
+        analyzed = 0
+        position = 0
+        for start, end in spans:
+            if end - start > 1:
+                fp = fingerprint(html[start:end])
+                if fp in seen:
+                    sec = seen[fp]
+                    sec = sec if sec is None else sec.moved(html, position, start, end)
+                elif fp in known:
+                    sec = known[fp]
+                    sec = sec if sec is None else sec.moved(html, position, start, end)
+                else:
+                    sec = Section(html, position, start, end, stop_words = a.stop_words,
+                                  approximate = a.approximate)
+                    analyzed += 1
+                    if sec.len() <= self.extractor.threshold:
+                        sec = None
+                seen[fp] = sec
+                if sec is not None:
+                    a.sections.append(sec)
+                    fingerprints.append(fp)
+            position += 1
+
+        old = [] if previous is None else previous.fingerprints
+        added = []
+        removed = []
+        changed = []
+        # the previous index of each section, if it is the same as then
+        same = [None] * len(fingerprints)
+        for tag, i1, i2, j1, j2 in opcodes(old, fingerprints):
+            if tag == 'equal':
+                for k in range(0, i2 - i1):
+                    same[j1 + k] = i1 + k
+            elif tag == 'replace':
+                pairs = min(i2 - i1, j2 - j1)
+                changed.extend((i1 + k, j1 + k) for k in range(0, pairs))
+                removed.extend(range(i1 + pairs, i2))
+                added.extend(range(j1 + pairs, j2))
+            elif tag == 'delete':
+                removed.extend(range(i1, i2))
+            elif tag == 'insert':
+                added.extend(range(j1, j2))
+
+        # a score is reused if the sections it depends on are the same,
+        # in the same order, as in the previous version
+        n = a.neighbor_window
+        scores = [None] * len(a.sections)
+        stale = []
+        for i in range(0, len(a.sections)):
+            j = same[i]
+            if j is not None and all(0 <= i + d < len(same)
+                                     and same[i + d] == j + d
+                                     or not (0 <= i + d < len(same)) and not (0 <= j + d < len(old))
+                                     for d in range(-n, n + 1)):
+                scores[i] = previous.scores[j]
+            else:
+                stale.append(i)
+        scored = len(stale)
+        # each score on its own reads the 2n + 1 sections around it, so
+        # past a point all of them are scored at once
+        if scored * (2 * n + 1) > len(scores):
+            scores = a.scores()
+        else:
+            for i in stale:
+                scores[i] = a.score(i)
+
+        probability = self.extractor.probability
+        ret = [{'probability': score, 'content': sec.txt()} for sec, score in zip(a.sections, scores)
+               if probability is None or score >= probability]
+
+        self.versions[key] = Version(fingerprints, a.sections, scores, seen)
+        while len(self.versions) > self.maxsize:
+            self.versions.popitem(last = False)
+
+        return {'sections': ret, 'added': added, 'removed': removed, 'changed': changed,
+                'analyzed': analyzed, 'scored': scored}
@@ -0,0 +1,111 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import mmap
+import os
+
+from articleparse.encoding import decode
+
+
+class MappedFile(object):
+    '''
+    A file mapped into memory, from which documents are read as byte
+    ranges. Nothing is read into the process until a record is decoded,
+    and then only the pages it covers, which the page cache shares with
+    every other process mapping the same file.
+
+    Pickles as its path, so it can be sent to worker processes, which
+    map the file again.
+
+        with MappedFile("pages.html") as f:
+            html = f.decode(offset, length)
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.__map()
+
+    def __map(self):
+        with open(self.path, "rb") as f:
+            # empty files can not be mapped
+            if os.fstat(f.fileno()).st_size:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = b""
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.__map()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.data)
+
+    def close(self):
+        '''
+        unmaps the file. Records returned by record must have been released
+        '''
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def record(self, offset = 0, length = None):
+        '''
+        returns the bytes from offset, to the end of the file or for
+        length bytes, as a memoryview of the mapping
+
+        Raises
+        ------
+        ValueError if the range is not within the file
+        '''
+        end = len(self.data) if length is None else offset + length
+        if offset < 0 or end < offset or end > len(self.data):
+            raise ValueError("record at %d of length %s is outside %s (%d bytes)"
+                             % (offset, length, self.path, len(self.data)))
+        with memoryview(self.data) as view:
+            return view[offset:end]
+
+    def decode(self, offset = 0, length = None, encoding = None, content_type = None, body_only = True):
+        '''
+        returns a record as text, decoded by articleparse.encoding.decode,
+        from the body tag on by default. Only the part decoded is copied
+        '''
+        with self.record(offset, length) as view:
+            return decode(view, encoding = encoding, content_type = content_type, body_only = body_only)
+
+
+def read_record(path, offset = 0, length = None, encoding = None, content_type = None):
+    '''
+    returns a record of a file, decoded as MappedFile.decode does
+    '''
+    with MappedFile(path) as f:
+        return f.decode(offset, length, encoding = encoding, content_type = content_type)
+
+
+def documents(path, ranges):
+    '''
+    Generator over the documents, as accepted by articleparse.batch.extract_many
+    and articleparse.extractor.Extractor, for records of one file
+
+    Parameters
+    ----------
+    path: str
+        file the records are concatenated in
+    ranges: iterable of (offset, length)
+        where each record is in the file, in bytes
+
+    Returns
+    -------
+    generator of dicts with the keys id ("path@offset"), file, offset and length
+    '''
+    for offset, length in ranges:
+        yield {'id': "%s@%d" % (path, offset), 'file': path, 'offset': offset, 'length': length}
@@ -0,0 +1,223 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import heapq
+import json
+import threading
+import time
+
+
+class Stage(object):
+    '''
+    Context manager timing one pipeline stage of one document.
+    The code being timed sets bytes_out and sections when known
+    '''
+    __slots__ = ('trace', 'name', 'bytes_in', 'bytes_out', 'sections', 'start')
+
+    def __init__(self, trace, name, bytes_in):
+        self.trace = trace
+        self.name = name
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+        self.sections = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.trace.record(self.name, time.perf_counter() - self.start,
+                          self.bytes_in, self.bytes_out, self.sections)
+
+
+class NullStage(object):
+    '''
+    Stage that records nothing, used when metrics are disabled
+    '''
+    __slots__ = ('bytes_in', 'bytes_out', 'sections')
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.sections = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class NullTrace(object):
+    '''
+    Trace that records nothing. Its stages cost a method call
+    and an empty with block
+    '''
+    stage_ = NullStage()
+
+    def stage(self, name, bytes_in = 0):
+        return self.stage_
+
+    def record(self, name, seconds, bytes_in = 0, bytes_out = 0, sections = 0):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class DocumentTrace(object):
+    '''
+    The stages recorded for one document
+    '''
+    def __init__(self, metrics, doc_id):
+        self.metrics = metrics
+        self.doc_id = doc_id
+        self.stages = []
+        self.seconds = 0.0
+        self.finished = False
+
+    def stage(self, name, bytes_in = 0):
+        '''
+        returns a context manager that times the stage
+        '''
+        return Stage(self, name, bytes_in)
+
+    def record(self, name, seconds, bytes_in = 0, bytes_out = 0, sections = 0):
+        self.stages.append({'stage': name, 'seconds': seconds, 'bytes_in': bytes_in,
+                            'bytes_out': bytes_out, 'sections': sections})
+        self.seconds += seconds
+        self.metrics._record(self, self.stages[-1])
+
+    def finish(self):
+        '''
+        marks the document as done, making it a candidate for Metrics.slowest
+        '''
+        if not self.finished:
+            self.finished = True
+            self.metrics._finish(self)
+
+    def as_dict(self):
+        return {'id': self.doc_id, 'seconds': self.seconds, 'stages': list(self.stages)}
+
+
+class Metrics(object):
+    '''
+    Collects the wall time, input and output sizes (in characters) and
+    section counts of each pipeline stage, over any number of documents.
+    Pass an instance to Analyzer(metrics=...). Thread safe.
+    '''
+    def __init__(self, slowest = 10, callback = None):
+        '''
+        Parameters
+        ----------
+        slowest: int
+            number of the slowest documents to keep, with their stage breakdown
+        callback: function
+            called with (document id, stage dict) for every stage recorded,
+            see log_callback
+        '''
+        self.keep = slowest
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.documents = 0
+        self.totals = {}
+        self.order = []
+        self.slow = []
+        self.counter = 0
+
+    def document(self, doc_id = None):
+        '''
+        returns the DocumentTrace for a new document
+        '''
+        return DocumentTrace(self, doc_id)
+
+    def _record(self, trace, stage):
+        with self.lock:
+            totals = self.totals.get(stage['stage'])
+            if totals is None:
+                totals = {'count': 0, 'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'sections': 0}
+                self.totals[stage['stage']] = totals
+                self.order.append(stage['stage'])
+            totals['count'] += 1
+            for key in ('seconds', 'bytes_in', 'bytes_out', 'sections'):
+                totals[key] += stage[key]
+        if self.callback is not None:
+            self.callback(trace.doc_id, stage)
+
+    def _finish(self, trace):
+        with self.lock:
+            self.documents += 1
+            # the counter breaks ties, so traces are never compared
+            self.counter += 1
+            item = (trace.seconds, self.counter, trace)
+            if len(self.slow) < self.keep:
+                heapq.heappush(self.slow, item)
+            elif self.keep and item[0] > self.slow[0][0]:
+                heapq.heapreplace(self.slow, item)
+
+    def slowest(self, n = None):
+        '''
+        returns the stage breakdown of the n slowest finished
+        documents (all that are kept by default), slowest first
+        '''
+        with self.lock:
+            items = sorted(self.slow, key = lambda item: item[0], reverse = True)
+        return [trace.as_dict() for _, _, trace in items[:n]]
+
+    def as_dict(self):
+        '''
+        returns the totals per stage, in the order stages were first seen
+        '''
+        with self.lock:
+            return {'documents': self.documents,
+                    'stages': dict((name, dict(self.totals[name])) for name in self.order)}
+
+    def prometheus(self, prefix = "articleparse"):
+        '''
+        returns the totals in the Prometheus text exposition format
+        '''
+        totals = self.as_dict()
+        lines = ["# TYPE %s_documents_total counter" % prefix,
+                 "%s_documents_total %d" % (prefix, totals['documents'])]
+        for key, metric in (('count', 'stage_calls_total'),
+                            ('seconds', 'stage_seconds_total'),
+                            ('bytes_in', 'stage_input_chars_total'),
+                            ('bytes_out', 'stage_output_chars_total'),
+                            ('sections', 'stage_sections_total')):
+            lines.append("# TYPE %s_%s counter" % (prefix, metric))
+            for name, stage in totals['stages'].items():
+                lines.append('%s_%s{stage="%s"} %r' % (prefix, metric, name, stage[key]))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.documents = 0
+            self.totals = {}
+            self.order = []
+            self.slow = []
+
+
+def log_callback(logger = None, level = None):
+    '''
+    returns a Metrics callback that logs each stage as a JSON object,
+    at level (logging.DEBUG by default)
+    '''
+    # logging is only imported by those who use it
+    import logging
+    if level is None:
+        level = logging.DEBUG
+    if logger is None:
+        logger = logging.getLogger("articleparse.metrics")
+
+    def callback(doc_id, stage):
+        if logger.isEnabledFor(level):
+            record = dict(stage)
+            record['id'] = doc_id
+            logger.log(level, json.dumps(record, default = str))
+    return callback
@@ -0,0 +1,392 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import urllib.parse
+
+from articleparse.batch import extract_job, init_worker, run_job
+from articleparse.extractor import Extractor
+
+
+# analyzed by each worker when it starts, so that what is built on
+# first use is built before the first request rather than during it
+_WARMUP = ("<html><head><title>Warm up</title></head><body>"
+           "<div><a href=\"/\">Home</a> <span>News &amp; Views</span></div>"
+           "<div><p>The council approved the plan on Tuesday, after a debate that "
+           "lasted well into the night. &ldquo;It is a good day for the city,&rdquo; "
+           "the mayor said. Work could begin as early as next spring.</p></div>"
+           "</body></html>")
+
+# keys of a request passed on to the extractor, and those that
+# name files, which are only passed on when files are allowed
+_KEYS = frozenset(['id', 'content', 'content_type', 'url'])
+_FILE_KEYS = frozenset(['file', 'offset', 'length'])
+
+# schemes a request's url may have, any other (file:, ftp:, ...) is refused
+_SCHEMES = ('http', 'https')
+
+
+def _init_warm_worker(extractor):
+    # an interrupted daemon shuts its workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker(extractor, _serve_job)
+    extractor.analyze(_WARMUP)
+
+
+def _fetch(url, timeout):
+    # imported here, so that workers only load them once a url is requested
+    import asyncio
+    from articleparse.fetch import ConnectionPool
+
+    async def get():
+        async with ConnectionPool(timeout = timeout) as pool:
+            return await pool.fetch(url)
+    return asyncio.run(get())
+
+
+def _serve_job(extractor, job):
+    # extracts a request, fetching its url first through
+    # articleparse.fetch, so that the fetch times out
+    index, request, timeout = job
+    if isinstance(request, dict) and request.get('url') is not None:
+        url = request['url']
+        ident = url if request.get('id') is None else request['id']
+        try:
+            response = _fetch(url, timeout)
+        except Exception as e:
+            return {'index': index, 'id': ident, 'sections': None,
+                    'error': "%s: %s" % (type(e).__name__, e)}
+        doc = dict((k, v) for k, v in request.items() if k != 'url')
+        doc['id'] = ident
+        doc['content'] = response.body
+        if doc.get('content_type') is None:
+            doc['content_type'] = response.headers.get('content-type')
+        request = doc
+    return extract_job(extractor, (index, request))
+
+
+class _Done(object):
+    # a result known without going through the pool, in place of an AsyncResult
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, timeout = None):
+        return self.value
+
+
+class WarmPool(object):
+    '''
+    Worker processes that each hold an Extractor, warmed up on a first
+    document, and serve any number of requests. It saves every request
+    the interpreter start up, the imports and the compilation of the
+    patterns that a process started per document pays.
+
+        with WarmPool(Extractor(threshold = 100, probability = 0.8), workers = 4) as pool:
+            result = pool.extract({'content': html})
+    '''
+    def __init__(self, extractor = None, workers = None, allow_files = False, timeout = 30.0):
+        '''
+        Parameters
+        ----------
+        extractor: articleparse.extractor.Extractor
+            the pipeline to use, one with its defaults if not given
+        workers: int
+            number of worker processes, defaults to the number of CPUs.
+            0 extracts in this process
+        allow_files: bool
+            whether requests may name files to read, with 'file'
+        timeout: float
+            seconds allowed to fetch a request's url, see
+            articleparse.fetch.ConnectionPool
+        '''
+        self.extractor = Extractor() if extractor is None else extractor
+        self.workers = multiprocessing.cpu_count() if workers is None else workers
+        self.allow_files = allow_files
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.pool = None
+        if self.workers == 0:
+            _init_warm_worker(self.extractor)
+        else:
+            self.pool = multiprocessing.Pool(processes = self.workers, initializer = _init_warm_worker,
+                                             initargs = (self.extractor,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, request):
+        '''
+        Starts extracting a document
+
+        Parameters
+        ----------
+        request: str, bytes or dict
+            HTML content, or a dict with 'content' or 'url' (or 'file' if
+            files are allowed), as accepted by Extractor.analyze, and an
+            optional 'id'. Requests sent as JSON are read by parse_request.
+            Only http and https urls are fetched, with articleparse.fetch
+
+        Returns
+        -------
+        object whose get() returns the result, a dict as yielded by
+        articleparse.batch.extract_many
+        '''
+        with self.lock:
+            index = self.requests
+            self.requests += 1
+        if isinstance(request, dict):
+            keys = _KEYS | _FILE_KEYS if self.allow_files else _KEYS
+            unknown = set(request) - keys
+            if unknown:
+                return _Done({'index': index, 'id': request.get('id', index), 'sections': None,
+                              'error': "ValueError: unsupported keys %s" % ", ".join(sorted(unknown))})
+            url = request.get('url')
+            if url is not None and (not isinstance(url, str) or
+                                    urllib.parse.urlsplit(url).scheme.lower() not in _SCHEMES):
+                return _Done({'index': index, 'id': request.get('id', index), 'sections': None,
+                              'error': "ValueError: unsupported URL %r, only http and https "
+                                       "are fetched" % (url,)})
+        job = (index, request, self.timeout)
+        if self.pool is None:
+            return _Done(run_job(job))
+        return self.pool.apply_async(run_job, (job,))
+
+    def extract(self, request):
+        '''
+        extracts a document, see submit, and returns its result
+        '''
+        return self.submit(request).get()
+
+    def stats(self):
+        return {'workers': self.workers, 'requests': self.requests}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+def parse_request(line):
+    '''
+    a request from one line of JSON: an object with the keys
+    accepted by WarmPool.submit, or a string of HTML content
+    '''
+    request = json.loads(line.decode("utf-8") if isinstance(line, bytes) else line)
+    if isinstance(request, str):
+        return {'content': request}
+    if not isinstance(request, dict):
+        raise ValueError("a request is a JSON object or string")
+    return request
+
+
+def serve_stream(pool, lines, write, max_pending = None):
+    '''
+    Extracts a document for each line of JSON read from lines, writing
+    one line of JSON with its result in the same order. Requests are
+    extracted concurrently, with up to max_pending (4 per worker by
+    default) read ahead of the results written.
+
+    Parameters
+    ----------
+    pool: WarmPool
+    lines: iterable of str or bytes
+    write: callable
+        called with each line of output, as a str
+    '''
+    if max_pending is None:
+        max_pending = 4 * max(pool.workers, 1)
+    pending = queue.Queue(max_pending)
+
+    def writer():
+        broken = False
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            # once output fails, results are still taken so that reading goes on
+            result = json.dumps(item.get()) + "\n"
+            if not broken:
+                try:
+                    write(result)
+                except OSError:
+                    broken = True
+
+    thread = threading.Thread(target = writer)
+    thread.daemon = True
+    thread.start()
+    try:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                request = parse_request(line)
+            except ValueError as e:
+                pending.put(_Done({'index': None, 'id': None, 'sections': None,
+                                   'error': "%s: %s" % (type(e).__name__, e)}))
+                continue
+            pending.put(pool.submit(request))
+    finally:
+        pending.put(None)
+        thread.join()
+
+
+def serve_stdio(pool, stdin = None, stdout = None):
+    '''
+    serves requests read from stdin, one JSON line each, until it ends
+    '''
+    stdin = sys.stdin.buffer if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+
+    def write(text):
+        stdout.write(text)
+        stdout.flush()
+    serve_stream(pool, stdin, write)
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        def write(text):
+            self.wfile.write(text.encode("utf-8"))
+            self.wfile.flush()
+        try:
+            serve_stream(self.server.pool, self.rfile, write)
+        except ConnectionResetError:
+            # the client went away without waiting for its results
+            pass
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(pool, path):
+    '''
+    Serves requests on a Unix socket, as JSON lines like serve_stdio,
+    with any number of connections open at once. Runs until interrupted,
+    then removes the socket
+    '''
+    # a socket left behind by a daemon that did not shut down cleanly
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    server = _UnixServer(path, _StreamHandler)
+    server.pool = pool
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+
+
+def serve_http(pool, host = "127.0.0.1", port = 8080, quiet = True):
+    '''
+    Serves requests over HTTP until interrupted:
+
+        POST /   a JSON request (Content-Type: application/json), or the
+                 HTML itself, decoded by its Content-Type charset
+        GET  /   the number of workers and requests served
+
+    Responses are the JSON result, with status 200, or 400 if the
+    document could not be extracted
+    '''
+    # imported here, since it brings in the http and email modules
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self, status, value):
+            body = json.dumps(value).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self.respond(200, pool.stats())
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            content_type = self.headers.get('Content-Type')
+            try:
+                if content_type and "json" in content_type.lower():
+                    request = parse_request(body)
+                else:
+                    request = {'content': body, 'content_type': content_type}
+            except ValueError as e:
+                self.respond(400, {'index': None, 'id': None, 'sections': None,
+                                   'error': "%s: %s" % (type(e).__name__, e)})
+                return
+            result = pool.extract(request)
+            self.respond(200 if result['error'] is None else 400, result)
+
+        def log_message(self, *args):
+            if not quiet:
+                BaseHTTPRequestHandler.log_message(self, *args)
+
+    class Server(socketserver.ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server((host, port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv = None):
+    '''
+    runs an extraction daemon with a pool of warm workers, serving
+    requests on stdin and stdout (the default), a Unix socket or HTTP
+    '''
+    parser = argparse.ArgumentParser(prog = "articleparse serve")
+    g = parser.add_mutually_exclusive_group()
+    g.add_argument("--stdio", action="store_true", help="serve JSON lines on stdin and stdout (default)")
+    g.add_argument("--socket", help="serve JSON lines on this Unix socket")
+    g.add_argument("--http", help="serve HTTP on HOST:PORT")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)", default=None)
+    parser.add_argument("--threshold", type=int, help="section length threshold", default=100)
+    parser.add_argument("--probability", type=float, help="section probability threshold", default=0.8)
+    parser.add_argument("--max-seconds", type=float, help="time allowed per document", default=None)
+    parser.add_argument("--language", help="language of the stop words", default='en')
+    parser.add_argument("--allow-files", action="store_true", help="let requests name files to read")
+    parser.add_argument("--timeout", type=float, help="seconds allowed to fetch a url", default=30.0)
+    parser.add_argument("--verbose", action="store_true", help="log HTTP requests on stderr")
+    args = parser.parse_args(argv)
+
+    # a daemon is usually stopped with SIGTERM, which should shut the pool down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    extractor = Extractor(threshold = args.threshold, probability = args.probability,
+                          max_seconds = args.max_seconds, language = args.language)
+    with WarmPool(extractor, workers = args.workers, allow_files = args.allow_files,
+                  timeout = args.timeout) as pool:
+        try:
+            if args.socket:
+                serve_socket(pool, args.socket)
+            elif args.http:
+                host, _, port = args.http.rpartition(":")
+                serve_http(pool, host or "127.0.0.1", int(port), quiet = not args.verbose)
+            else:
+                serve_stdio(pool)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ associated with this software.
 class StopWords(object):
     stop_words = set(["a",
                       "about",
-                      "able"
+                      "able",
                       "above",
                       "across",
                       "after",
@@ -135,6 +135,73 @@ class StopWords(object):
                       "your"
                       ])
 
+    # case folded stop words by language
+    languages = {}
+
+    @staticmethod
+    def register(language, words):
+        '''
+        sets the stop words of a language, such as 'en' or 'pt', replacing any
+        it had. Words are case folded, and so are the words looked up
+        '''
+        StopWords.languages[language] = frozenset(word.casefold() for word in words)
+
     @staticmethod
-    def is_stop_word(word):
-        return word.lower() in StopWords.stop_words
+    def get(language = 'en'):
+        '''
+        returns the case folded stop words of a language, as a frozenset
+        '''
+        try:
+            return StopWords.languages[language]
+        except KeyError:
+            raise ValueError("no stop words for language %r, see StopWords.register" % language)
+
+    @staticmethod
+    def is_stop_word(word, language = 'en'):
+        return word.casefold() in StopWords.get(language)
+
+
+SPANISH = ["a", "al", "algo", "algunas", "algunos", "ante", "antes", "como", "con", "contra",
+           "cual", "cuando", "de", "del", "desde", "donde", "durante", "e", "el", "ella",
+           "ellas", "ellos", "en", "entre", "era", "es", "esa", "esas", "ese", "eso",
+           "esos", "esta", "estaba", "estado", "estas", "este", "esto", "estos", "está", "están",
+           "fue", "fueron", "ha", "había", "han", "hasta", "hay", "he", "la", "las",
+           "le", "les", "lo", "los", "me", "mi", "mis", "mucho", "muchos", "muy",
+           "más", "mí", "nada", "ni", "no", "nos", "nosotros", "nuestra", "nuestro", "o",
+           "os", "otra", "otras", "otro", "otros", "para", "pero", "poco", "por", "porque",
+           "que", "quien", "quienes", "qué", "se", "sea", "ser", "si", "sin", "sobre",
+           "son", "su", "sus", "sí", "también", "tanto", "te", "tiene", "todo", "todos",
+           "tu", "tus", "tú", "un", "una", "uno", "unos", "y", "ya", "yo", "él"]
+
+FRENCH = ["a", "ai", "aient", "ait", "alors", "as", "au", "aucun", "aussi", "autre",
+          "aux", "avait", "avec", "avez", "avoir", "bien", "c", "car", "ce", "cela",
+          "ces", "cet", "cette", "comme", "d", "dans", "de", "des", "donc", "du",
+          "elle", "elles", "en", "encore", "est", "et", "eu", "eux", "fait", "il",
+          "ils", "j", "je", "l", "la", "le", "les", "leur", "leurs", "lui",
+          "m", "ma", "mais", "me", "mes", "moi", "mon", "même", "n", "ne",
+          "ni", "nos", "notre", "nous", "on", "ont", "ou", "où", "par", "pas",
+          "peu", "plus", "pour", "qu", "quand", "que", "qui", "s", "sa", "sans",
+          "se", "ses", "si", "son", "sont", "sur", "t", "ta", "te", "tes",
+          "toi", "ton", "tous", "tout", "très", "tu", "un", "une", "vos", "votre",
+          "vous", "y", "à", "était", "été", "être"]
+
+GERMAN = ["aber", "alle", "allem", "allen", "aller", "alles", "als", "also", "am", "an",
+          "andere", "anderen", "auch", "auf", "aus", "bei", "bin", "bis", "bist", "da",
+          "damit", "dann", "das", "dass", "daß", "dein", "deine", "dem", "den", "der",
+          "des", "dessen", "dich", "die", "dies", "diese", "diesem", "diesen", "dieser", "dieses",
+          "dir", "doch", "dort", "du", "durch", "ein", "eine", "einem", "einen", "einer",
+          "eines", "er", "es", "euer", "eure", "für", "habe", "haben", "hat", "hatte",
+          "hatten", "hier", "hinter", "ich", "ihm", "ihn", "ihnen", "ihr", "ihre", "im",
+          "in", "indem", "ins", "ist", "jede", "jedem", "jeden", "jeder", "jedes", "jetzt",
+          "kann", "kein", "keine", "können", "könnte", "mich", "mir", "mit", "muss", "nach",
+          "nicht", "nichts", "noch", "nun", "nur", "ob", "oder", "ohne", "sehr", "sein",
+          "seine", "sich", "sie", "sind", "so", "soll", "sollte", "sondern", "um", "und",
+          "uns", "unser", "unter", "viel", "vom", "von", "vor", "war", "waren", "was",
+          "weil", "welche", "wenn", "werde", "werden", "wie", "wieder", "will", "wir", "wird",
+          "wo", "wollen", "würde", "zu", "zum", "zur", "zwar", "zwischen", "über"]
+
+
+StopWords.register('en', StopWords.stop_words)
+StopWords.register('es', SPANISH)
+StopWords.register('fr', FRENCH)
+StopWords.register('de', GERMAN)
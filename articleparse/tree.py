@@ -0,0 +1,219 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+from array import array
+
+from articleparse.analyzer import anchor_texts, strip_anchors, word_features
+from articleparse.stopwords import StopWords
+
+
+# the sums SectionTree.features gives for each node
+SUMS = ('chars', 'anchors', 'anchor_chars', 'words', 'stop_words')
+
+
+class SectionTree(object):
+    '''
+    The nesting of the div elements of a parsed document, built from the
+    offsets of its sections without scanning the document again. Nodes
+    are kept as flat arrays of integers rather than objects, and numbered
+    in the order their divs open, so every node comes after its parent.
+    Node 0 is the document itself.
+
+    parent, first_child, next_sibling: node indexes, -1 for none
+    start, end: offsets of the node's tags in the parsed document, end
+        is that of the end of the document if the div is never closed
+    first, last: range of the sections inside the node, first to last
+        inclusive, an empty range if last < first
+    node: for each section (by position), the innermost node it is in
+
+    Nothing is recursive, so the depth of the nesting does not matter.
+    '''
+    def __init__(self, buf, spans, sections = ()):
+        '''
+        Parameters
+        ----------
+        buf: str
+            the parsed document
+        spans: list of (start, end)
+            the offsets of its sections, as split on div tags
+            by articleparse.htmlparse.Tokenizer.spans
+        sections: list of articleparse.analyzer.Section
+            sections of buf already analyzed, as parse_sections keeps
+            them, whose features section_features reads rather than
+            counting them again
+        '''
+        self.buf = buf
+        self.spans = spans
+        self.sections = sections
+        self.parent = array('q', [-1])
+        self.first_child = array('q', [-1])
+        self.next_sibling = array('q', [-1])
+        self.start = array('q', [0])
+        self.end = array('q', [len(buf)])
+        self.first = array('q', [0])
+        self.last = array('q', [len(spans) - 1])
+        self.node = array('q')
+
+        # last child of each node, while building
+        last_child = [-1]
+        stack = [0]
+        for i, (start, end) in enumerate(spans):
+            self.node.append(stack[-1])
+            if i + 1 == len(spans):
+                break
+            # the tag between this section and the next
+            if buf[end + 1] == "/":
+                # an end tag with no div open is ignored
+                if len(stack) > 1:
+                    n = stack.pop()
+                    self.end[n] = spans[i + 1][0]
+                    self.last[n] = i
+            else:
+                n = len(self.parent)
+                parent = stack[-1]
+                self.parent.append(parent)
+                self.first_child.append(-1)
+                self.next_sibling.append(-1)
+                self.start.append(end)
+                self.end.append(len(buf))
+                self.first.append(i + 1)
+                self.last.append(len(spans) - 1)
+                last_child.append(-1)
+                if last_child[parent] < 0:
+                    self.first_child[parent] = n
+                else:
+                    self.next_sibling[last_child[parent]] = n
+                last_child[parent] = n
+                stack.append(n)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def children(self, n):
+        '''
+        generator over the children of node n
+        '''
+        child = self.first_child[n]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def depth(self, n):
+        ret = 0
+        while self.parent[n] >= 0:
+            n = self.parent[n]
+            ret += 1
+        return ret
+
+    def depths(self):
+        '''
+        the depth of every node, in one pass since parents come first
+        '''
+        ret = array('q', [0]) * len(self.parent)
+        parent = self.parent
+        for n in range(1, len(ret)):
+            ret[n] = ret[parent[n]] + 1
+        return ret
+
+    def aggregate(self, values):
+        '''
+        Totals over subtrees, in one pass from the last node to the first,
+        which adds each node's total to its parent's once it is complete
+
+        Parameters
+        ----------
+        values: list of numbers, one per node
+
+        Returns
+        -------
+        list, for each node, the sum of values over the node and its descendants
+        '''
+        ret = list(values)
+        parent = self.parent
+        for n in range(len(ret) - 1, 0, -1):
+            ret[parent[n]] += ret[n]
+        return ret
+
+    def own(self, values):
+        '''
+        for each node, the sum of the values of the sections directly in it
+
+        Parameters
+        ----------
+        values: list of numbers, one per section
+        '''
+        ret = [0] * len(self.parent)
+        for n, value in zip(self.node, values):
+            ret[n] += value
+        return ret
+
+    def section_features(self, stop_words = None):
+        '''
+        Returns
+        -------
+        dict of lists with a value per section for each of SUMS: characters
+        (anchors stripped), anchors, characters in anchors, words and stop words.
+        Those of the sections given to the tree are read from their features,
+        unless their words were estimated, and only the others are counted
+        '''
+        stop_words = StopWords.get() if stop_words is None else stop_words
+        known = dict((sec.position(), sec) for sec in self.sections
+                     if sec.analyzed and sec.errors is None)
+        ret = dict((key, [0] * len(self.spans)) for key in SUMS)
+        for i, (start, end) in enumerate(self.spans):
+            sec = known.get(i)
+            if sec is not None:
+                # the densities are ratios of the counts, so they give them back
+                ret['chars'][i] = sec.len()
+                ret['anchors'][i] = sec.anchor_count
+                ret['anchor_chars'][i] = int(round(sec.anchor_density * sec.len()))
+                ret['words'][i] = sec.word_count
+                ret['stop_words'][i] = int(round(sec.stop_word_density * sec.word_count))
+            elif end - start > 1:
+                sec = self.buf[start:end]
+                anchors = anchor_texts(sec)
+                text = strip_anchors(sec)
+                words, _, _, stops = word_features(text, stop_words)
+                ret['chars'][i] = len(text)
+                ret['anchors'][i] = len(anchors)
+                ret['anchor_chars'][i] = sum(len(anchor) for anchor in anchors)
+                ret['words'][i] = words
+                ret['stop_words'][i] = stops
+        return ret
+
+    def features(self, stop_words = None):
+        '''
+        Returns
+        -------
+        dict of lists with the total over each node's subtree of each of SUMS
+        '''
+        return dict((key, self.aggregate(self.own(values)))
+                    for key, values in self.section_features(stop_words).items())
+
+    def best(self, weights):
+        '''
+        Parameters
+        ----------
+        weights: list of numbers, one per section
+
+        Returns
+        -------
+        (node, total) for the node whose subtree has the largest total weight,
+        the deepest of the nodes with that total, and the first in the
+        document of those at the same depth
+        '''
+        totals = self.aggregate(self.own(weights))
+        depths = self.depths()
+        n = max(range(0, len(totals)), key = lambda n: (totals[n], depths[n], -n))
+        return n, totals[n]
+
+    def text(self, n):
+        '''
+        the text of the sections in node n and its descendants, one paragraph each
+        '''
+        return "\n\n".join(text for text in (strip_anchors(self.buf[start:end]).strip()
+                                             for start, end in self.spans[self.first[n]:self.last[n] + 1])
+                           if text)
@@ -0,0 +1,322 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import itertools
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from articleparse.analyzer import (ANCHOR_DENSITY, WORD_COUNT, STOP_WORD_DENSITY, NEIGHBOR_WINDOW,
+                                   NEIGHBOR_WEIGHT, split_words, lt, gt, bt)
+from articleparse.batch import map_jobs
+from articleparse.extractor import Extractor
+from articleparse.vectorized import FEATURES, COLUMNS, feature_matrix, points, combine, require_numpy
+
+
+# comparators by the name they are saved under
+COMPARATORS = {'lt': lt, 'gt': gt, 'bt': bt}
+
+# labels of the sections in a FeatureStore
+CONTENT = 1
+BOILERPLATE = 0
+UNLABELLED = -1
+
+# share of a section's words that must be in the article for it to be content
+ARTICLE_OVERLAP = 0.5
+
+
+def default_grid():
+    '''
+    Candidate rules for the features of default_classification, around
+    its own, and the probability cutoffs to try. Each feature has a
+    comparator, the thresholds and the margins to try with them
+    '''
+    return {ANCHOR_DENSITY: {'comparator': 'lt', 'thresholds': [0.2, 0.25, 0.333, 0.4, 0.5],
+                             'margins': [0, 0.1, 0.2]},
+            WORD_COUNT: {'comparator': 'gt', 'thresholds': [20, 30, 40, 60, 80],
+                         'margins': [0, 0.1, 0.2]},
+            STOP_WORD_DENSITY: {'comparator': 'bt', 'thresholds': [[.25, .566], [.30, .566], [.30, .6], [.35, .6]],
+                                'margins': [0, 0.02, 0.05]},
+            'probability': [0.5, 0.6, 0.7, 0.8, 0.9]}
+
+
+def _words(text):
+    return [word.casefold() for word in split_words(text)]
+
+
+def _labels(sections, doc):
+    '''
+    labels from a labelled document's 'positions', those of its content
+    sections, or its 'article', the text of the article body
+    '''
+    if doc.get('positions') is not None:
+        content = set(doc['positions'])
+        return [CONTENT if sec.position() in content else BOILERPLATE for sec in sections]
+    if doc.get('article') is not None:
+        article = set(_words(doc['article']))
+        ret = []
+        for sec in sections:
+            words = _words(sec.txt())
+            found = sum(1 for word in words if word in article)
+            ret.append(CONTENT if words and found >= ARTICLE_OVERLAP * len(words) else BOILERPLATE)
+        return ret
+    return [UNLABELLED] * len(sections)
+
+
+def _rows(extractor, doc):
+    sections = extractor.sections(doc)
+    # the features are tried against other thresholds than the
+    # extractor's, so estimated ones are all counted exactly
+    return (feature_matrix(sections, None), [sec.position() for sec in sections],
+            [sec.len() for sec in sections], _labels(sections, doc))
+
+
+class FeatureStore(object):
+    '''
+    The features of every section of a set of pages, one row per section
+    in page order, with each section's position, length, page and label.
+    Saved as a NumPy .npz file, so classifications can be tried against
+    the sections without parsing the pages again.
+
+    features: float64 array, a column per feature in vectorized.FEATURES order
+    position, length: int64 arrays, as Section.position and Section.len give them
+    document: int64 array, the index in ids of each section's page
+    label: int8 array, CONTENT, BOILERPLATE or UNLABELLED
+    ids: list of the pages' ids
+    threshold: the section threshold the pages were parsed with
+    '''
+    def __init__(self, features, position, length, document, label, ids, threshold):
+        self.features = features
+        self.position = position
+        self.length = length
+        self.document = document
+        self.label = label
+        self.ids = ids
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.label)
+
+    def save(self, path):
+        np.savez(path, features = self.features, position = self.position, length = self.length,
+                 document = self.document, label = self.label, ids = np.array(self.ids, dtype = str),
+                 columns = np.array(FEATURES, dtype = str), threshold = np.array(self.threshold))
+
+    @classmethod
+    def load(cls, path):
+        require_numpy()
+        with np.load(path) as data:
+            if list(data['columns']) != FEATURES:
+                raise ValueError("%s has columns %s, expected %s" % (path, list(data['columns']), FEATURES))
+            return cls(data['features'], data['position'], data['length'], data['document'],
+                       data['label'], data['ids'].tolist(), int(data['threshold']))
+
+
+def dump(docs, extractor = None, workers = 0, chunksize = 16):
+    '''
+    Parses labelled pages into a FeatureStore
+
+    Parameters
+    ----------
+    docs: iterable of dicts
+        documents as accepted by Extractor.sections, with an 'id' and the
+        labels of their sections as either 'positions', the positions of
+        the content sections, or 'article', the text of the article body,
+        which sections mostly made of its words are taken to be part of
+    extractor: articleparse.extractor.Extractor
+        parses the pages, and its threshold decides which sections are kept
+    workers: int
+        processes to parse the pages with, 0 parses them in this process
+    chunksize: int
+        pages sent to a worker at a time
+
+    Returns
+    -------
+    FeatureStore
+    '''
+    require_numpy()
+    if extractor is None:
+        extractor = Extractor()
+    ids = []
+
+    def jobs():
+        for doc in docs:
+            ids.append(doc.get('id', len(ids)))
+            yield doc
+
+    parts = list(map_jobs(_rows, jobs(), extractor, workers = workers, chunksize = chunksize))
+
+    features = [part[0] for part in parts]
+    return FeatureStore(np.concatenate(features) if features else np.empty((0, len(FEATURES))),
+                        np.array([p for part in parts for p in part[1]], dtype = np.int64),
+                        np.array([n for part in parts for n in part[2]], dtype = np.int64),
+                        np.repeat(np.arange(len(parts), dtype = np.int64), [len(part[1]) for part in parts]),
+                        np.array([l for part in parts for l in part[3]], dtype = np.int8),
+                        ids, extractor.threshold)
+
+
+def sweep(store, grid = None, neighbor_window = NEIGHBOR_WINDOW, neighbor_weight = NEIGHBOR_WEIGHT):
+    '''
+    Scores the labelled sections of a FeatureStore against every
+    combination of the rules in a grid and every probability cutoff,
+    in vectorized passes over the store
+
+    Parameters
+    ----------
+    store: FeatureStore
+    grid: dict
+        candidate rules for each feature and the probability cutoffs,
+        as in default_grid, which is used if not given
+    neighbor_window, neighbor_weight:
+        the neighbor classifier's settings, as in Analyzer
+
+    Returns
+    -------
+    list of dicts with the keys classification, probability, precision,
+    recall, f1, tp, fp and fn, best f1 first
+    '''
+    require_numpy()
+    grid = default_grid() if grid is None else grid
+    cutoffs = grid.get('probability', [0.8])
+
+    # the points of each rule are computed once, and summed for each combination
+    candidates = []
+    for feature in FEATURES:
+        spec = grid.get(feature)
+        if not spec:
+            continue
+        comparator = COMPARATORS[spec['comparator']]
+        column = store.features[:, COLUMNS[feature]]
+        rules = []
+        for threshold, margin in itertools.product(spec['thresholds'], spec.get('margins', [0])):
+            half = (2 * points(column, threshold, comparator, margin)).astype(np.int8)
+            rules.append(((feature, [threshold, comparator, margin]), half))
+        candidates.append(rules)
+    possible = float(len(candidates))
+
+    labelled = store.label != UNLABELLED
+    content = store.label[labelled] == CONTENT
+    positives = int(content.sum())
+    ret = []
+    for combination in itertools.product(*candidates):
+        half = np.zeros(len(store), dtype = np.int16)
+        for _, rule_half in combination:
+            half += rule_half
+        probs = combine(half / 2.0, possible, neighbor_window, neighbor_weight, store.document)[labelled]
+        classification = dict(rule for rule, _ in combination)
+        for cutoff in cutoffs:
+            predicted = probs >= cutoff
+            tp = int((predicted & content).sum())
+            fp = int(predicted.sum()) - tp
+            fn = positives - tp
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / positives if positives else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            ret.append({'classification': classification, 'probability': cutoff,
+                        'precision': precision, 'recall': recall, 'f1': f1,
+                        'tp': tp, 'fp': fp, 'fn': fn})
+    ret.sort(key = lambda result: -result['f1'])
+    return ret
+
+
+def _comparator_name(comparator):
+    for name, value in COMPARATORS.items():
+        if value is comparator:
+            return name
+    raise ValueError("only the lt, gt and bt comparators can be saved, not %r" % (comparator,))
+
+
+def save_config(path, classification, probability = None, neighbor_window = NEIGHBOR_WINDOW,
+                neighbor_weight = NEIGHBOR_WEIGHT):
+    '''
+    Saves a classification, and the settings it was tuned with, as JSON
+    that load_config reads back
+    '''
+    config = {'classification': dict((key, [value[0], _comparator_name(value[1]), value[2]])
+                                      for key, value in classification.items()),
+              'probability': probability,
+              'neighbor_window': neighbor_window,
+              'neighbor_weight': neighbor_weight}
+    with open(path, "w") as f:
+        json.dump(config, f, indent = 2, sort_keys = True)
+
+
+def load_config(path):
+    '''
+    Loads a configuration saved by save_config, as keyword
+    arguments for Extractor:
+
+        extractor = Extractor(threshold = 100, **load_config("tuned.json"))
+    '''
+    with open(path) as f:
+        config = json.load(f)
+    classification = {}
+    for key, (threshold, comparator, margin) in config['classification'].items():
+        if key not in FEATURES:
+            raise ValueError("unknown feature %r in %s" % (key, path))
+        classification[key] = [threshold, COMPARATORS[comparator], margin]
+    config['classification'] = classification
+    return config
+
+
+def _format(result):
+    rules = ", ".join("%s %s %r ~%r" % (key, _comparator_name(value[1]), value[0], value[2])
+                      for key, value in sorted(result['classification'].items()))
+    return "f1 %.3f  precision %.3f  recall %.3f  probability %.2f  %s" % (
+        result['f1'], result['precision'], result['recall'], result['probability'], rules)
+
+
+def main():
+    '''
+    dumps the section features of labelled pages to a store, and
+    sweeps grids of classifications over a store
+    '''
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest = "command")
+    d = commands.add_parser("dump", help="parse labelled pages into a feature store")
+    d.add_argument("jsonl", help="labelled pages, one JSON object per line (see dump)")
+    d.add_argument("--output", required=True, help="feature store to write (.npz)")
+    d.add_argument("--threshold", type=int, help="section length threshold", default=100)
+    d.add_argument("--workers", type=int, help="worker processes", default=0)
+    s = commands.add_parser("sweep", help="score a grid of classifications against a feature store")
+    s.add_argument("store", help="feature store written by dump")
+    s.add_argument("--grid", help="JSON grid of candidate rules (default: around the default classification)")
+    s.add_argument("--neighbor-window", type=int, default=NEIGHBOR_WINDOW)
+    s.add_argument("--neighbor-weight", type=float, default=NEIGHBOR_WEIGHT)
+    s.add_argument("--top", type=int, default=10, help="number of results to report")
+    s.add_argument("--output", help="file to save the best configuration to")
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        with open(args.jsonl) as f:
+            docs = (json.loads(line) for line in f if line.strip())
+            store = dump(docs, Extractor(threshold = args.threshold), workers = args.workers)
+        store.save(args.output)
+        sys.stdout.write("%d sections of %d pages, %d labelled content\n" %
+                         (len(store), len(store.ids), int((store.label == CONTENT).sum())))
+    elif args.command == "sweep":
+        grid = None
+        if args.grid:
+            with open(args.grid) as f:
+                grid = json.load(f)
+        results = sweep(FeatureStore.load(args.store), grid, args.neighbor_window, args.neighbor_weight)
+        for result in results[:args.top]:
+            sys.stdout.write(_format(result) + "\n")
+        if args.output and results:
+            best = results[0]
+            save_config(args.output, best['classification'], best['probability'],
+                        args.neighbor_window, args.neighbor_weight)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from articleparse.analyzer import (ANCHOR_DENSITY, ANCHOR_COUNT, WORD_COUNT, UPPER_COUNT,
+                                   AVG_WORD_LEN, SENTENCE_COUNT, AVG_SENTENCE_LEN,
+                                   STOP_WORD_DENSITY, NEIGHBOR_WINDOW, NEIGHBOR_WEIGHT, lt, gt, bt)
+
+
+'''
+Column order of the feature matrix
+'''
+FEATURES = [ANCHOR_DENSITY,
+            ANCHOR_COUNT,
+            WORD_COUNT,
+            UPPER_COUNT,
+            AVG_WORD_LEN,
+            SENTENCE_COUNT,
+            AVG_SENTENCE_LEN,
+            STOP_WORD_DENSITY]
+
+# a Section's features as a tuple, in FEATURES order
+feature_values = operator.attrgetter(*FEATURES)
+
+COLUMNS = dict((feature, i) for i, feature in enumerate(FEATURES))
+
+
+def require_numpy():
+    '''
+    raises ImportError if numpy, which the vectorized functions need, is not installed
+    '''
+    if np is None:
+        raise ImportError("numpy is required for vectorized scoring")
+
+
+def resolved(sections, classification = None):
+    '''
+    Sections whose features are ready to be read: those estimated too
+    close to a threshold of classification are counted exactly first,
+    as Analyzer does before scoring them (see Section.resolve), so
+    their features give the same scores. Without a classification,
+    every estimate is counted exactly
+
+    Returns
+    -------
+    sections
+    '''
+    for sec in sections:
+        if sec.errors is not None:
+            if classification is None:
+                sec.exact()
+            else:
+                sec.resolve(classification)
+    return sections
+
+
+def feature_matrix(sections, classification = None):
+    '''
+    Parameters
+    ----------
+    sections: list of articleparse.analyzer.Section
+    classification: dict
+        the classification the features will be scored against, see resolved
+
+    Returns
+    -------
+    float64 array with one row per section and one column per feature
+    '''
+    require_numpy()
+    if not sections:
+        return np.empty((0, len(FEATURES)), dtype=np.float64)
+    return np.array(list(map(feature_values, resolved(sections, classification))), dtype=np.float64)
+
+
+def in_range(values, threshold, margin):
+    '''
+    Array version of analyzer.in_range
+    '''
+    if margin == 0:
+        return np.zeros(values.shape, dtype=bool)
+    if hasattr(threshold, '__iter__'):
+        ret = np.zeros(values.shape, dtype=bool)
+        for t in threshold:
+            ret |= (values < (t + t*margin)) & (values > (t - t*margin))
+        return ret
+    return (values < (threshold + threshold*margin)) & (values > (threshold - threshold*margin))
+
+
+def compare(values, threshold, comparator):
+    '''
+    Applies a classification comparator to a column of values
+    '''
+    if comparator is lt:
+        return values < threshold
+    if comparator is gt:
+        return values > threshold
+    if comparator is bt:
+        return (values > threshold[0]) & (values < threshold[1])
+    # user supplied comparators are applied one value at a time
+    return np.fromiter((bool(comparator(v, threshold)) for v in values.tolist()),
+                       dtype=bool, count=len(values))
+
+
+def points(values, threshold, comparator, margin):
+    '''
+    Array version of analyzer.points
+    '''
+    partial = in_range(values, threshold, margin)
+    return np.where(partial, 0.5, np.where(compare(values, threshold, comparator), 1.0, 0.0))
+
+
+def score(matrix, classification):
+    '''
+    Scores every row of a feature matrix, as Analyzer's classifier does
+
+    Returns
+    -------
+    (score, points possible): float64 array and float
+    '''
+    require_numpy()
+    ret = np.zeros(matrix.shape[0], dtype=np.float64)
+    for key, value in classification.items():
+        threshold, comparator, margin = value
+        ret += points(matrix[:, COLUMNS[key]], threshold, comparator, margin)
+    return ret, float(len(classification))
+
+
+def probabilities(matrix, classification):
+    '''
+    Returns
+    -------
+    float64 array, the probability each row is content
+    by the individual classifier alone
+    '''
+    points, possible = score(matrix, classification)
+    return points / possible
+
+
+def neighbor_points(probabilities, window = NEIGHBOR_WINDOW, weight = NEIGHBOR_WEIGHT, documents = None):
+    '''
+    Array version of analyzer.neighbor_points, for every section of a document,
+    or of several documents one after another with documents giving the
+    document of each section, so that sections only have neighbors in their own
+
+    Returns
+    -------
+    (points, points possible): float64 arrays
+    '''
+    require_numpy()
+    n = len(probabilities)
+    total = np.zeros(n, dtype=np.float64)
+    count = np.zeros(n, dtype=np.float64)
+    # from the first section of the window to the last, the order
+    # analyzer.neighbor_points adds them in
+    for d in list(range(-window, 0)) + list(range(1, window + 1)):
+        if abs(d) >= n:
+            continue
+        # sections i and i + d, for the i that have a section d away
+        near = slice(-d, None) if d < 0 else slice(0, -d)
+        far = slice(0, d) if d < 0 else slice(d, None)
+        if documents is None:
+            total[near] += probabilities[far]
+            count[near] += 1
+        else:
+            same = documents[near] == documents[far]
+            total[near] += np.where(same, probabilities[far], 0.0)
+            count[near] += same
+    has = count > 0
+    ret = np.zeros(n, dtype=np.float64)
+    ret[has] = weight * (total[has] / count[has])
+    return ret, np.where(has, float(weight), 0.0)
+
+
+def combine(points, possible, window = NEIGHBOR_WINDOW, weight = NEIGHBOR_WEIGHT, documents = None):
+    '''
+    Probabilities of the sections of a document (or of several, see
+    neighbor_points), from the individual classifier's points, as score
+    gives them, and the neighbor classifier
+    '''
+    probs = points / possible if possible else np.zeros(len(points), dtype=np.float64)
+    points2, possible2 = neighbor_points(probs, window, weight, documents)
+    total = possible + possible2
+    ret = np.zeros(len(points), dtype=np.float64)
+    np.divide(points + points2, total, out=ret, where=total != 0)
+    return ret
+
+
+def analyze_sections(analyzer, probability = None):
+    '''
+    Vectorized equivalent of Analyzer.analyze_sections
+    '''
+    return analyze_many([analyzer], probability)[0]
+
+
+def analyze_many(analyzers, probability = None):
+    '''
+    Scores the sections of many documents at once. Documents
+    are grouped by classification so that each distinct
+    configuration is scored in a single pass, then each document's
+    sections are combined with their neighbors'
+
+    Parameters
+    ----------
+    analyzers: list of Analyzer
+        with parse_sections already called
+    probability: float
+        if set, sections less likely than this to be content are left out
+
+    Returns
+    -------
+    list with, for each analyzer, the list that its
+    analyze_sections would return
+    '''
+    require_numpy()
+    ret = [None] * len(analyzers)
+    groups = {}
+    for i, a in enumerate(analyzers):
+        key = tuple((k, repr(v[0]), v[1], v[2]) for k, v in sorted(a.classification.items()))
+        groups.setdefault(key, []).append(i)
+
+    for members in groups.values():
+        classification = analyzers[members[0]].classification
+        sections = [analyzers[i].sections for i in members]
+        matrix = feature_matrix([sec for secs in sections for sec in secs], classification)
+        points, possible = score(matrix, classification)
+        offset = 0
+        for i, secs in zip(members, sections):
+            a = analyzers[i]
+            probs = combine(points[offset:offset + len(secs)], possible,
+                            a.neighbor_window, a.neighbor_weight).tolist()
+            ret[i] = [{'probability': probs[j], 'content': sec.txt()}
+                      for j, sec in enumerate(secs)
+                      if probability is None or probs[j] >= probability]
+            offset += len(secs)
+    return ret
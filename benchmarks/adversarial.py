@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import sys
+import time
+
+from articleparse.analyzer import RETAIN_LIST, CONVERT_LIST, Analyzer, SectionParser
+from articleparse.htmlparse import HtmlParse
+
+
+def repeat(unit, size, head = "<html><body><div>", tail = "</div></body></html>"):
+    return head + unit * (size // len(unit)) + tail
+
+
+'''
+Inputs that made a regex rescan to the end of the document (or line)
+at every repetition of a pattern, taking time quadratic in their size
+'''
+INPUTS = {
+    'unclosed_script': lambda n: repeat("<script>x ", n),
+    'unclosed_style': lambda n: repeat("<style>x ", n),
+    'unclosed_comment': lambda n: repeat("<!-- x ", n),
+    'unclosed_tag': lambda n: repeat("x < ", n, tail = ""),
+    'unclosed_anchor': lambda n: repeat("<a href='#'>link ", n),
+    'anchor_text': lambda n: repeat("&lt;a ", n),
+    'long_entity': lambda n: repeat("&" + "x" * 1000 + " ", n),
+    'single_line': lambda n: repeat("<div class='c'><span>word</span> <a href='/'>a</a></div>", n),
+}
+
+
+def legacy(html):
+    parser = HtmlParse(content = html)
+    parser.remove_non_html()
+    parser.isolate_body()
+    parser.strip(retain_list = RETAIN_LIST)
+    parser.convert(CONVERT_LIST)
+    parser.decode_entities()
+
+
+def analyze(html):
+    a = Analyzer(content = html)
+    a.parse_sections(threshold = 0)
+    a.analyze_sections()
+
+
+def stream(html):
+    parser = SectionParser()
+    for i in range(0, len(html), 4096):
+        parser.feed(html[i:i + 4096])
+    parser.close()
+
+
+PIPELINES = {'analyze': analyze, 'stream': stream, 'legacy': legacy}
+
+
+def timeit(func, html, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def growth(times):
+    '''
+    the mean ratio between the times of successive sizes, from the first
+    time large enough to measure reliably to the last. A single pair of
+    timings is noisy, the trend over several doublings is not
+    '''
+    measured = [i for i, t in enumerate(times) if t > 0.002]
+    if len(measured) < 2:
+        return 0.0
+    first, last = measured[0], measured[-1]
+    return (times[last] / times[first]) ** (1.0 / (last - first))
+
+
+def main():
+    '''
+    times each adversarial input at doubling sizes, the best of
+    --repeat runs each. Linear time shows as a growth of about 2 per
+    doubling, quadratic as 4
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50000, help="smallest input size, in characters")
+    parser.add_argument("--steps", type=int, default=4, help="number of doublings")
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), nargs="+", default=sorted(PIPELINES))
+    parser.add_argument("--input", choices=sorted(INPUTS), nargs="+", default=sorted(INPUTS))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per size, the best is kept")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with an error if any growth per doubling exceeds --max-ratio")
+    parser.add_argument("--max-ratio", type=float, default=3.2)
+    args = parser.parse_args()
+
+    sizes = [args.size * 2 ** i for i in range(0, args.steps)]
+    print("%-18s %-8s %s  %s" % ("input", "pipeline", " ".join("%9d" % s for s in sizes), "   growth"))
+    failed = []
+    for name in args.input:
+        for pipeline in args.pipeline:
+            times = [timeit(PIPELINES[pipeline], INPUTS[name](size), args.repeat) for size in sizes]
+            ratio = growth(times)
+            print("%-18s %-8s %s  %9.2f" % (name, pipeline, " ".join("%9.4f" % t for t in times), ratio))
+            if ratio > args.max_ratio:
+                failed.append((name, pipeline))
+
+    if args.check and failed:
+        for name, pipeline in failed:
+            print("superlinear: %s (%s)" % (name, pipeline))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import random
+import time
+
+from articleparse.analyzer import Analyzer, AVG_WORD_LEN, STOP_WORD_DENSITY, UPPER_COUNT, WORD_COUNT
+from generators import page, paragraph
+
+
+ESTIMATED = (WORD_COUNT, AVG_WORD_LEN, UPPER_COUNT, STOP_WORD_DENSITY)
+
+
+def dump(size, seed = 0):
+    '''
+    an article page with a comment dump of about size characters in one div
+    '''
+    rng = random.Random(seed)
+    comments = []
+    length = 0
+    while length < size:
+        comment = "<a href=\"/u/%d\">user%d</a> %s." % (len(comments), len(comments), paragraph(rng, rng.randint(3, 40)))
+        comments.append(comment)
+        length += len(comment) + 1
+    return page(20000, seed).replace("</body>", "<div class=\"comments\">%s</div></body>" % " ".join(comments))
+
+
+def run(html, approximate):
+    a = Analyzer(content = html, approximate = approximate)
+    start = time.perf_counter()
+    a.parse_sections(100)
+    scores = a.scores()
+    return time.perf_counter() - start, a.sections, scores
+
+
+def main():
+    '''
+    compares analyzing pages with a giant div exactly against estimating
+    the word features of long sections, reporting each estimate's error
+    against its bound
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 400000, 1600000],
+                        help="characters in the giant div")
+    parser.add_argument("--approximate", type=int, default=65536, help="length above which features are estimated")
+    args = parser.parse_args()
+
+    print("%-10s %10s %10s %8s %6s  %s" % ("size", "exact (s)", "approx (s)", "speedup", "same", "error / bound"))
+    for size in args.sizes:
+        html = dump(size)
+        exact_time, exact, exact_scores = run(html, None)
+        approx_time, approx, approx_scores = run(html, args.approximate)
+        errors = []
+        for e, s in zip(exact, approx):
+            if s.errors is not None:
+                errors.extend("%s %.3g/%.3g" % (key, abs(getattr(s, key) - getattr(e, key)), s.errors[key])
+                              for key in ESTIMATED)
+        print("%-10d %10.3f %10.3f %7.1fx %6s  %s" % (size, exact_time, approx_time, exact_time / approx_time,
+                                                      exact_scores == approx_scores, ", ".join(errors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from articleparse.extractor import Extractor
+from articleparse.mapped import documents
+from decode import heavy_head
+
+
+def archive(path, pages, size, head):
+    '''
+    writes pages synthetic pages to path, one after another,
+    and returns their (offset, length) ranges
+    '''
+    ranges = []
+    offset = 0
+    with open(path, "wb") as f:
+        for i in range(pages):
+            data = heavy_head(size, head, seed = i)
+            f.write(data)
+            ranges.append((offset, len(data)))
+            offset += len(data)
+    return ranges
+
+
+def read_whole(extractor, path, ranges):
+    # the archive read into memory, each record decoded in full
+    with open(path, "rb") as f:
+        data = f.read()
+    return [extractor.analyze(data[offset:offset + length].decode("utf-8"))
+            for offset, length in ranges]
+
+
+def mapped(extractor, path, ranges):
+    return [extractor.analyze(doc) for doc in documents(path, ranges)]
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    ret = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ret, elapsed, peak
+
+
+def main():
+    '''
+    compares extracting the records of a concatenated archive after
+    reading it whole against extracting them from its mapping
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20, help="pages in the archive")
+    parser.add_argument("--size", type=int, default=200000, help="body size of each page, in characters")
+    parser.add_argument("--head", type=int, default=500000, help="head size of each page, in characters")
+    args = parser.parse_args()
+
+    extractor = Extractor(threshold = 100)
+    fd, path = tempfile.mkstemp(suffix = ".html")
+    os.close(fd)
+    try:
+        ranges = archive(path, args.pages, args.size, args.head)
+        print("archive: %d pages, %.1f MB" % (len(ranges), os.path.getsize(path) / 1e6))
+        print("%-8s %10s %14s" % ("input", "time (s)", "peak (MB)"))
+        results = []
+        for name, func in (("read", read_whole), ("mapped", mapped)):
+            ret, elapsed, peak = measure(func, extractor, path, ranges)
+            results.append(ret)
+            print("%-8s %10.3f %14.1f" % (name, elapsed, peak / 1e6))
+        print("same results: %s" % (results[0] == results[1]))
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from articleparse.columnar import write_many, read
+from articleparse.extractor import Extractor
+from generators import page, tiny_divs
+
+
+def json_lines(docs, path, extractor):
+    '''
+    the dicts of analyze_sections, written as JSON lines
+    '''
+    with open(path, "w") as f:
+        for i, doc in enumerate(docs):
+            f.write(json.dumps({'id': i, 'sections': extractor.analyze(doc)}) + "\n")
+
+
+def columnar(docs, path, extractor):
+    write_many(docs, path, extractor, batch_rows = 8192)
+
+
+def main():
+    '''
+    compares writing extraction results as JSON lines of dicts with
+    writing them as Arrow and Parquet record batches, and reading
+    them back
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100, help="pages to extract")
+    args = parser.parse_args()
+
+    docs = [page(50000, seed) if seed % 2 else tiny_divs(200, seed) for seed in range(args.pages)]
+    extractor = Extractor(threshold = 100)
+    tmp = tempfile.mkdtemp()
+    print("%-10s %10s %10s %10s %10s" % ("output", "write (s)", "peak (MB)", "size (MB)", "read (s)"))
+    for name, func, path in (("jsonl", json_lines, "out.jsonl"),
+                             ("arrow", columnar, "out.arrow"),
+                             ("parquet", columnar, "out.parquet")):
+        path = os.path.join(tmp, path)
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(docs, path, extractor)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        if name == "jsonl":
+            with open(path) as f:
+                rows = sum(len(json.loads(line)['sections']) for line in f)
+        else:
+            rows = read(path).num_rows
+        loaded = time.perf_counter() - start
+        print("%-10s %10.3f %10.1f %10.1f %10.3f  (%d sections)" %
+              (name, elapsed, peak / 1e6, os.path.getsize(path) / 1e6, loaded, rows))
+        os.remove(path)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
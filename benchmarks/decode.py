@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import time
+
+from articleparse.analyzer import Analyzer
+from articleparse.encoding import decode
+from generators import page
+
+
+def heavy_head(size, head_size, seed = 0):
+    '''
+    a synthetic page of roughly size characters, as UTF-8 bytes, with an
+    inline script of about head_size characters before the body, as left
+    by frameworks that embed their state in the page
+    '''
+    html = page(size, seed)
+    item = '{"title": "Café — naïve résumé", "tags": ["→", "<b>"], "n": [1, 2, 3]},\n'
+    head = "<script>\nvar state = [\n%s];\n</script>\n" % (item * (head_size // len(item)))
+    return html.replace("</head>", head + "</head>", 1).encode("utf-8")
+
+
+def full(data):
+    a = Analyzer(content = data.decode("utf-8"))
+    a.parse_sections(threshold = 100)
+    return a.sections
+
+
+def body_only(data):
+    a = Analyzer(content = data)
+    a.parse_sections(threshold = 100)
+    return a.sections
+
+
+def timeit(func, value, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    '''
+    compares decoding a whole page up front against handing the
+    Analyzer bytes, of which only the body is decoded
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1000000, help="body size, in characters")
+    parser.add_argument("--head", type=int, nargs="+", default=[0, 500000, 2000000],
+                        help="sizes of the head, in characters")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    args = parser.parse_args()
+
+    print("%10s %12s %12s %12s %12s %s" % ("head", "decode (s)", "body (s)",
+                                           "full (s)", "bytes (s)", "same"))
+    for head in args.head:
+        data = heavy_head(args.size, head)
+        same = ([s.text for s in full(data)] == [s.text for s in body_only(data)])
+        print("%10d %12.4f %12.4f %12.4f %12.4f %s" %
+              (head, timeit(lambda d: d.decode("utf-8"), data, args.repeat),
+               timeit(lambda d: decode(d, body_only = True), data, args.repeat),
+               timeit(full, data, args.repeat), timeit(body_only, data, args.repeat), same))
+
+
+if __name__ == "__main__":
+    main()
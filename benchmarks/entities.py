@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import random
+import re
+import time
+
+from articleparse.htmlparse import ENTITIES, NUMERIC_ENTITIES, unescape
+from generators import WORDS
+
+
+# the decoder HtmlParse.decode_entities used before unescape, one pass per entity
+LEGACY = [(r"&#0*34;", "\""), (r"&quot;", "\""),
+          (r"&#0*39;", "'"), (r"&apos;", "'"),
+          (r"&#0*38;", "&"), (r"&amp;", "&"),
+          (r"&#0*60;", "<"), (r"&lt;", "<"),
+          (r"&#0*62;", ">"), (r"&gt;", ">"),
+          (r"&#160;", " "), (r"&nbsp;", " "),
+          (r"&#169;", "Copyright"), (r"&copy;", "Copyright"),
+          (r"&#8212;", "-"), (r"&mdash;", "-"),
+          (r"&#8211;", "-"), (r"&ndash;", "-"),
+          (r"&#8217;", "'"), (r"&rsquo;", "'"),
+          (r"&#8220;", "\""), (r"&ldquo;", "\""),
+          (r"&#8221;", "\""), (r"&rdquo;", "\""),
+          (r"&#0*9;", " "), (r"&tab;", " "),
+          (r"&#201;", "e"), (r"&Eacute;", "e"),
+          (r"&#233;", "e"), (r"&eacute;", "e")]
+
+REFERENCES = ["&amp;", "&quot;", "&rsquo;", "&ldquo;", "&rdquo;", "&nbsp;", "&mdash;", "&hellip;",
+              "&eacute;", "&uuml;", "&#8217;", "&#x2019;", "&#169;", "&#X201C;", "&euro;", "&lt;"]
+
+
+def legacy(text):
+    for pattern, value in LEGACY:
+        text = re.sub(pattern, value, text)
+    return text
+
+
+def text(size, density, seed = 0):
+    '''
+    text of roughly size characters with a reference in place
+    of about density of the words
+    '''
+    rng = random.Random(seed)
+    ret = []
+    length = 0
+    while length < size:
+        word = rng.choice(REFERENCES) if rng.random() < density else rng.choice(WORDS)
+        ret.append(word)
+        length += len(word) + 1
+    return " ".join(ret)
+
+
+def timeit(func, value, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    '''
+    compares the single pass unescape against the multi-pass decoder
+    it replaced, and unescape with a small table against the full one
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1000000, help="text size, in characters")
+    parser.add_argument("--density", type=float, nargs="+", default=[0.01, 0.1, 0.3],
+                        help="fraction of words that are references")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    args = parser.parse_args()
+
+    print("%8s %12s %12s %8s" % ("density", "legacy (s)", "single (s)", "speedup"))
+    for density in args.density:
+        value = text(args.size, density)
+        old = timeit(legacy, value, args.repeat)
+        new = timeit(unescape, value, args.repeat)
+        print("%8.2f %12.4f %12.4f %7.1fx" % (density, old, new, old / new))
+
+    # the same text decoded with a table of 5 entities and with the full table
+    small = dict((name, ENTITIES[name]) for name in ("amp", "quot", "lt", "gt", "nbsp"))
+    rng = random.Random(0)
+    value = " ".join(rng.choice(["&amp;", "&quot;", "&lt;", "&gt;", "&nbsp;", "word"])
+                     for _ in range(args.size // 6))
+    few = timeit(lambda v: unescape(v, small, NUMERIC_ENTITIES), value, args.repeat)
+    full = timeit(unescape, value, args.repeat)
+    print("\n%d entities: %.4fs, %d entities: %.4fs" % (len(small), few, len(ENTITIES), full))
+
+
+if __name__ == "__main__":
+    main()
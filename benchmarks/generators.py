@@ -0,0 +1,75 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+
+WORDS = ("the of and a to in is you that it he was for on are as with his they "
+         "at be this have from or one had by word but not what all were we when "
+         "your can said there use an each which she do how their if will up other "
+         "about out many then them these so some her would make like him into time "
+         "has look two more write go see number no way could people my than first "
+         "Government Minister Reuters Tuesday Washington officials").split()
+
+
+def paragraph(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.replace(" it ", " it&rsquo;s ").replace(" and ", " &amp; ") + ". "
+
+
+def page(size, seed=0):
+    '''
+    generates a synthetic news page of roughly size characters
+    '''
+    rng = random.Random(seed)
+    head = ['<html><head><title>Synthetic</title>',
+            '<style type="text/css">\nbody { margin: 0; }\n.nav > a { color: red; }\n</style>',
+            '<script type="text/javascript">\nvar x = 1 < 2 && "</div>";\n</script>',
+            '</head>\n<body class="article">\n']
+    body = []
+    length = 0
+    while length < size:
+        block = ['<div class="nav"><ul>']
+        for _ in range(rng.randint(3, 10)):
+            block.append('<li><a href="/%d">%s</a></li>\n' % (rng.randint(0, 1000), paragraph(rng, 2)))
+        block.append('</ul></div>\n<!-- story -->\n<div class="story">')
+        for _ in range(rng.randint(2, 6)):
+            block.append('<p>%s<span class="x">%s</span>\r\n<a href="#">%s</a>&nbsp;%s</p>\n' %
+                         (paragraph(rng, 40), paragraph(rng, 5), paragraph(rng, 2), paragraph(rng, 30)))
+        block.append('<script>track(%d);</script></div>\n' % rng.randint(0, 100))
+        block.append('<div class="footer">&copy; 2016 <abbr>ACME</abbr> &mdash; all rights</div>\n')
+        block = "".join(block)
+        length += len(block)
+        body.append(block)
+    return "".join(head) + "".join(body) + "</body></html>"
+
+
+def tiny_divs(count, seed=0):
+    '''
+    generates a page made of many small divs, like
+    comment threads and link farms
+    '''
+    rng = random.Random(seed)
+    body = []
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 40)))
+        body.append('<div class="c%d"><a href="/u/%d">user %d</a> %s.</div>\n' % (i % 7, i, i, words))
+    return "<html><body>" + "".join(body) + "</body></html>"
+
+
+def nested(depth, width=3, seed=0):
+    '''
+    generates a page of divs nested depth deep, with width
+    paragraphs of text at every level
+    '''
+    rng = random.Random(seed)
+    body = []
+    for level in range(depth):
+        body.append('<div class="level%d">' % level)
+        for _ in range(width):
+            body.append('<p>%s</p>' % paragraph(rng, rng.randint(5, 60)))
+    body.append('</div>' * depth)
+    return "<html><body>" + "".join(body) + "</body></html>"
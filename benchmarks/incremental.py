@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import random
+import time
+
+from articleparse.extractor import Extractor
+from articleparse.incremental import IncrementalAnalyzer
+from generators import paragraph
+
+
+def live_blog(updates, seed = 0):
+    '''
+    versions of a live blog page, each with one more update at the
+    top, and every so often a correction to an earlier update
+    '''
+    rng = random.Random(seed)
+    posts = []
+    versions = []
+    for i in range(updates):
+        posts.insert(0, "<div class=\"post\"><h3>Update %d</h3><p>%s</p></div>" % (i, paragraph(rng, 80)))
+        if i % 10 == 9:
+            k = rng.randrange(len(posts))
+            posts[k] = posts[k].replace("</p>", " Correction: %s</p>" % paragraph(rng, 10))
+        versions.append("<html><head><title>Live</title></head><body>"
+                        "<div class=\"nav\"><a href=\"/\">Home</a> <a href=\"/news\">News</a></div>"
+                        "<div class=\"posts\">%s</div>"
+                        "<div class=\"footer\">Copyright</div></body></html>" % "".join(posts))
+    return versions
+
+
+def full(extractor, versions):
+    return [extractor.analyze(html) for html in versions]
+
+
+def incremental(extractor, versions):
+    inc = IncrementalAnalyzer(extractor)
+    return [inc.update("live", html)['sections'] for html in versions]
+
+
+def main():
+    '''
+    compares extracting every version of a growing live blog from
+    scratch against extracting each incrementally from the last
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=300, help="versions of the page")
+    args = parser.parse_args()
+
+    versions = live_blog(args.updates)
+    extractor = Extractor(threshold = 100, probability = 0.5)
+    print("%-12s %10s" % ("extraction", "time (s)"))
+    results = []
+    for name, func in (("full", full), ("incremental", incremental)):
+        start = time.perf_counter()
+        results.append(func(extractor, versions))
+        print("%-12s %10.3f" % (name, time.perf_counter() - start))
+    print("same results: %s" % (results[0] == results[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import tracemalloc
+
+from articleparse import Analyzer
+from articleparse.vectorized import FEATURES
+from generators import page, tiny_divs
+
+
+def measure(func):
+    '''
+    returns the result of func, the bytes it left allocated
+    and its peak allocation
+    '''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ret = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ret, current - before, peak - before
+
+
+def parsed(html):
+    a = Analyzer(content = html)
+    a.parse_sections(threshold = 20)
+    return a
+
+
+def copied(sections):
+    '''
+    the per-section text copies and attribute dicts
+    that sections used to hold
+    '''
+    ret = []
+    for sec in sections:
+        d = dict((feature, getattr(sec, feature)) for feature in FEATURES)
+        d['text'] = sec.txt()
+        d['pos'] = sec.pos
+        d['length'] = sec.length
+        ret.append(d)
+    return ret
+
+
+def main():
+    '''
+    measures memory held by parsed sections and by analyze_sections
+    results, with and without a probability cutoff
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--divs", type=int, default=20000, help="divs in the tiny div page")
+    parser.add_argument("--size", type=int, default=5000000, help="size of the news page")
+    parser.add_argument("--probability", type=float, default=0.8, help="probability cutoff")
+    args = parser.parse_args()
+
+    pages = [("tiny divs", tiny_divs(args.divs)), ("news page", page(args.size))]
+    print("%-10s %10s %9s %14s %14s %14s" % ("page", "MB", "sections", "parsed (KB)",
+                                             "copies (KB)", "results (KB)"))
+    for name, html in pages:
+        a, compact, _ = measure(lambda: parsed(html))
+        _, copies, _ = measure(lambda: copied(a.sections))
+        _, full, _ = measure(lambda: a.analyze_sections())
+        _, cut, _ = measure(lambda: a.analyze_sections(probability = args.probability))
+        print("%-10s %10.1f %9d %14d %14d %8d/%5d" % (name, len(html) / 1e6, len(a.sections),
+                                                      compact // 1024, copies // 1024,
+                                                      full // 1024, cut // 1024))
+    print("\nparsed: everything a parsed Analyzer holds, including the parsed document")
+    print("copies: what a text copy and attribute dict per section would add")
+    print("results: analyze_sections() without / with a probability cutoff")
+
+
+if __name__ == "__main__":
+    main()
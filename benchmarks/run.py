@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from articleparse import Analyzer
+from articleparse.analyzer import RETAIN_LIST, CONVERT_LIST
+from articleparse.htmlparse import HtmlParse
+from generators import page, tiny_divs, nested
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = os.path.join(HERE, "corpus")
+GOLDEN = os.path.join(HERE, "golden")
+
+'''
+The original multi-pass HtmlParse stages, run in order on one parser
+'''
+LEGACY_STAGES = [("remove_non_html", lambda p: p.remove_non_html()),
+                 ("isolate_body", lambda p: p.isolate_body()),
+                 ("strip", lambda p: p.strip(retain_list = RETAIN_LIST)),
+                 ("convert", lambda p: p.convert(CONVERT_LIST)),
+                 ("decode_entities", lambda p: p.decode_entities())]
+
+
+def corpus(scale = 1):
+    '''
+    Returns
+    -------
+    list of (name, html): the bundled pages, then the synthetic
+    pages, whose size grows with scale
+    '''
+    ret = []
+    for name in sorted(os.listdir(CORPUS)):
+        if name.endswith(".html"):
+            with open(os.path.join(CORPUS, name), "r", encoding="UTF-8") as f:
+                ret.append((name[:-5], f.read()))
+    ret.append(("synthetic_news", page(30000 * scale)))
+    ret.append(("synthetic_tiny_divs", tiny_divs(200 * scale)))
+    ret.append(("synthetic_nested", nested(100 * scale)))
+    return ret
+
+
+def extract(html, threshold):
+    a = Analyzer(content = html)
+    a.parse_sections(threshold = threshold)
+    return a.analyze_sections()
+
+
+def check(docs, threshold, update):
+    '''
+    compares (or with update, replaces) the golden output of each page.
+    Returns the number of pages whose output changed
+    '''
+    changed = 0
+    for name, html in docs:
+        path = os.path.join(GOLDEN, name + ".json")
+        result = extract(html, threshold)
+        if update:
+            with open(path, "w", encoding="UTF-8") as f:
+                json.dump(result, f, indent=1, ensure_ascii=False)
+                f.write("\n")
+            continue
+        if not os.path.exists(path):
+            print("%-24s no golden output" % name)
+            changed += 1
+            continue
+        with open(path, "r", encoding="UTF-8") as f:
+            expected = json.load(f)
+        if result != expected:
+            changed += 1
+            print("%-24s CHANGED: %d sections, expected %d" % (name, len(result), len(expected)))
+            for got, want in zip(result, expected):
+                if got != want:
+                    print("    got      %r" % (got,))
+                    print("    expected %r" % (want,))
+                    break
+        else:
+            print("%-24s ok" % name)
+    return changed
+
+
+def stages(html, threshold):
+    '''
+    runs every stage once, returning a list of (stage, seconds, input
+    characters, output characters)
+    '''
+    ret = []
+    parser = HtmlParse(content = html)
+    for name, func in LEGACY_STAGES:
+        size = len(parser.get_parsed())
+        start = time.perf_counter()
+        func(parser)
+        ret.append((name, time.perf_counter() - start, size, len(parser.get_parsed())))
+
+    a = Analyzer(content = html)
+    start = time.perf_counter()
+    a.parse_sections(threshold = threshold)
+    ret.append(("parse_sections", time.perf_counter() - start, len(html), len(a.parser.get_parsed())))
+    start = time.perf_counter()
+    result = a.analyze_sections()
+    ret.append(("analyze_sections", time.perf_counter() - start, len(a.parser.get_parsed()),
+                sum(len(r['content']) for r in result)))
+    return ret
+
+
+def peak_memory(html, threshold):
+    '''
+    peak bytes allocated by parse_sections plus analyze_sections
+    '''
+    tracemalloc.start()
+    extract(html, threshold)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(docs, threshold, repeat):
+    '''
+    Returns
+    -------
+    dict of results: per stage mean latency, and for the extraction
+    pipeline (parse_sections and analyze_sections) throughput and peak memory
+    '''
+    totals = {}
+    order = []
+    pipeline = 0.0
+    size = sum(len(html) for _, html in docs)
+    for _ in range(repeat):
+        for _, html in docs:
+            for name, seconds, _, _ in stages(html, threshold):
+                if name not in totals:
+                    order.append(name)
+                    totals[name] = 0.0
+                totals[name] += seconds
+                if name in ("parse_sections", "analyze_sections"):
+                    pipeline += seconds
+
+    runs = float(repeat * len(docs))
+    return {'pages': len(docs),
+            'bytes': size,
+            'stages': [(name, totals[name] / runs) for name in order],
+            'pages_per_second': runs / pipeline,
+            'mb_per_second': size * repeat / 1e6 / pipeline,
+            'peak_memory': max(peak_memory(html, threshold) for _, html in docs)}
+
+
+def report(results, baseline = None):
+    base = dict(baseline['stages']) if baseline else {}
+    print("%-18s %12s %10s" % ("stage", "mean (ms)", "vs base"))
+    for name, seconds in results['stages']:
+        change = ""
+        if base.get(name):
+            change = "%+9.1f%%" % ((seconds / base[name] - 1.0) * 100)
+        print("%-18s %12.3f %10s" % (name, seconds * 1000, change))
+    print("")
+    print("pages: %d (%.2f MB)" % (results['pages'], results['bytes'] / 1e6))
+    for key, label, fmt in (('pages_per_second', "pages/s", "%.1f"),
+                            ('mb_per_second', "MB/s", "%.2f"),
+                            ('peak_memory', "peak memory (bytes)", "%d")):
+        line = "%s: " % label + fmt % results[key]
+        if baseline:
+            line += " (baseline " + fmt % baseline[key] + ")"
+        print(line)
+
+
+def main():
+    '''
+    checks extraction results against the golden outputs and
+    benchmarks each stage of the pipeline
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=int, default=100, help="section length threshold")
+    parser.add_argument("--repeat", type=int, default=3, help="runs over the corpus")
+    parser.add_argument("--scale", type=int, default=40,
+                        help="size multiplier of the synthetic pages when benchmarking")
+    parser.add_argument("--check", action="store_true", help="only compare with the golden outputs")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden outputs")
+    parser.add_argument("--save-baseline", help="write the benchmark results to this file")
+    parser.add_argument("--compare", help="compare with results saved by --save-baseline")
+    args = parser.parse_args()
+
+    if args.check or args.update_golden:
+        # golden outputs are always for the default scale
+        sys.exit(1 if check(corpus(), args.threshold, args.update_golden) else 0)
+
+    results = benchmark(corpus(args.scale), args.threshold, args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
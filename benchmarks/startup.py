@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from articleparse.client import Client
+
+
+# what a job started per page runs, as example.py does
+COLD = """
+import sys
+from articleparse import Analyzer
+a = Analyzer(fp = sys.argv[1])
+a.parse_sections(threshold = 100)
+a.analyze_sections(probability = 0.8)
+"""
+
+# the same job handing the page to a running daemon
+CLIENT = """
+import sys
+from articleparse.client import Client
+with Client(sys.argv[2]) as client:
+    client.extract({'content': open(sys.argv[1]).read()})
+"""
+
+# which of the networking modules importing the package loads
+IMPORTS = """
+import sys
+from articleparse import Analyzer
+print(" ".join(m for m in ("urllib.request", "http.client", "ssl", "email") if m in sys.modules))
+"""
+
+
+def run(code, *args):
+    start = time.perf_counter()
+    subprocess.check_call([sys.executable, "-c", code] + list(args), env = os.environ)
+    return time.perf_counter() - start
+
+
+def report(name, times):
+    times = sorted(times)
+    print("%-22s %10.1f %10.1f" % (name, 1000 * sum(times) / len(times), 1000 * times[len(times) // 2]))
+
+
+def main():
+    '''
+    compares the latency of extracting a page in a process started for
+    it against sending it to a daemon with warm workers, from a process
+    started for it and from one that stays connected
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10, help="requests per measurement")
+    parser.add_argument("--workers", type=int, default=2, help="daemon worker processes")
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "*.html")))
+    modules = subprocess.check_output([sys.executable, "-c", IMPORTS], env = os.environ).decode().strip()
+    print("networking modules loaded by 'from articleparse import Analyzer': %s" % (modules or "none"))
+
+    path = os.path.join(tempfile.mkdtemp(), "articleparse.sock")
+    start = time.perf_counter()
+    daemon = subprocess.Popen([sys.executable, "-m", "articleparse", "serve", "--socket", path,
+                               "--workers", str(args.workers)], env = os.environ)
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.01)
+        with Client(path) as client:
+            client.extract("<html><body></body></html>")
+        print("daemon ready in %.1f ms" % (1000 * (time.perf_counter() - start)))
+
+        print("%-22s %10s %10s" % ("request", "mean (ms)", "p50 (ms)"))
+        report("cold process", [run(COLD, pages[i % len(pages)]) for i in range(args.runs)])
+        report("process + daemon", [run(CLIENT, pages[i % len(pages)], path) for i in range(args.runs)])
+        docs = []
+        for page in pages:
+            with open(page) as f:
+                docs.append(f.read())
+        times = []
+        with Client(path) as client:
+            for i in range(args.runs):
+                start = time.perf_counter()
+                client.extract(docs[i % len(docs)])
+                times.append(time.perf_counter() - start)
+        report("connected + daemon", times)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+
+if __name__ == "__main__":
+    main()
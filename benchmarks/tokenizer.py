@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import re
+import time
+
+from articleparse.analyzer import RETAIN_LIST, CONVERT_LIST
+from articleparse.htmlparse import HtmlParse, Tokenizer
+from generators import page
+
+
+def legacy(html):
+    parser = HtmlParse(content=html)
+    parser.remove_non_html()
+    parser.isolate_body()
+    parser.strip(retain_list=RETAIN_LIST)
+    parser.convert(CONVERT_LIST)
+    parser.decode_entities()
+    return re.split("</?div>", parser.get_parsed())
+
+
+def single_pass(html):
+    return Tokenizer(RETAIN_LIST, CONVERT_LIST).sections(html)
+
+
+def timeit(func, html, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    '''
+    compares the multi-pass HtmlParse pipeline against the
+    single pass tokenizer on synthetic pages of increasing size
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000, 5000000],
+                        help="page sizes, in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement")
+    args = parser.parse_args()
+
+    print("%12s %12s %12s %8s %s" % ("size", "legacy (s)", "single (s)", "speedup", "same"))
+    for size in args.sizes:
+        html = page(size)
+        same = legacy(html) == single_pass(html)
+        old = timeit(legacy, html, args.repeat)
+        new = timeit(single_pass, html, args.repeat)
+        print("%12d %12.4f %12.4f %7.1fx %s" % (len(html), old, new, old / new, same))
+
+
+if __name__ == "__main__":
+    main()
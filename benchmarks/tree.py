@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import time
+
+from articleparse.analyzer import Analyzer
+from generators import nested
+
+
+def rescan(tree, values):
+    '''
+    subtree totals found by summing the sections of every node
+    again, as walking each subtree does
+    '''
+    return [sum(values[tree.first[n]:tree.last[n] + 1]) for n in range(0, len(tree))]
+
+
+def aggregate(tree, values):
+    return tree.aggregate(tree.own(values))
+
+
+def main():
+    '''
+    compares subtree totals from one pass over the section tree
+    against summing each node's sections separately, as pages
+    nest deeper
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depths", type=int, nargs="+", default=[100, 1000, 5000, 20000],
+                        help="nesting depths to try")
+    parser.add_argument("--width", type=int, default=1, help="paragraphs at each level")
+    args = parser.parse_args()
+
+    print("%-8s %8s %12s %12s %12s" % ("depth", "nodes", "build (s)", "rescan (s)", "one pass (s)"))
+    for depth in args.depths:
+        analyzer = Analyzer(content = nested(depth, args.width))
+        analyzer.parse_sections(0)
+        start = time.perf_counter()
+        tree = analyzer.tree()
+        build = time.perf_counter() - start
+        words = tree.section_features()['words']
+        times = []
+        results = []
+        for func in (rescan, aggregate):
+            start = time.perf_counter()
+            results.append(func(tree, words))
+            times.append(time.perf_counter() - start)
+        assert results[0] == results[1]
+        print("%-8d %8d %12.3f %12.3f %12.3f" % (depth, len(tree), build, times[0], times[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import itertools
+import time
+
+from articleparse.extractor import Extractor
+from articleparse.tuning import COMPARATORS, default_grid, dump, sweep
+from generators import page
+
+
+def labelled(pages, size):
+    '''
+    synthetic pages, labelled with the positions of their story
+    sections, the only ones the generator writes at most one link in
+    '''
+    extractor = Extractor(threshold = 50)
+    for i in range(pages):
+        html = page(size, seed = i)
+        positions = [sec.position() for sec in extractor.sections(html) if sec.anchor_count <= 1]
+        yield {'id': i, 'content': html, 'positions': positions}
+
+
+def reparse(docs, grid, configs):
+    # tuning without a store: every page parsed and scored again for each configuration
+    rules = [[(feature, [t, COMPARATORS[spec['comparator']], m])
+              for t, m in itertools.product(spec['thresholds'], spec['margins'])]
+             for feature, spec in sorted(grid.items()) if feature != 'probability']
+    for combination in itertools.islice(itertools.product(*rules), configs):
+        extractor = Extractor(threshold = 50, classification = dict(combination))
+        for doc in docs:
+            extractor.analyze(doc['content'])
+
+
+def main():
+    '''
+    compares scoring classifications by parsing the labelled pages again
+    for each against sweeping them over a feature store of the pages
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50, help="labelled pages")
+    parser.add_argument("--size", type=int, default=50000, help="page size, in characters")
+    parser.add_argument("--configs", type=int, default=5, help="configurations parsed again")
+    args = parser.parse_args()
+
+    docs = list(labelled(args.pages, args.size))
+    grid = default_grid()
+
+    start = time.perf_counter()
+    store = dump(docs, Extractor(threshold = 50))
+    print("dump: %d sections of %d pages in %.2f s" % (len(store), args.pages, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    reparse(docs, grid, args.configs)
+    per_config = (time.perf_counter() - start) / args.configs
+    start = time.perf_counter()
+    results = sweep(store, grid)
+    configs = len(results) // len(grid['probability'])
+    elapsed = time.perf_counter() - start
+    print("%-8s %14s" % ("tuning", "ms per config"))
+    print("%-8s %14.2f" % ("reparse", 1000 * per_config))
+    print("%-8s %14.2f  (%d configs, %d cutoffs each)" % ("sweep", 1000 * elapsed / configs, configs,
+                                                          len(grid['probability'])))
+    best = results[0]
+    print("best: f1 %.3f precision %.3f recall %.3f" % (best['f1'], best['precision'], best['recall']))
+
+
+if __name__ == "__main__":
+    main()
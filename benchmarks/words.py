@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import argparse
+import random
+import re
+import time
+
+from articleparse.analyzer import word_features
+from articleparse.stopwords import StopWords
+from generators import paragraph
+
+
+def legacy(text, stop_words):
+    # the word analysis Section did before word_features
+    words = re.sub(r"[^\w\s]", "", text).split()
+    return (len(words), sum(len(word) for word in words),
+            sum(1 if word[0].isupper() else 0 for word in words),
+            sum(1 if StopWords.is_stop_word(word) else 0 for word in words))
+
+
+def timeit(func, value, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value, StopWords.get())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    '''
+    compares word_features against the separate passes over the
+    words that it replaced, on sections of increasing size
+    '''
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, nargs="+", default=[50, 500, 50000],
+                        help="section sizes, in words")
+    parser.add_argument("--sections", type=int, default=200000,
+                        help="total words analyzed per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print("%8s %12s %12s %8s %s" % ("words", "legacy (s)", "fused (s)", "speedup", "same"))
+    for words in args.words:
+        texts = [paragraph(rng, words).replace("&amp;", "&").replace("&rsquo;", "'")
+                 for _ in range(max(1, args.sections // words))]
+        same = all(legacy(t, StopWords.get()) == word_features(t, StopWords.get()) for t in texts)
+        old = timeit(lambda ts, sw: [legacy(t, sw) for t in ts], texts, args.repeat)
+        new = timeit(lambda ts, sw: [word_features(t, sw) for t in ts], texts, args.repeat)
+        print("%8d %12.4f %12.4f %7.1fx %s" % (words, old, new, old / new, same))
+
+
+if __name__ == "__main__":
+    main()
@@ -32,9 +32,8 @@ def main():
     a = Analyzer(url = url, fp = fp)
     a.parse_sections(threshold = args.threshold)
     
-    for item in a.analyze_sections():
-        if item['probability'] >= args.probability:
-            print(item['content'])
+    for item in a.analyze_sections(probability = args.probability):
+        print(item['content'])
 
 
 if __name__ == "__main__":
@@ -12,6 +12,13 @@ setup(
     keywords=["text extraction", ],
     url="https://github.com/bmoscon/articleparse",
     packages=find_packages(exclude=['tests']),
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['articleparse=articleparse.__main__:main'],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Programming Language :: Python :: 3.4",
@@ -0,0 +1,110 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+from articleparse.analyzer import Analyzer
+from articleparse.boilerplate import BoilerplateIndex, domain_of
+
+
+WORDS = "the of and a to in is it that was for on are with as his they at be this council plan".split()
+NAV = "<div>%s</div>" % " | ".join("<a href=\"/%s\">%s section</a>" % (name, name.capitalize())
+                                  for name in ("home", "news", "sport", "business", "weather", "travel"))
+FOOTER = ("<div><a href=\"/about\">About us</a> <a href=\"/contact\">Contact us</a> "
+          "<a href=\"/privacy\">Privacy policy</a> <a href=\"/terms\">Terms of use</a></div>")
+
+
+def article(rng):
+    return "".join("<div><p>%s.</p></div>" % " ".join(rng.choice(WORDS) for _ in range(60)).capitalize()
+                   for _ in range(3))
+
+
+def page(rng, *extra):
+    return "<html><body>%s%s%s%s</body></html>" % (NAV, article(rng), "".join(extra), FOOTER)
+
+
+def parsed(html, skip = None):
+    '''
+    the parsed text, anchors included, of the sections of html
+    '''
+    a = Analyzer(content = html)
+    a.parse_sections(threshold = 20, skip = skip)
+    return [sec.buf[sec.start:sec.end] for sec in a.sections]
+
+
+def test_repeats_across_pages_flagged():
+    rng = random.Random(0)
+    index = BoilerplateIndex(min_count = 3)
+    # a link list of its own on the first page, and the nav twice on the second
+    pages = [page(rng, NAV.replace("Home", "Archive"))] + [page(rng, NAV) for _ in range(3)]
+    index.warm((("https://www.example.com/story/%d" % i, html) for i, html in enumerate(pages)), threshold = 20)
+    assert list(index.domains) == ["example.com"]
+
+    texts = parsed(pages[-1])
+    nav, footer = texts[0], texts[-1]
+    match = index.matcher("example.com")
+    assert match(nav) and match(footer)
+    assert index.is_boilerplate("example.com", nav)
+    # nothing is known about other domains
+    assert index.matcher("example.org") is None
+    assert not index.is_boilerplate("example.org", nav)
+
+    # the repeated sections are dropped before analysis, and the article and
+    # the link list seen on one page only are kept
+    new = page(rng, NAV.replace("Home", "Archive"))
+    kept = parsed(new, skip = match)
+    assert kept == parsed(new)[1:-1]
+    assert len(kept) == 4 and not any(match(text) for text in kept)
+
+
+def test_min_count():
+    rng = random.Random(1)
+    index = BoilerplateIndex(min_count = 3)
+    nav = parsed(page(rng))[0]
+    for count in range(1, 5):
+        # a section repeated within a page counts once
+        index.learn("example.com", page(rng, NAV, NAV), threshold = 20)
+        assert index.domains["example.com"]
+        assert index.is_boilerplate("example.com", nav) == (count >= 3)
+        assert (index.matcher("example.com") is not None) == (count >= 3)
+
+
+def test_max_probability():
+    rng = random.Random(2)
+    html = page(rng)
+    content = parsed(html)[1]
+    index = BoilerplateIndex(min_count = 2)
+    for _ in range(2):
+        index.learn("example.com", html, threshold = 20)
+    assert index.is_boilerplate("example.com", parsed(html)[0])
+    assert not index.is_boilerplate("example.com", content)
+    # every section counts, the article's too
+    index = BoilerplateIndex(min_count = 2, max_probability = 1.0)
+    for _ in range(2):
+        index.learn("example.com", html, threshold = 20)
+    assert index.is_boilerplate("example.com", content)
+
+
+def test_prune_save_load(tmpdir):
+    rng = random.Random(3)
+    index = BoilerplateIndex(min_count = 2)
+    index.warm([("example.com", page(rng)), ("example.com", page(rng)), ("other.com", page(rng))])
+    nav = parsed(page(rng))[0]
+    path = str(tmpdir.join("index.json"))
+    index.save(path)
+    loaded = BoilerplateIndex.load(path)
+    assert (loaded.min_count, loaded.max_probability, loaded.domains) == (2, 0.5, index.domains)
+
+    index.prune()
+    assert list(index.domains) == ["example.com"]
+    assert all(count >= 2 for count in index.domains["example.com"].values())
+    assert index.is_boilerplate("example.com", nav) and loaded.is_boilerplate("example.com", nav)
+
+
+def test_domain_of():
+    assert domain_of("https://WWW.Example.com:8080/a?b=c") == "example.com"
+    assert domain_of("http://news.example.com/") == "news.example.com"
+    assert domain_of("not a url") == ""
@@ -0,0 +1,114 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import pytest
+
+from articleparse.analyzer import RETAIN_LIST, default_classification, gt
+from articleparse.cache import ResultCache, cache_key
+from articleparse.extractor import Extractor
+from articleparse.htmlparse import ENTITIES
+
+
+HTML = ("<html><body><div><a href=\"/\">Home</a></div>"
+        "<div><p>%s</p></div><span>%s</span></body></html>" %
+        (" ".join(["The plan was approved by the council on Tuesday."] * 8),
+         " ".join(["A second part of the story, in a span of its own."] * 8)))
+
+
+def key(**kwargs):
+    args = dict(html = HTML, threshold = 100, classification = default_classification(), probability = None,
+                language = 'en', neighbors = (1, 1.0), approximate = None, fingerprint = None)
+    args.update(kwargs)
+    return cache_key(**args)
+
+
+def changed_classification():
+    ret = default_classification()
+    ret['word_count'] = [50, gt, 0.1]
+    return ret
+
+
+@pytest.mark.parametrize("field, value", [
+    ('html', HTML + " "),
+    ('threshold', 50),
+    ('classification', changed_classification()),
+    ('probability', 0.8),
+    ('language', 'fr'),
+    ('neighbors', (2, 1.0)),
+    ('approximate', 65536),
+    ('fingerprint', Extractor().fingerprint()),
+])
+def test_every_field_changes_the_key(field, value):
+    assert key(**{field: value}) != key()
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'retain_list': [tag for tag in RETAIN_LIST if "span" not in tag], 'c_list': []},
+    {'entities': dict(ENTITIES, amp="and")},
+    {'numeric_entities': {38: "and"}},
+    {'max_length': 1000},
+    {'max_seconds': 10.0},
+])
+def test_fingerprint_covers_settings(kwargs):
+    assert Extractor(**kwargs).fingerprint() != Extractor().fingerprint()
+    assert Extractor(**kwargs).fingerprint() == Extractor(**kwargs).fingerprint()
+
+
+def test_extractors_sharing_a_cache(tmpdir):
+    path = str(tmpdir.join("cache.db"))
+    spans = Extractor(threshold = 100, cache = ResultCache(path = path))
+    divs = Extractor(threshold = 100, retain_list = [tag for tag in RETAIN_LIST if "span" not in tag],
+                     c_list = [], cache = ResultCache(path = path))
+    expected = [Extractor(threshold = 100).analyze(HTML),
+                Extractor(threshold = 100, retain_list = divs.retain_list, c_list = []).analyze(HTML)]
+    assert expected[0] != expected[1]
+    assert spans.analyze(HTML) == expected[0]
+    assert divs.analyze(HTML) == expected[1]
+
+
+def test_truncated_results_are_not_cached():
+    cache = ResultCache()
+    extractor = Extractor(threshold = 10, max_length = len(HTML) // 2, cache = cache)
+    extractor.analyze(HTML)
+    assert cache.stats()['size'] == 0
+    Extractor(threshold = 10, cache = cache).analyze(HTML)
+    assert cache.stats()['size'] == 1
+
+
+def lambda_classification(limit):
+    ret = default_classification()
+    ret['word_count'] = [50, lambda value, threshold: value > threshold * limit, 0.1]
+    return ret
+
+
+def test_lambda_comparators_keyed_by_code():
+    other = default_classification()
+    other['word_count'] = [50, lambda value, threshold: value < threshold, 0.1]
+    assert key(classification = lambda_classification(1)) != key(classification = other)
+    # same code, different values closed over
+    assert key(classification = lambda_classification(1)) != key(classification = lambda_classification(2))
+    assert key(classification = lambda_classification(1)) == key(classification = lambda_classification(1))
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_results_are_copies(tmpdir, persistent):
+    path = str(tmpdir.join("cache.db")) if persistent else None
+    cache = ResultCache(path = path)
+    first = cache.extract(HTML)
+    expected = Extractor().analyze(HTML)
+    assert first == expected
+    first[0]['text'] = "changed"
+    first.append(None)
+    if persistent:
+        # from the database, into an empty memory tier
+        cache = ResultCache(path = path)
+        hit = cache.extract(HTML)
+        assert cache.stats()['disk_hits'] == 1
+        hit[0]['probability'] = -1.0
+    hit = cache.extract(HTML)
+    assert hit == expected
+    hit.clear()
+    assert cache.extract(HTML) == expected
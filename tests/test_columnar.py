@@ -0,0 +1,72 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from articleparse.analyzer import strip_anchors
+from articleparse.columnar import ColumnarWriter, read, write_many
+from articleparse.extractor import Extractor
+
+
+CORPUS = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "corpus")
+
+
+def documents():
+    names = sorted(os.listdir(CORPUS))
+    files = [{'id': name, 'file': os.path.join(CORPUS, name)} for name in names]
+    with open(os.path.join(CORPUS, names[0])) as f:
+        return files + [{'id': 'content', 'content': f.read()}]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.parametrize("name", ["out.arrow", "out.parquet"])
+def test_rows_match_analyze(tmpdir, workers, name):
+    extractor = Extractor(threshold = 100, probability = 0.5)
+    path = str(tmpdir.join(name))
+    docs = documents() + [{'id': 'missing', 'file': str(tmpdir.join("missing.html"))}]
+    result = write_many(docs, path, extractor, workers = workers, batch_rows = 3)
+    assert [doc_id for doc_id, _ in result['errors']] == ['missing']
+    rows = read(path).to_pydict()
+    expected = [(doc['id'], sec['probability'], sec['content'])
+                for doc in docs[:-1] for sec in extractor.analyze(doc)]
+    assert list(zip(rows['document'], rows['probability'], rows['content'])) == expected
+    assert result['rows'] == len(expected)
+
+
+def test_offsets_point_into_parsed_document(tmpdir):
+    extractor = Extractor(threshold = 100)
+    path = str(tmpdir.join("out.arrow"))
+    write_many(documents(), path, extractor, text = False)
+    rows = read(path).to_pydict()
+    assert 'content' not in rows
+    parsed = {}
+    for doc in documents():
+        a = extractor.parsed(doc, in_memory = True)
+        parsed[doc['id']] = (a.parser.get_parsed(), [sec.txt() for sec in a.sections])
+    texts = dict((doc_id, []) for doc_id in parsed)
+    for doc_id, start, end in zip(rows['document'], rows['start'], rows['end']):
+        texts[doc_id].append(strip_anchors(parsed[doc_id][0][start:end]))
+    for doc_id, (_, expected) in parsed.items():
+        assert texts[doc_id] == expected
+
+
+def test_streamed_documents(tmpdir):
+    doc = documents()[0]
+    streamed = Extractor(threshold = 100, max_seconds = 60)
+    with pytest.raises(ValueError):
+        write_many([doc], str(tmpdir.join("out.arrow")), streamed, text = False)
+    path = str(tmpdir.join("text.arrow"))
+    with ColumnarWriter(path) as writer:
+        writer.write(doc['id'], streamed.parsed(doc))
+    rows = read(path).to_pydict()
+    assert rows['content'] and set(rows['start']) == set([None])
+    with ColumnarWriter(str(tmpdir.join("offsets.arrow")), text = False) as writer:
+        with pytest.raises(ValueError):
+            writer.write(doc['id'], streamed.parsed(doc))
@@ -0,0 +1,170 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import gzip
+import io
+import json
+
+import pytest
+
+from articleparse.corpus import CorpusError, Progress, extract_corpus, last_written, read_jsonl, read_warc
+
+
+def write(tmpdir, data):
+    path = str(tmpdir.join("out.jsonl"))
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def line(doc_id, size = 10):
+    return (json.dumps({'id': doc_id, 'input': "in.warc", 'offset': doc_id, 'pad': "x" * size}) + "\n").encode()
+
+
+def test_complete_file(tmpdir):
+    data = line(1) + line(2)
+    path = write(tmpdir, data)
+    assert last_written(path)['id'] == 2
+    assert open(path, "rb").read() == data
+
+
+def test_partial_line_removed(tmpdir):
+    path = write(tmpdir, line(1) + line(2) + b'{"id": 3, "inp')
+    assert last_written(path)['id'] == 2
+    assert open(path, "rb").read() == line(1) + line(2)
+
+
+def test_long_last_line_and_partial_line(tmpdir):
+    # the last complete line is longer than the first piece read back
+    data = line(1) + line(2, 20000)
+    path = write(tmpdir, data + b'{"id": 3, "input": "in.warc", "pad": "xxxx')
+    assert last_written(path)['id'] == 2
+    assert open(path, "rb").read() == data
+
+
+def test_long_only_line_and_partial_line(tmpdir):
+    data = line(1, 50000)
+    path = write(tmpdir, data + b'{"id": 2')
+    assert last_written(path)['id'] == 1
+    assert open(path, "rb").read() == data
+
+
+def test_no_complete_line(tmpdir):
+    path = write(tmpdir, b'{"id": 1, "pa')
+    assert last_written(path) is None
+    assert open(path, "rb").read() == b""
+
+
+def test_empty_file(tmpdir):
+    path = write(tmpdir, b"")
+    assert last_written(path) is None
+
+
+PAGE = ("<html><body><div><p>%s</p></div></body></html>" %
+        " ".join(["The council approved the plan on Tuesday, after a long debate."] * 5)).encode()
+
+
+def warc(kind, uri, block, content_type = None):
+    headers = [("WARC-Type", kind), ("WARC-Record-ID", "<urn:uuid:%s>" % uri), ("WARC-Target-URI", uri),
+               ("Content-Length", len(block))]
+    if content_type is not None:
+        headers.append(("Content-Type", content_type))
+    head = "WARC/1.0\r\n%s\r\n" % "".join("%s: %s\r\n" % header for header in headers)
+    return head.encode() + block + b"\r\n\r\n"
+
+
+def http(status, content_type, body, headers = ()):
+    head = "HTTP/1.1 %s\r\nContent-Type: %s\r\n%s\r\n" % (status, content_type,
+                                                           "".join("%s: %s\r\n" % h for h in headers))
+    return head.encode() + body
+
+
+# the records of a crawl, and whether each is a page that is read
+RECORDS = [
+    (warc("warcinfo", "info", b"software: test\r\n", "application/warc-fields"), False),
+    (warc("request", "http://a/", b"GET / HTTP/1.1\r\n\r\n", "application/http"), False),
+    (warc("response", "http://a/", http("200 OK", "text/html; charset=utf-8", PAGE), "application/http"), True),
+    (warc("response", "http://a/missing", http("404 Not Found", "text/html", PAGE)), False),
+    (warc("response", "http://a/image", http("200 OK", "image/png", b"\x89PNG")), False),
+    (warc("response", "http://a/moved", http("301 Moved", "text/html", b"", [("Location", "/")])), False),
+    (warc("response", "http://a/gzip", http("200 OK", "text/html", gzip.compress(PAGE),
+                                            [("Content-Encoding", "gzip")])), True),
+    (warc("resource", "http://a/resource", PAGE, "text/html"), True),
+    (warc("metadata", "http://a/", b"fetchTimeMs: 1\r\n"), False),
+]
+
+
+def write_warc(tmpdir, compressed, records = RECORDS):
+    path = str(tmpdir.join("crawl.warc.gz" if compressed else "crawl.warc"))
+    with open(path, "wb") as f:
+        for record, _ in records:
+            f.write(gzip.compress(record, mtime = 0) if compressed else record)
+    return path
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_read_warc(tmpdir, compressed):
+    path = write_warc(tmpdir, compressed)
+    docs = list(read_warc(path))
+    assert [doc['url'] for doc in docs] == ["http://a/", "http://a/gzip", "http://a/resource"]
+    assert all(doc['content'] == PAGE and doc['input'] == path for doc in docs)
+    assert docs[0]['content_type'] == "text/html; charset=utf-8"
+    assert docs[0]['id'] == "<urn:uuid:http://a/>"
+    # every byte up to the end of the last page is counted once: its
+    # member, or its block, which the line breaks after it follow
+    sizes = [len(gzip.compress(record, mtime = 0)) if compressed else len(record) for record, _ in RECORDS]
+    assert sum(doc['size'] for doc in docs) == sum(sizes[:8]) - (0 if compressed else 4)
+
+    # resumed from a recorded offset
+    resumed = list(read_warc(path, docs[1]['offset']))
+    assert [doc['url'] for doc in resumed] == ["http://a/gzip", "http://a/resource"]
+    assert [doc['offset'] for doc in resumed] == [doc['offset'] for doc in docs[1:]]
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_read_warc_truncated(tmpdir, compressed):
+    path = write_warc(tmpdir, compressed, RECORDS[:3] + [(RECORDS[7][0], True)])
+    with open(path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 40)
+    docs = read_warc(path)
+    assert next(docs)['url'] == "http://a/"
+    with pytest.raises(CorpusError, match = "truncated"):
+        next(docs)
+
+
+def test_read_jsonl(tmpdir):
+    lines = [json.dumps({'id': 1, 'url': "http://a/", 'content': "caf\u00e9 " * 10}), "",
+             json.dumps({'id': 2, 'content': "<p>two</p>", 'content_type': "text/html"}),
+             json.dumps({'id': 3, 'content': "three"})]
+    path = str(tmpdir.join("docs.jsonl"))
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    docs = list(read_jsonl(path))
+    assert [doc['id'] for doc in docs] == [1, 2, 3]
+    assert docs[0]['url'] == "http://a/" and docs[0]['content'] == "caf\u00e9 " * 10
+    assert docs[1]['content_type'] == "text/html"
+    assert docs[1]['offset'] == len(lines[0]) + 2
+    # bytes of the file, not characters of the content
+    assert sum(doc['size'] for doc in docs) == len(open(path, "rb").read())
+
+    assert [doc['id'] for doc in read_jsonl(path, docs[2]['offset'])] == [3]
+
+    with open(path, "a") as f:
+        f.write("{not json\n")
+    with pytest.raises(CorpusError, match = "bad JSON"):
+        list(read_jsonl(path))
+
+
+def test_progress_counts_bytes_read(tmpdir):
+    path = write_warc(tmpdir, True)
+    progress = Progress(stream = io.StringIO(), interval = 1000)
+    output = io.StringIO()
+    assert extract_corpus(read_warc(path), output, workers = 0, progress = progress) == 3
+    assert progress.documents == 3
+    assert progress.bytes == sum(doc['size'] for doc in read_warc(path))
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r['url'] for r in results] == ["http://a/", "http://a/gzip", "http://a/resource"]
+    assert all(r['error'] is None and r['sections'] for r in results)
@@ -0,0 +1,35 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import pickle
+
+from articleparse.extractor import Extractor
+from articleparse.htmlparse import ENTITIES
+
+
+HTML = ("<html><body><div><p>Fish &amp; chips &copy; &#38; more, %s</p></div></body></html>" %
+        " ".join(["The council approved the plan on Tuesday."] * 5))
+
+
+def test_default_entities_shared():
+    extractor = Extractor(threshold = 10)
+    copy = pickle.loads(pickle.dumps(extractor))
+    # the tables the tokenizer has prepared once for every extractor
+    assert copy.tokenizer.entities is extractor.tokenizer.entities
+    assert copy.tokenizer.numeric_entities is extractor.tokenizer.numeric_entities
+    # the default tables are not sent to workers with the extractor
+    assert len(pickle.dumps(extractor)) < 10000
+    assert copy.analyze(HTML) == extractor.analyze(HTML)
+    assert copy.fingerprint() == extractor.fingerprint()
+
+
+def test_custom_entities():
+    extractor = Extractor(threshold = 10, entities = dict(ENTITIES, amp = "and"), numeric_entities = {38: "plus"})
+    copy = pickle.loads(pickle.dumps(extractor))
+    for e in (extractor, copy):
+        content = e.analyze(HTML)[0]['content']
+        assert "Fish and chips Copyright plus more" in content
+    assert copy.fingerprint() == extractor.fingerprint() != Extractor().fingerprint()
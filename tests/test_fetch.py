@@ -0,0 +1,166 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import asyncio
+import gzip
+import time
+
+import pytest
+
+from articleparse.analyzer import Analyzer
+from articleparse.fetch import ConnectionPool, FetchError, StatusError, fetch_and_extract
+
+
+PAGE = ("<html><body><div><a href=\"/\">Home</a></div><div><p>%s</p></div></body></html>" %
+        " ".join(["The council approved the plan on Tuesday, after a long debate."] * 10)).encode()
+
+
+def response(status, headers, body = b""):
+    head = "HTTP/1.1 %s\r\n%s\r\n" % (status, "".join("%s: %s\r\n" % item for item in headers))
+    return head.encode("latin-1") + body
+
+
+def chunked(body, size = 100):
+    return b"".join(b"%x\r\n%s\r\n" % (len(body[i:i + size]), body[i:i + size])
+                    for i in range(0, len(body), size)) + b"0\r\n\r\n"
+
+
+ROUTES = {
+    '/ok': response("200 OK", [("Content-Type", "text/html"), ("Content-Length", len(PAGE))], PAGE),
+    '/gzip': response("200 OK", [("Content-Encoding", "gzip"), ("Transfer-Encoding", "chunked")],
+                      chunked(gzip.compress(PAGE))),
+    '/redirect': response("302 Found", [("Location", "/ok"), ("Content-Length", 0)]),
+    '/missing': response("404 Not Found", [("Content-Length", len(PAGE))], PAGE),
+    '/error': response("500 Internal Server Error", [("Content-Length", 5)], b"oops!"),
+    # keeps the connection open without giving a length
+    '/empty': response("204 No Content", []),
+    '/unchanged': response("304 Not Modified", [("ETag", "\"1\"")]),
+}
+
+
+class Server(object):
+    '''
+    a stand-in HTTP/1.1 server on localhost, serving ROUTES on kept-alive
+    connections, and /close with no length before closing the connection
+    '''
+    async def __aenter__(self):
+        self.connections = 0
+        self.requests = []
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.url = "http://127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                self.requests.append((method, path))
+                if path == '/close':
+                    writer.write(response("200 OK", [("Content-Type", "text/html")], PAGE))
+                    break
+                data = ROUTES[path]
+                if method == "HEAD":
+                    data = data[:data.index(b"\r\n\r\n") + 4]
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_fetch():
+    async def main():
+        async with Server() as server:
+            async with ConnectionPool(timeout = 5) as pool:
+                ok = await pool.fetch(server.url + "/ok")
+                compressed = await pool.fetch(server.url + "/gzip")
+                redirected = await pool.fetch(server.url + "/redirect")
+            return ok, compressed, redirected, server.connections
+    ok, compressed, redirected, connections = run(main())
+    assert ok.status == 200 and ok.body == PAGE
+    assert compressed.body == PAGE
+    assert redirected.url.endswith("/ok") and redirected.body == PAGE
+    # every request went over the one kept-alive connection
+    assert connections == 1
+
+
+@pytest.mark.parametrize("path, status", [("/missing", 404), ("/error", 500), ("/unchanged", 304)])
+def test_error_statuses_raise(path, status):
+    async def main():
+        async with Server() as server:
+            async with ConnectionPool(timeout = 5) as pool:
+                with pytest.raises(StatusError) as e:
+                    await pool.fetch(server.url + path)
+                # the connection is still usable after the error response
+                ok = await pool.fetch(server.url + "/ok")
+            return e.value, ok, server.connections
+    error, ok, connections = run(main())
+    assert error.status == status
+    assert isinstance(error, FetchError)
+    assert ok.body == PAGE and connections == 1
+
+
+@pytest.mark.parametrize("method, path", [("GET", "/empty"), ("HEAD", "/ok"), ("HEAD", "/gzip")])
+def test_bodiless_responses_do_not_wait(method, path):
+    async def main():
+        async with Server() as server:
+            async with ConnectionPool(timeout = 2) as pool:
+                start = time.perf_counter()
+                first = await pool.fetch(server.url + path, method = method)
+                elapsed = time.perf_counter() - start
+                ok = await pool.fetch(server.url + "/ok")
+            return first, elapsed, ok, server.connections
+    first, elapsed, ok, connections = run(main())
+    assert first.body == b"" and elapsed < 1
+    assert ok.body == PAGE and connections == 1
+
+
+def test_body_until_close():
+    async def main():
+        async with Server() as server:
+            async with ConnectionPool(timeout = 5) as pool:
+                closed = await pool.fetch(server.url + "/close")
+                ok = await pool.fetch(server.url + "/ok")
+            return closed, ok, server.connections
+    closed, ok, connections = run(main())
+    assert closed.body == PAGE and ok.body == PAGE
+    assert connections == 2
+
+
+def test_fetch_and_extract():
+    async def main():
+        async with Server() as server:
+            urls = [server.url + path for path in ("/ok", "/missing", "/gzip", "/error")]
+            return [result async for result in fetch_and_extract(urls, concurrency = 2)]
+    results = sorted(run(main()), key = lambda result: result['index'])
+    assert [result['error'] is None for result in results] == [True, False, True, False]
+    assert results[0]['sections'] and results[0]['sections'] == results[2]['sections']
+    assert results[1]['sections'] is None and "404" in results[1]['error']
+
+
+def test_from_url_async():
+    async def main():
+        async with Server() as server:
+            a = await Analyzer.from_url_async(server.url + "/ok")
+            with pytest.raises(StatusError):
+                await Analyzer.from_url_async(server.url + "/missing")
+            return a
+    a = run(main())
+    a.parse_sections(100)
+    assert a.analyze_sections()
@@ -0,0 +1,145 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+import pytest
+
+from articleparse.extractor import Extractor
+from articleparse.incremental import IncrementalAnalyzer, opcodes
+
+
+WORDS = "the of and a to in is it that was for on are with as his they at be this council plan".split()
+SHARE = "Share this story on social media with your friends and family, and follow us for more."
+
+
+def paragraph(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60))).capitalize() + "."
+
+
+def page(sections):
+    return ("<html><body><div class=\"nav\"><a href=\"/\">Home</a></div>%s</body></html>" %
+            "".join("<div>%s</div>" % text for text in sections))
+
+
+def edit(rng, sections):
+    '''
+    a new version of a page: sections inserted, removed, rewritten and
+    moved, and repeated boilerplate added and removed
+    '''
+    ret = list(sections)
+    for _ in range(rng.randint(1, 5)):
+        action = rng.choice(("insert", "remove", "rewrite", "move", "share"))
+        k = rng.randrange(len(ret) + 1)
+        if action == "insert":
+            ret.insert(k, paragraph(rng))
+        elif action == "share":
+            ret.insert(k, SHARE)
+        elif ret and action == "remove":
+            del ret[min(k, len(ret) - 1)]
+        elif ret and action == "rewrite":
+            ret[min(k, len(ret) - 1)] = paragraph(rng)
+        elif ret:
+            ret.insert(k, ret.pop(rng.randrange(len(ret))))
+    return ret
+
+
+def apply(old, new, ops):
+    '''
+    new rebuilt from old and ops, checking that the blocks cover both in order
+    '''
+    ret = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in ops:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert old[i1:i2] == new[j1:j2]
+            ret.extend(old[i1:i2])
+        else:
+            assert tag == {(True, True): 'replace', (True, False): 'delete',
+                           (False, True): 'insert'}[(i2 > i1, j2 > j1)]
+            ret.extend(new[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(old), len(new))
+    return ret
+
+
+@pytest.mark.parametrize("neighbors", [(1, 0.0), (1, 1.0), (2, 0.5)])
+def test_incremental_equals_full(neighbors):
+    extractor = Extractor(threshold = 40, probability = 0.3, neighbor_window = neighbors[0],
+                          neighbor_weight = neighbors[1])
+    for seed in range(0, 25):
+        rng = random.Random(seed)
+        sections = [rng.choice((paragraph(rng), SHARE)) for _ in range(rng.randint(0, 30))]
+        incremental = IncrementalAnalyzer(extractor)
+        for _ in range(6):
+            html = page(sections)
+            assert incremental.update("page", html)['sections'] == extractor.analyze(html)
+            sections = edit(rng, sections)
+
+
+def test_reports_changes():
+    rng = random.Random(1)
+    texts = [paragraph(rng) for _ in range(20)]
+    incremental = IncrementalAnalyzer(Extractor(threshold = 10))
+    first = incremental.update("page", page(texts))
+    assert first['added'] == list(range(0, 20))
+    # and the nav, which is too short to keep
+    assert first['analyzed'] == 21
+
+    new = paragraph(rng)
+    update = incremental.update("page", page([new] + texts))
+    assert (update['added'], update['removed'], update['changed']) == ([0], [], [])
+    assert update['analyzed'] == 1
+    # the new section and its neighbor
+    assert update['scored'] == 2
+
+    texts = [new] + texts
+    rewritten = list(texts)
+    rewritten[10] = paragraph(rng)
+    del rewritten[15]
+    update = incremental.update("page", page(rewritten))
+    assert (update['added'], update['removed'], update['changed']) == ([], [15], [(10, 10)])
+    assert update['analyzed'] == 1
+
+    # nothing changed
+    update = incremental.update("page", page(rewritten))
+    assert (update['added'], update['removed'], update['changed'], update['scored']) == ([], [], [], 0)
+
+
+def test_repeated_sections_matched():
+    rng = random.Random(2)
+    texts = [paragraph(rng) if i % 3 == 0 else SHARE for i in range(600)]
+    new = list(texts)
+    new.insert(300, paragraph(rng))
+    new[40] = paragraph(rng)
+    del new[500]
+    ops = opcodes(texts, new)
+    assert apply(texts, new, ops) == new
+    changes = [op for op in ops if op[0] != 'equal']
+    assert changes[:2] == [('replace', 40, 41, 40, 41), ('insert', 300, 300, 300, 301)]
+    # any of the run of repeated sections the removed one was in
+    tag, i1, i2, j1, j2 = changes[2]
+    assert (tag, i2 - i1, j2 - j1) == ('delete', 1, 0)
+    assert texts[i1] == SHARE and abs(i1 - 500) <= 1
+
+
+def test_opcodes_rebuild():
+    for seed in range(0, 200):
+        rng = random.Random(seed)
+        old = [rng.randrange(8) for _ in range(rng.randint(0, 40))]
+        new = edit(rng, old) if rng.random() < 0.8 else [rng.randrange(8) for _ in range(rng.randint(0, 40))]
+        apply(old, new, opcodes(old, new))
+
+
+def test_large_change_not_matched():
+    old = list(range(0, 100))
+    new = [0] + [x + 1000 for x in range(1, 60)] + list(range(60, 100))
+    new[30] = 30
+    # 30 is matched at first, but most of the page changed
+    assert opcodes(old, new, limit = 1.0)[1:4] == [('replace', 1, 30, 1, 30), ('equal', 30, 31, 30, 31),
+                                                   ('replace', 31, 60, 31, 60)]
+    assert opcodes(old, new) == [('equal', 0, 1, 0, 1), ('replace', 1, 60, 1, 60), ('equal', 60, 100, 60, 100)]
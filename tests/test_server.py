@@ -0,0 +1,108 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from articleparse.extractor import Extractor
+from articleparse.server import WarmPool, serve_stdio
+
+
+PAGE = ("<html><body><div><a href=\"/\">Home</a></div><div><p>%s</p></div></body></html>" %
+        " ".join(["The council approved the plan on Tuesday, after a long debate."] * 10))
+
+
+@pytest.fixture
+def site():
+    '''
+    a local HTTP server with the page at /page and a page that takes 2 seconds at /slow
+    '''
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/slow':
+                time.sleep(2)
+            body = PAGE.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target = server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def serve(pool, requests):
+    stdin = io.BytesIO("".join(line + "\n" for line in requests).encode("utf-8"))
+    stdout = io.StringIO()
+    serve_stdio(pool, stdin, stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_stdio_round_trip(workers):
+    extractor = Extractor(threshold = 50)
+    pages = [PAGE.replace("Tuesday", day) for day in ("Monday", "Tuesday", "Wednesday", "Thursday")]
+    requests = [json.dumps({'id': "p%d" % i, 'content': html}) for i, html in enumerate(pages)]
+    requests.insert(2, "not json")
+    requests.append(json.dumps(pages[0]))
+    with WarmPool(extractor, workers = workers) as pool:
+        results = serve(pool, requests)
+    assert len(results) == 6
+    assert [r['id'] for r in results] == ["p0", "p1", None, "p2", "p3", 4]
+    assert results[2]['sections'] is None and results[2]['error'].startswith("JSONDecodeError")
+    expected = [extractor.analyze(html) for html in pages + [pages[0]]]
+    assert [r['sections'] for r in results if r['error'] is None] == expected
+
+
+@pytest.mark.parametrize("allow_files", [False, True])
+def test_file_url_refused(tmp_path, allow_files):
+    path = tmp_path / "secret.html"
+    path.write_text(PAGE)
+    with WarmPool(Extractor(threshold = 50), workers = 0, allow_files = allow_files) as pool:
+        for url in ("file://%s" % path, "FILE://%s" % path, "ftp://example.com/", str(path)):
+            result = pool.extract({'url': url})
+            assert result['sections'] is None
+            assert result['error'].startswith("ValueError: unsupported URL")
+
+
+def test_file_key_needs_allow_files(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(PAGE)
+    with WarmPool(Extractor(threshold = 50), workers = 0) as pool:
+        result = pool.extract({'file': str(path)})
+        assert result['sections'] is None
+        assert "unsupported keys file" in result['error']
+    with WarmPool(Extractor(threshold = 50), workers = 0, allow_files = True) as pool:
+        assert pool.extract({'file': str(path)})['sections'] == Extractor(threshold = 50).analyze(PAGE)
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_url_fetched_with_timeout(site, workers):
+    with WarmPool(Extractor(threshold = 50), workers = workers, timeout = 0.5) as pool:
+        result = pool.extract({'url': site + "/page"})
+        assert result['error'] is None
+        assert result['id'] == site + "/page"
+        assert result['sections'] == Extractor(threshold = 50).analyze(PAGE)
+
+        start = time.perf_counter()
+        result = pool.extract({'url': site + "/slow", 'id': "slow"})
+        assert time.perf_counter() - start < 1.5
+        assert result['id'] == "slow"
+        assert result['error'].startswith("FetchError: timed out")
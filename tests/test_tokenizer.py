@@ -0,0 +1,97 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+import re
+
+import pytest
+
+from articleparse.analyzer import RETAIN_LIST, CONVERT_LIST
+from articleparse.htmlparse import HtmlParse, Tokenizer, TokenStream
+
+
+# pieces of markup the documents are made from. Entities that decode to
+# markup and a '<' that starts no tag are left out, since the tokenizer
+# differs from the multi-pass pipeline there by design (see Tokenizer)
+FRAGMENTS = ["<div>", "</div>", "<DIV class='x'>", "</DIV >", "<div\nid=a>", "<span>", "</span>",
+             "<span style=\"a>b\">", "<a href='/'>", "</a>", "<A HREF=\"x\">", "<p>", "</p>", "<br/>",
+             "<img src='a.png' alt='x'>", "<table><tr><td>", "</td></tr></table>", "<b>", "</b>",
+             "<script>var x = '<div>';</script>", "<SCRIPT type='text/javascript'>if (a < b) {}</SCRIPT>",
+             "<style>div { color: red }</style>", "<!-- a comment <div> -->", "<!---->", "<noscript>x</noscript>",
+             "&nbsp;", "&copy;", "&#169;", "&#xe9;", "&eacute;", "&quot;", "&unknown;", "& ", "&#;",
+             "&#xFDD0;", "&#xfdd5;", "&#65007;",
+             "x > y", "word", "Word", "two words", "end. Next", "why? ", "wow! ",
+             " ", "  ", "\n", "\t", "\r\n", "café", "“quoted”"]
+
+
+def document(rng):
+    body = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 80)))
+    head = "".join(rng.choice(["<title>t</title>", "<meta charset='utf-8'>", "<script>x</script>", ""])
+                   for _ in range(3))
+    return "<html><head>%s</head>%s%s</body></html>" % (head, rng.choice(["<body>", "<body class='b'>"]), body)
+
+
+def legacy(html):
+    '''
+    the sections of the multi-pass HtmlParse pipeline the tokenizer replaced
+    '''
+    parser = HtmlParse(content = html)
+    parser.remove_non_html()
+    parser.isolate_body()
+    parser.strip(retain_list = RETAIN_LIST)
+    parser.convert(CONVERT_LIST)
+    parser.decode_entities()
+    return re.split("</?div>", parser.get_parsed())
+
+
+@pytest.mark.parametrize("seed", range(0, 20))
+def test_sections_match_multi_pass(seed):
+    rng = random.Random(seed)
+    tokenizer = Tokenizer(RETAIN_LIST, CONVERT_LIST)
+    for _ in range(50):
+        html = document(rng)
+        assert tokenizer.sections(html) == legacy(html), html
+
+
+@pytest.mark.parametrize("seed", range(0, 5))
+def test_spans_point_into_parsed(seed):
+    rng = random.Random(seed)
+    tokenizer = Tokenizer(RETAIN_LIST, CONVERT_LIST)
+    for _ in range(50):
+        html = document(rng)
+        buf, spans = tokenizer.spans(html)
+        assert buf == tokenizer.parse(html)
+        assert [buf[start:end] for start, end in spans] == tokenizer.sections(html)
+
+
+@pytest.mark.parametrize("seed", range(0, 5))
+def test_stream_matches_sections(seed):
+    rng = random.Random(seed)
+    tokenizer = Tokenizer(RETAIN_LIST, CONVERT_LIST)
+    for _ in range(50):
+        html = document(rng)
+        stream = TokenStream(tokenizer)
+        sections = []
+        i = 0
+        # chunks cut anywhere, in the middle of tags, entities and scripts
+        while i < len(html):
+            size = rng.randint(1, 40)
+            sections.extend(stream.feed(html[i:i + size]))
+            i += size
+        sections.extend(stream.close())
+        assert sections == tokenizer.sections(html), html
+
+
+@pytest.mark.parametrize("reference", ["&#xFDD0;", "&#xFDD2;", "&#xfdd3;", "&#64991;", "&#xFDEF;"])
+def test_marker_references(reference):
+    # references to the noncharacters used as markers decode to nothing,
+    # and the whitespace around them is kept as the multi-pass pipeline keeps it
+    html = ("<html><body><div>a %s b</div><div>  %s</div><div>x%sy</div>%s</body></html>" %
+            ((reference,) * 4))
+    tokenizer = Tokenizer(RETAIN_LIST, CONVERT_LIST)
+    assert tokenizer.sections(html) == legacy(html) == ["", "a  b", "", " ", "", "xy", ""]
+    stream = TokenStream(tokenizer)
+    assert stream.feed(html) + stream.close() == legacy(html)
@@ -0,0 +1,77 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+import pytest
+
+from articleparse.analyzer import Analyzer
+from articleparse.tree import SectionTree
+
+
+WORDS = ("the of and a to in is it that was for on are with as his they at be this from have or "
+         "Article Content extraction section parser window feature sample estimate threshold").split()
+
+
+def page(seed, depth = 6):
+    rng = random.Random(seed)
+    body = []
+    for level in range(depth):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 200)))
+        links = " ".join("<a href=\"/%d\">%s</a>" % (i, rng.choice(WORDS)) for i in range(rng.randint(0, 4)))
+        body.append("<div>%s %s. <span>%s</span>" % (words, links, rng.choice(WORDS)))
+    body.extend("</div>" for _ in range(depth - 1))
+    return "<html><body>%s</body></html>" % "".join(body)
+
+
+@pytest.mark.parametrize("approximate", [None, 400])
+def test_section_features_read_from_sections(approximate):
+    for seed in range(10):
+        a = Analyzer(content = page(seed), approximate = approximate)
+        a.parse_sections(50)
+        tree = a.tree()
+        assert tree.sections is a.sections
+        # counted over every span, without the sections
+        counted = SectionTree(tree.buf, tree.spans).section_features(a.stop_words)
+        assert tree.section_features(a.stop_words) == counted
+
+
+def test_depths():
+    a = Analyzer(content = page(1, depth = 20))
+    a.parse_sections(0)
+    tree = a.tree()
+    assert list(tree.depths()) == [tree.depth(n) for n in range(0, len(tree))]
+
+
+def test_best_prefers_deepest():
+    a = Analyzer(content = "<html><body><div><div>alpha beta</div></div><div>gamma delta</div></body></html>")
+    a.parse_sections(0)
+    tree = a.tree()
+    assert list(tree.parent) == [-1, 0, 1, 0]
+    # nodes 1, 2 and 3 all total 2, and node 2 is the deepest of them
+    weights = [-10, 0, 2, 0, 0, 2, 0]
+    assert tree.best(weights) == (2, 2)
+    # the first of equally deep nodes
+    weights = [-10, 0, 0, 1, 0, 1, 0]
+    assert tree.aggregate(tree.own(weights))[1:] == [1, 0, 1]
+    assert tree.best(weights) == (1, 1)
+
+
+def test_streamed_document_has_no_tree(tmp_path):
+    path = tmp_path / "page.html"
+    path.write_text(page(2))
+    a = Analyzer(fp = str(path))
+    a.parse_sections(50)
+    assert a.sections
+    with pytest.raises(ValueError, match = "streamed"):
+        a.tree()
+    with pytest.raises(ValueError, match = "streamed"):
+        a.extract_container()
+
+    a = Analyzer(content = page(2), max_seconds = 60)
+    a.parse_sections(50)
+    with pytest.raises(ValueError, match = "streamed"):
+        a.tree()
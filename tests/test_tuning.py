@@ -0,0 +1,81 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from articleparse.analyzer import ANCHOR_DENSITY, WORD_COUNT, STOP_WORD_DENSITY
+from articleparse.extractor import Extractor
+from articleparse.tuning import CONTENT, BOILERPLATE, UNLABELLED, dump, sweep
+
+
+WORDS = "the of and a to in is it that was for on are with as his they at be this council plan".split()
+GRID = {ANCHOR_DENSITY: {'comparator': 'lt', 'thresholds': [0.25, 0.5], 'margins': [0, 0.2]},
+        WORD_COUNT: {'comparator': 'gt', 'thresholds': [10, 40]},
+        STOP_WORD_DENSITY: {'comparator': 'bt', 'thresholds': [[.25, .566]], 'margins': [0.05]},
+        'probability': [0.3, 0.5, 0.8]}
+
+
+def section(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(3, 60))]
+    for _ in range(rng.randint(0, 6)):
+        k = rng.randrange(len(words))
+        words[k] = "<a href=\"/\">%s</a>" % words[k]
+    return "<div>%s.</div>" % " ".join(words).capitalize()
+
+
+def labelled(extractor):
+    '''
+    pages with random content positions, and one without labels
+    '''
+    ret = []
+    for seed in range(0, 6):
+        rng = random.Random(seed)
+        html = "<html><body>%s</body></html>" % "".join(section(rng) for _ in range(rng.randint(2, 12)))
+        positions = [sec.position() for sec in extractor.sections(html) if rng.random() < 0.5]
+        ret.append({'id': seed, 'content': html, 'positions': None if seed == 5 else positions})
+    return ret
+
+
+@pytest.mark.parametrize("neighbors", [(1, 0.0), (1, 1.0), (2, 0.5)])
+def test_sweep_matches_direct_scoring(neighbors):
+    extractor = Extractor(threshold = 10)
+    docs = labelled(extractor)
+    store = dump(docs, extractor)
+    assert len(store.ids) == len(docs)
+    assert (store.label[store.document == 5] == UNLABELLED).all()
+
+    results = sweep(store, GRID, neighbors[0], neighbors[1])
+    assert len(results) == 2 * 2 * 2 * 1 * 3
+    for result in results:
+        scorer = Extractor(threshold = 10, classification = result['classification'],
+                           neighbor_window = neighbors[0], neighbor_weight = neighbors[1])
+        tp = fp = fn = 0
+        for doc in docs:
+            if doc['positions'] is None:
+                continue
+            a = scorer.parsed(doc['content'])
+            for sec, score in zip(a.sections, a.scores()):
+                content = sec.position() in doc['positions']
+                predicted = score >= result['probability']
+                tp += content and predicted
+                fp += predicted and not content
+                fn += content and not predicted
+        assert (result['tp'], result['fp'], result['fn']) == (tp, fp, fn), result
+    assert [r['f1'] for r in results] == sorted((r['f1'] for r in results), reverse = True)
+
+
+def test_article_labels():
+    extractor = Extractor(threshold = 10)
+    texts = [" ".join("word%d_%d," % (i, k) for k in range(10)) for i in range(6)]
+    html = "<html><body>%s</body></html>" % "".join("<div>%s</div>" % text for text in texts)
+    # sections mostly made of the article's words, in any case and without punctuation
+    article = " ".join(text.upper().replace(",", "") for text in texts[::2]) + " " + texts[1][:30]
+    store = dump([{'content': html, 'article': article}], extractor)
+    assert store.label.tolist() == [CONTENT, BOILERPLATE, CONTENT, BOILERPLATE, CONTENT, BOILERPLATE]
@@ -0,0 +1,105 @@
+"""
+Copyright (C) 2013-2017  Bryant Moscon - bmoscon@gmail.com
+
+Please see the LICENSE file for the terms and conditions
+associated with this software.
+"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from articleparse.analyzer import Analyzer, Section, STOP_WORD_DENSITY, WORD_COUNT, ANCHOR_DENSITY, lt, gt, bt
+from articleparse.vectorized import analyze_many, feature_matrix, probabilities
+
+
+WORDS = ("the of and a to in is it that was for on are with as his they at be this from have or "
+         "article content extraction section parser window feature sample estimate threshold").split()
+
+
+def paragraph(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def page(seed, giant = 200000):
+    rng = random.Random(seed)
+    body = ["<div><a href=\"/\">Home</a> <a href=\"/news\">News</a></div>"]
+    body.extend("<div><p>%s</p></div>" % " ".join(paragraph(rng, rng.randint(5, 30)) for _ in range(5))
+                for _ in range(8))
+    dump = []
+    while sum(map(len, dump)) < giant:
+        dump.append(paragraph(rng, rng.randint(3, 40)))
+    body.append("<div class=\"comments\">%s</div>" % " ".join(dump))
+    return "<html><body>%s</body></html>" % "".join(body)
+
+
+def analyzers(docs, classification, approximate, neighbors = (1, 0.0)):
+    ret = []
+    for html in docs:
+        a = Analyzer(content = html, classification = classification, approximate = approximate,
+                     neighbor_window = neighbors[0], neighbor_weight = neighbors[1])
+        a.parse_sections(50)
+        ret.append(a)
+    return ret
+
+
+def between(html):
+    '''
+    a stop word density between the giant section's exact
+    one and its estimate, which score differently against it
+    '''
+    densities = []
+    for approximate in (None, 65536):
+        a = Analyzer(content = html, approximate = approximate)
+        a.parse_sections(50)
+        densities.append(max(a.sections, key = lambda sec: sec.len()).stop_word_density)
+    assert densities[0] != densities[1]
+    return sum(densities) / 2
+
+
+@pytest.mark.parametrize("neighbors", [(1, 0.0), (1, 1.0), (2, 0.5)])
+@pytest.mark.parametrize("approximate", [None, 65536])
+def test_analyze_many_matches_analyze_sections(approximate, neighbors):
+    docs = [page(seed) for seed in range(4)]
+    # the giant section's estimate is too close to this threshold to be scored on
+    classification = {ANCHOR_DENSITY: [0.333, lt, 0.1],
+                      WORD_COUNT: [40, gt, 0.1],
+                      STOP_WORD_DENSITY: [[between(docs[0]), 0.9], bt, 0]}
+    expected = [a.analyze_sections() for a in analyzers(docs, classification, approximate, neighbors)]
+    assert analyze_many(analyzers(docs, classification, approximate, neighbors)) == expected
+
+
+def test_sections_scored_alone_by_default():
+    a = Analyzer(content = page(2, giant = 1000))
+    a.parse_sections(50)
+    assert a.neighbor_weight == 0
+    # the individual classifier's points over those possible, nothing else
+    alone = probabilities(feature_matrix(a.sections), a.classification).tolist()
+    assert [sec['probability'] for sec in a.analyze_sections()] == alone
+
+
+def test_feature_matrix_resolves_estimates():
+    html = page(1)
+    exact = Analyzer(content = html)
+    exact.parse_sections(50)
+    approx = Analyzer(content = html, approximate = 65536)
+    approx.parse_sections(50)
+    assert any(sec.errors is not None for sec in approx.sections)
+    # counted exactly without a classification
+    assert (feature_matrix(approx.sections) == feature_matrix(exact.sections)).all()
+    assert all(sec.errors is None for sec in approx.sections)
+
+
+def test_uncertain_estimate_falls_back():
+    rng = random.Random(3)
+    text = " ".join(paragraph(rng, 30) for _ in range(4000))
+    exact = Section(text, 0)
+    sec = Section(text, 0, approximate = 1000)
+    assert sec.errors is not None
+    classification = {STOP_WORD_DENSITY: [[exact.stop_word_density, 0.9], bt, 0]}
+    assert sec.uncertain(classification) == [STOP_WORD_DENSITY]
+    assert sec.resolve(classification)
+    assert sec.errors is None
+    assert sec.stop_word_density == exact.stop_word_density
+    assert (sec.sentence_count, sec.avg_sentence_len) == (exact.sentence_count, exact.avg_sentence_len)